@@ -1,14 +1,20 @@
 from datetime import datetime, timedelta
-from typing import Union
+from typing import Any, Dict, Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from .database import SessionLocal
 from .models import TeamRoster
-from .enums import UserRole
-from .ldap_auth import ldap_auth
+from .enums import UserRole, AuthSource, Role
+from .roles import has_role
+from . import directory
+from .principal_cache import Principal, principal_cache
+from .password_hashing import PasswordHasher
+from .config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, REFRESH_TOKEN_EXPIRE_DAYS
 
 # to get a string like this run:
 # openssl rand -hex 32
@@ -16,7 +22,18 @@ SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Stored in place of a hash for accounts that authenticate elsewhere (LDAP);
+# never produced by bcrypt, so no password can verify against it
+UNUSABLE_PASSWORD = "!"
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS
+)
+# Async routes hash through this pool so bcrypt never blocks the event loop
+password_hasher = PasswordHasher(pwd_context, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/team-roster/login")
 
 def verify_password(plain_password, hashed_password):
@@ -38,56 +55,172 @@ def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
+    to_encode.setdefault("type", "access")
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+def create_refresh_token(principal: Principal) -> str:
+    """A long-lived token that can only be exchanged for new access tokens"""
+    return create_access_token(
+        data={"sub": principal.operator_handle, "uid": principal.id, "ver": principal.token_version, "type": "refresh"},
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     )
+
+def issue_tokens(principal: Principal) -> Dict[str, str]:
+    """Access and refresh tokens for a freshly authenticated principal"""
+    return {
+        "access_token": create_access_token(
+            data=principal.claims(),
+            expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        ),
+        "refresh_token": create_refresh_token(principal),
+        "token_type": "bearer"
+    }
+
+def get_principal(db: Session, username: str) -> Optional[Principal]:
+    """
+    Resolve an operator handle to its principal, reading the roster only on a cache miss.
+    Shared by HTTP dependencies and the WebSocket endpoint.
+    """
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+    generation = principal_cache.generation
+    user = db.query(TeamRoster).filter(TeamRoster.operator_handle == username).first()
+    if user is None:
+        return None
+    return principal_cache.put(user, generation)
+
+def check_token_version(db: Session, claims: Dict[str, Any]) -> Optional[Principal]:
+    """
+    Return the user's current principal if the token's version still matches
+    the roster, or None if the token has been revoked or the user is gone.
+
+    Versions are read through the principal cache, so a change made by
+    another worker process is seen within PRINCIPAL_CACHE_TTL_SECONDS.
+    """
+    username = claims.get("sub")
+    if username is None:
+        return None
+    current = get_principal(db, username)
+    if current is None or current.id != claims.get("uid") or current.token_version != claims.get("ver"):
+        return None
+    return current
+
+def authenticate_token(db: Session, token: str, token_type: str = "access") -> Optional[Principal]:
+    """
+    Verify a token's signature, expiry, type and version.
+    Access tokens authorize from their own claims; refresh tokens return the
+    roster's current principal so new access tokens pick up any changes.
+    """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
-        raise credentials_exception
-    user = db.query(TeamRoster).filter(TeamRoster.operator_handle == username).first()
+        return None
+    if claims.get("type") != token_type:
+        return None
+    current = check_token_version(db, claims)
+    if current is None or token_type != "access":
+        return current
+    try:
+        return Principal.from_claims(claims)
+    except KeyError:
+        return None
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    user = authenticate_token(db, token)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
-async def get_current_active_user(current_user: TeamRoster = Depends(get_current_user)):
+async def get_current_user_record(
+    principal: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> TeamRoster:
+    """
+    Load the full TeamRoster row for the current user.
+    Use this instead of get_current_user when a route needs relationships
+    (e.g. avatar), the password hash, or modifies the user.
+    """
+    user = db.query(TeamRoster).filter(TeamRoster.id == principal.id).first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     if not current_user.active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-def authenticate_user(db: Session, username: str, password: str):
+def has_usable_password(user: TeamRoster) -> bool:
+    """Whether the user has a local password hash that can be verified"""
+    return bool(user.hashed_password) and not user.hashed_password.startswith(UNUSABLE_PASSWORD)
+
+_dummy_hash: Optional[str] = None
+
+async def _burn_password_check(password: str) -> None:
+    """Verify against a throwaway hash so an unknown username costs the same as a wrong password"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await password_hasher.hash("rt3-unknown-user")
+    await password_hasher.verify(password, _dummy_hash)
+
+async def _authenticate_ldap(db: Session, username: str, password: str):
+    if not directory.enabled():
+        return False
+    ldap_auth = directory.authenticator()
+    from .ldap_auth import LDAPUnavailable
+    try:
+        ldap_user_info = await run_in_threadpool(ldap_auth.authenticate_user, username, password)
+    except LDAPUnavailable as e:
+        raise directory.DirectoryUnavailable(str(e)) from e
+    if not ldap_user_info:
+        return False
+    # Get or create user from LDAP info
+    user = await run_in_threadpool(ldap_auth.get_or_create_user, db, ldap_user_info)
+    return user or False
+
+async def authenticate_user(db: Session, username: str, password: str):
     """
     Authenticate user using either local database or LDAP
     Returns the user object if authentication succeeds, False otherwise
     """
-    # First try local authentication
     user = db.query(TeamRoster).filter(TeamRoster.operator_handle == username).first()
-    if user and verify_password(password, user.hashed_password):
-        return user
-    
-    # If local authentication fails and LDAP is enabled, try LDAP
-    if ldap_auth.enabled:
-        ldap_user_info = ldap_auth.authenticate_user(username, password)
-        if ldap_user_info:
-            # Get or create user from LDAP info
-            user = ldap_auth.get_or_create_user(db, ldap_user_info)
-            if user:
-                return user
+
+    # Directory accounts have no local hash; go straight to LDAP
+    if user is not None and user.auth_source == AuthSource.ldap:
+        return await _authenticate_ldap(db, username, password)
+
+    if user is not None and has_usable_password(user):
+        verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if verified:
+            if new_hash:
+                # Stored hash predates the current work factor; upgrade it now.
+                # Written with a bulk update so the unchanged password doesn't
+                # bump token_version and revoke the user's other sessions.
+                db.execute(
+                    update(TeamRoster).where(TeamRoster.id == user.id).values(hashed_password=new_hash)
+                )
+                db.commit()
+            return user
+    else:
+        await _burn_password_check(password)
     
-    return False
+    # Unknown users may be new directory accounts, and local accounts may also
+    # exist in LDAP; a successful LDAP login switches the account to LDAP
+    return await _authenticate_ldap(db, username, password)
 
-async def admin_required(current_user: TeamRoster = Depends(get_current_user)):
-    if "ADMIN" not in current_user.team_role.upper():
+async def admin_required(current_user: Principal = Depends(get_current_user)):
+    if not has_role(current_user, Role.ADMIN):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
@@ -0,0 +1,295 @@
+"""
+Database and uploads backups, run every six hours from cron:
+
+    python -m app.backup [--only database|uploads]
+
+The database is snapshotted while the application keeps serving: SQLite
+through the online backup API, PostgreSQL with pg_dump. Snapshots are
+gzipped as they are written and then read back before they count: a
+SQLite snapshot is decompressed, opened and must pass ``PRAGMA
+integrity_check``. Uploads are backed up incrementally into a
+deduplicated store, see app.upload_store. Each run is recorded in
+backup_runs, which admins see at /api/db/backups.
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.orm import Session
+
+from .config import (
+    BACKUP_COMPRESS_LEVEL, BACKUP_DIR, BACKUP_KEEP, BACKUP_ONLINE_SECONDS, BACKUP_PAGES_PER_STEP, UPLOAD_DIR
+)
+from .database import DATABASE_URL, SessionLocal
+from .models import BackupRun
+from .upload_store import SnapshotError, UploadStore
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+# Pause after each backup step, while the source is unlocked, so writers get a turn
+STEP_PAUSE_SECONDS = 0.005
+# Last line pg_dump writes to a plain-format dump it finished
+PG_DUMP_TRAILER = b"PostgreSQL database dump complete"
+
+
+class BackupError(Exception):
+    """A backup could not be written or did not pass verification"""
+
+
+class _OnlineCopyTooSlow(Exception):
+    pass
+
+
+def timestamp() -> str:
+    return datetime.now().strftime("%Y-%m-%d_%H%M%S")
+
+
+def snapshot_sqlite(source: str, target: str, pages: int = BACKUP_PAGES_PER_STEP,
+                    online_seconds: float = BACKUP_ONLINE_SECONDS) -> None:
+    """
+    Copy the SQLite database at ``source`` to ``target`` with the online
+    backup API. In WAL mode readers do not block writers, so it is copied
+    in one step. Otherwise each step holds the read lock for ``pages``
+    pages only. A commit from another connection between steps makes
+    SQLite restart the copy, so if it is still going after
+    ``online_seconds`` it is redone in one step, with writers waiting for
+    that copy.
+    """
+    if not os.path.isfile(source):
+        raise BackupError(f"Database file not found: {source}")
+    deadline = time.monotonic() + online_seconds
+
+    def progress(status, remaining, total):
+        if remaining and time.monotonic() > deadline:
+            raise _OnlineCopyTooSlow()
+        time.sleep(STEP_PAUSE_SECONDS)
+
+    src = sqlite3.connect(source, timeout=30)
+    dst = sqlite3.connect(target)
+    try:
+        if src.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+            src.backup(dst)
+            return
+        try:
+            src.backup(dst, pages=pages, progress=progress)
+        except _OnlineCopyTooSlow:
+            logger.warning("Online copy of %s kept restarting for %.0fs; copying it in one step",
+                           source, online_seconds)
+            src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def compress(source: str, target: str, level: int = BACKUP_COMPRESS_LEVEL) -> None:
+    with open(source, "rb") as raw, gzip.open(target, "wb", compresslevel=level) as packed:
+        shutil.copyfileobj(raw, packed, CHUNK_SIZE)
+
+
+def write_sqlite_snapshot(source: str, target: str) -> None:
+    # The uncompressed copy goes next to the target so it stays on the backup volume
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(target) or ".") as scratch:
+        copy = os.path.join(scratch, "snapshot.db")
+        snapshot_sqlite(source, copy)
+        compress(copy, target)
+
+
+def verify_sqlite_snapshot(path: str) -> None:
+    """Decompress a snapshot to a scratch file and run PRAGMA integrity_check on it"""
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(path) or ".") as scratch:
+        restored = os.path.join(scratch, "verify.db")
+        with gzip.open(path, "rb") as packed, open(restored, "wb") as raw:
+            shutil.copyfileobj(packed, raw, CHUNK_SIZE)
+        db = sqlite3.connect(restored)
+        try:
+            result = [row[0] for row in db.execute("PRAGMA integrity_check")]
+        finally:
+            db.close()
+    if result != ["ok"]:
+        raise BackupError("Integrity check failed: " + "; ".join(result[:5]))
+
+
+def dump_postgres(url: URL, target: str, level: int = BACKUP_COMPRESS_LEVEL) -> None:
+    """Stream a plain pg_dump, taken in one snapshot transaction, into a gzip file"""
+    env = dict(os.environ)
+    if url.password:
+        # Not on the command line, where other processes could read it
+        env["PGPASSWORD"] = str(url.password)
+    dsn = url.set(drivername="postgresql", password=None).render_as_string(hide_password=False)
+    with tempfile.TemporaryFile() as errors, gzip.open(target, "wb", compresslevel=level) as packed:
+        dump = subprocess.Popen(["pg_dump", "--no-password", "--dbname", dsn],
+                                stdout=subprocess.PIPE, stderr=errors, env=env)
+        shutil.copyfileobj(dump.stdout, packed, CHUNK_SIZE)
+        dump.stdout.close()
+        if dump.wait():
+            errors.seek(0)
+            message = errors.read().decode(errors="replace").strip()
+            raise BackupError(f"pg_dump exited with {dump.returncode}: {message}")
+
+
+def verify_pg_dump(path: str) -> None:
+    """Read the whole dump back and check pg_dump got to the end of it"""
+    tail = b""
+    with gzip.open(path, "rb") as packed:
+        for chunk in iter(lambda: packed.read(CHUNK_SIZE), b""):
+            tail = (tail + chunk)[-4096:]
+    if PG_DUMP_TRAILER not in tail:
+        raise BackupError("Dump is incomplete: pg_dump's completion marker is missing")
+
+
+def run_backup(db: Session, kind: str, target: str, write: Callable[[str], Optional[int]],
+               verify: Callable[[str], object]) -> BackupRun:
+    """
+    Write a backup to ``target`` through a .part file, verify it, and
+    record the outcome in backup_runs. A backup that fails either step is
+    removed and recorded as failed rather than raised. The recorded size
+    is what ``write`` returns, when the backup's cost is not the size of
+    ``target`` (an uploads manifest), else the size of ``target``.
+    """
+    run = BackupRun(kind=kind, started_at=datetime.utcnow(), path=target)
+    started = time.perf_counter()
+    partial = target + ".part"
+    try:
+        size = write(partial)
+        verify(partial)
+        os.replace(partial, target)
+        run.status = "ok"
+        run.size_bytes = os.path.getsize(target) if size is None else size
+    except Exception as e:
+        expected = isinstance(e, (BackupError, SnapshotError))
+        logger.error("%s backup to %s failed: %s", kind, target, e, exc_info=not expected)
+        run.status = "failed"
+        run.error = str(e) if expected else f"{type(e).__name__}: {e}"
+        if os.path.exists(partial):
+            os.remove(partial)
+    run.duration_seconds = round(time.perf_counter() - started, 3)
+    db.add(run)
+    db.commit()
+    return run
+
+
+def backup_database(db: Session, directory: str = BACKUP_DIR, database_url: str = DATABASE_URL,
+                    stamp: Optional[str] = None) -> BackupRun:
+    url = make_url(database_url)
+    stamp = stamp or timestamp()
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        return run_backup(db, "database", os.path.join(directory, f"db_{stamp}.sql.gz"),
+                          lambda path: dump_postgres(url, path), verify_pg_dump)
+
+    def write(path: str) -> None:
+        if backend != "sqlite":
+            raise BackupError(f"Backups are not supported for {backend} databases")
+        write_sqlite_snapshot(url.database, path)
+
+    return run_backup(db, "database", os.path.join(directory, f"db_{stamp}.sqlite3.gz"),
+                      write, verify_sqlite_snapshot)
+
+
+def backup_uploads(db: Session, directory: str = BACKUP_DIR, uploads_dir: str = UPLOAD_DIR,
+                   stamp: Optional[str] = None) -> BackupRun:
+    """An incremental uploads snapshot; its recorded size is the bytes newly stored"""
+    stamp = stamp or timestamp()
+    store = UploadStore(directory)
+    return run_backup(db, "uploads", os.path.join(directory, f"uploads_{stamp}.json.gz"),
+                      lambda path: store.snapshot(uploads_dir, path), store.verify)
+
+
+BACKUPS = {"database": backup_database, "uploads": backup_uploads}
+PREFIXES = {"database": "db", "uploads": "uploads"}
+
+
+def prune(directory: str, prefix: str, keep: int = BACKUP_KEEP) -> List[str]:
+    """Delete all but the newest ``keep`` backups named ``<prefix>_<timestamp>...``; returns their names"""
+    backups = sorted(path for path in Path(directory).glob(f"{prefix}_*") if not path.name.endswith(".part"))
+    removed = backups[:-keep] if keep > 0 else backups
+    for path in removed:
+        path.unlink()
+    return [path.name for path in removed]
+
+
+def backup_status(db: Session, limit: int = 50) -> Dict[str, object]:
+    """The newest ``limit`` backup runs and when each kind last succeeded"""
+    last_success = dict(
+        db.query(BackupRun.kind, func.max(BackupRun.started_at))
+        .filter(BackupRun.status == "ok")
+        .group_by(BackupRun.kind)
+        .all()
+    )
+    runs = db.query(BackupRun).order_by(BackupRun.started_at.desc(), BackupRun.id.desc()).limit(limit).all()
+    return {
+        "last_success": {
+            kind: last_success[kind].isoformat() if kind in last_success else None for kind in BACKUPS
+        },
+        "runs": [
+            {
+                "id": run.id,
+                "kind": run.kind,
+                "status": run.status,
+                "started_at": run.started_at.isoformat() if run.started_at else None,
+                "duration_seconds": run.duration_seconds,
+                "size_bytes": run.size_bytes,
+                "path": run.path,
+                "error": run.error,
+            }
+            for run in runs
+        ],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Back up the database and uploads")
+    parser.add_argument("--only", choices=sorted(BACKUPS), help="back up just the database or the uploads")
+    parser.add_argument("--directory", default=BACKUP_DIR, help="backup directory (default: %(default)s)")
+    parser.add_argument("--keep", type=int, default=BACKUP_KEEP,
+                        help="backups of each kind to keep (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.directory, exist_ok=True)
+    stamp = timestamp()
+    failed = False
+    db = SessionLocal()
+    try:
+        for kind in [args.only] if args.only else list(BACKUPS):
+            run = BACKUPS[kind](db, args.directory, stamp=stamp)
+            if run.status != "ok":
+                print(f"ERROR: {kind} backup failed: {run.error}")
+                failed = True
+                continue
+            print(f"{kind.capitalize()} backup verified: {run.path} "
+                  f"({run.size_bytes / 1024 / 1024:.1f} MB stored in {run.duration_seconds:.1f}s)")
+            # Old backups are only removed once a new one has been verified
+            removed = prune(args.directory, PREFIXES[kind], args.keep)
+            if removed:
+                print(f"Removed {len(removed)} old {kind} backup(s)")
+            if kind == "uploads":
+                try:
+                    objects, freed = UploadStore(args.directory).collect_garbage()
+                except Exception as e:
+                    # A manifest that cannot be read stops the cleanup before anything is deleted
+                    print(f"ERROR: removing unreferenced upload objects failed: {e}")
+                    failed = True
+                    continue
+                if objects:
+                    print(f"Removed {objects} unreferenced upload object(s) ({freed / 1024 / 1024:.1f} MB)")
+    finally:
+        db.close()
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
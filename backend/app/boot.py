@@ -0,0 +1,125 @@
+"""
+Worker boot timing.
+
+``boot_report`` records how long this worker took to import the
+application and to run each startup step. It is logged once startup has
+finished and served under "boot" in /api/http/stats.
+
+``python -m app.boot`` imports the application in a fresh interpreter
+under ``-X importtime`` and lists the packages and modules that account
+for most of the import time.
+"""
+
+import argparse
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+class BootReport:
+    """Durations of this worker's boot phases, in the order they ran"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.finished = False
+
+    def mark(self, name: str) -> None:
+        """Record ``name`` as having taken the time since the boot started or the last phase ended"""
+        elapsed = time.perf_counter() - self.started - sum(self.phases.values())
+        self.phases[name] = elapsed
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def finish(self) -> None:
+        self.finished = True
+        summary = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        logger.info("Worker %d booted in %.0fms (%s)", os.getpid(), self.total() * 1000, summary,
+                    extra={"boot": self.stats()})
+
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "pid": os.getpid(),
+            "finished": self.finished,
+            "total_ms": round(self.total() * 1000, 1),
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+        }
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def parse_importtime(output: str) -> List[ImportTime]:
+    """The module lines of ``python -X importtime`` output"""
+    rows = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            rows.append(ImportTime(match[4], int(match[1]), int(match[2])))
+    return rows
+
+
+def import_report(rows: List[ImportTime], top: int = 15, prefix: str = "app") -> str:
+    total = sum(row.self_us for row in rows)
+    packages: Dict[str, int] = defaultdict(int)
+    for row in rows:
+        packages[row.module.split(".")[0]] += row.self_us
+    lines = [f"{len(rows)} modules imported in {total / 1000:.0f}ms", "", "By top-level package (self time):"]
+    for package, us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {us / 1000:8.1f}ms  {us / total:6.1%}  {package}")
+    lines += ["", f"{prefix} modules (cumulative, self):"]
+    own = sorted((row for row in rows if row.module.split(".")[0] == prefix), key=lambda row: -row.cumulative_us)
+    for row in own[:top]:
+        lines.append(f"  {row.cumulative_us / 1000:8.1f}ms  {row.self_us / 1000:8.1f}ms  {row.module}")
+    lines += ["", "Slowest modules (self time):"]
+    for row in sorted(rows, key=lambda row: -row.self_us)[:top]:
+        lines.append(f"  {row.self_us / 1000:8.1f}ms  {row.module}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Report where importing the application spends its time")
+    parser.add_argument("--module", default="app.main", help="module to import (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=15, help="rows per section (default: 15)")
+    args = parser.parse_args(argv)
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"importing {args.module} failed")
+    print(import_report(parse_importtime(result.stderr), top=args.top))
+
+
+boot_report = BootReport()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+One-off setup to run before the workers start:
+
+    python -m app.bootstrap
+
+It creates the data and upload directories, applies the Alembic
+migrations, which build the tables on a new database, and adds the
+default admin account if there is none. Workers do none of this at import or startup, so they boot faster
+and several workers starting at once cannot race each other on it.
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+from .auth import get_password_hash
+from .config import BASE_DIR, UPLOAD_DIR
+from .database import DATABASE_URL, SessionLocal, engine
+from .enums import UserRole
+from .models import TeamRoster
+
+
+def prepare_directories(database_url: str = DATABASE_URL) -> None:
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        Path(url.database).parent.mkdir(parents=True, exist_ok=True)
+    # Uploads are served from ./uploads and stored under UPLOAD_DIR; in the
+    # container both are /app/uploads
+    for directory in {UPLOAD_DIR, os.path.abspath("uploads")}:
+        os.makedirs(directory, exist_ok=True)
+
+
+def migrate(bind: Engine = engine, configure_logging: bool = True) -> None:
+    """
+    Upgrade the database behind ``bind`` to the newest migration. On an
+    empty database the first one, create_base_schema, creates the tables.
+    ``configure_logging=False`` leaves the caller's logging setup alone
+    instead of applying alembic.ini's.
+    """
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BASE_DIR / "migrations"))
+    config.attributes["configure_logger"] = configure_logging
+    with bind.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+
+def ensure_default_admin(db: Session) -> bool:
+    """Add the inactive default admin account if it is missing; True if it was added"""
+    if db.query(TeamRoster.id).filter(TeamRoster.operator_handle == "admin").first():
+        return False
+    db.add(TeamRoster(
+        operator_handle="admin",
+        email="admin@rt3.com",
+        team_role=UserRole.ADMIN,
+        hashed_password=get_password_hash("admin"),
+        name="Admin User",
+        active=False
+    ))
+    db.commit()
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Prepare the database and directories before starting RT3")
+    parser.add_argument("--skip-migrations", action="store_true",
+                        help="only create directories and the default admin")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    prepare_directories()
+    if not args.skip_migrations:
+        migrate()
+    db = SessionLocal()
+    try:
+        added = ensure_default_admin(db)
+    finally:
+        db.close()
+    print(f"Bootstrap finished in {time.perf_counter() - started:.1f}s"
+          f"{' (default admin added)' if added else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Engine, make_url
+
+from .models import RealtimeEvent
+
+logger = logging.getLogger(__name__)
+
+# Serialized change events, as produced by ChangeEvent.to_dict()
+Payload = Dict[str, Any]
+Deliver = Callable[[List[Payload]], None]
+
+
+class BroadcastBackend:
+    """
+    Relays change events to the other worker processes.
+
+    The hub always delivers events to its own sockets directly; a backend
+    only carries them to other workers, which hand them to ``deliver``. This
+    base class is the single-process default and relays nothing.
+    """
+
+    name = "local"
+
+    def __init__(self):
+        # Identifies this worker so it can skip its own relayed events
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.relayed = 0
+        self.received = 0
+        self.errors = 0
+
+    async def start(self, deliver: Deliver) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def publish(self, payloads: List[Payload]) -> None:
+        """Send events to other workers. Called from any thread, after commit."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "origin": self.origin,
+            "relayed": self.relayed,
+            "received": self.received,
+            "errors": self.errors
+        }
+
+
+class PostgresBroadcast(BroadcastBackend):
+    """
+    Relays events with PostgreSQL LISTEN/NOTIFY.
+
+    Each worker keeps one extra connection that LISTENs on ``channel``, read
+    from the event loop without a thread, and one for sending NOTIFYs.
+    """
+
+    name = "postgres"
+    # NOTIFY payloads must stay under 8000 bytes
+    MAX_PAYLOAD_BYTES = 7500
+
+    def __init__(self, database_url: str, channel: str = "rt3_changes", reconnect_seconds: float = 5):
+        super().__init__()
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self._deliver: Optional[Deliver] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listen_conn = None
+        self._notify_conn = None
+        self._notify_lock = threading.Lock()
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    def _connect(self):
+        import psycopg2
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._loop = asyncio.get_running_loop()
+        await self._listen()
+
+    async def _listen(self) -> None:
+        try:
+            conn = await self._loop.run_in_executor(None, self._connect)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Could not LISTEN for change events: %s", e)
+            self._schedule_reconnect()
+            return
+        self._listen_conn = conn
+        self._loop.add_reader(conn.fileno(), self._on_readable)
+
+    def _schedule_reconnect(self) -> None:
+        async def reconnect():
+            await asyncio.sleep(self.reconnect_seconds)
+            self._reconnect_task = None
+            await self._listen()
+            if self._listen_conn is not None and self._deliver is not None:
+                # Events sent while we were not listening are lost; have clients refetch
+                self._deliver([{"topic": "*", "entity": "*", "action": "resync"}])
+
+        if self._reconnect_task is None:
+            self._reconnect_task = asyncio.ensure_future(reconnect())
+
+    def _on_readable(self) -> None:
+        conn = self._listen_conn
+        try:
+            conn.poll()
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Lost change event listener connection: %s", e)
+            self._loop.remove_reader(conn.fileno())
+            self._listen_conn = None
+            try:
+                conn.close()
+            except Exception:
+                pass
+            self._schedule_reconnect()
+            return
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            try:
+                message = json.loads(notify.payload)
+            except ValueError:
+                self.errors += 1
+                continue
+            if message.get("origin") == self.origin:
+                continue
+            self.received += len(message["events"])
+            self._deliver(message["events"])
+
+    def _chunks(self, payloads: List[Payload]) -> List[str]:
+        chunks: List[str] = []
+        batch: List[Payload] = []
+        for payload in payloads:
+            if len(json.dumps(payload)) > self.MAX_PAYLOAD_BYTES:
+                # Too large for one NOTIFY; other workers' clients refetch the topic
+                payload = {"topic": payload["topic"], "entity": payload["topic"], "action": "resync"}
+            candidate = json.dumps({"origin": self.origin, "events": batch + [payload]})
+            if batch and len(candidate) > self.MAX_PAYLOAD_BYTES:
+                chunks.append(json.dumps({"origin": self.origin, "events": batch}))
+                batch = []
+            batch.append(payload)
+        if batch:
+            chunks.append(json.dumps({"origin": self.origin, "events": batch}))
+        return chunks
+
+    def publish(self, payloads: List[Payload]) -> None:
+        with self._notify_lock:
+            try:
+                if self._notify_conn is None or self._notify_conn.closed:
+                    self._notify_conn = self._connect()
+                with self._notify_conn.cursor() as cursor:
+                    for chunk in self._chunks(payloads):
+                        cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, chunk))
+                self.relayed += len(payloads)
+            except Exception as e:
+                self.errors += 1
+                self._notify_conn = None
+                logger.warning("Could not relay change events: %s", e)
+
+    async def stop(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._listen_conn is not None:
+            self._loop.remove_reader(self._listen_conn.fileno())
+            self._listen_conn.close()
+            self._listen_conn = None
+        with self._notify_lock:
+            if self._notify_conn is not None:
+                self._notify_conn.close()
+                self._notify_conn = None
+
+
+class ChangeLogBroadcast(BroadcastBackend):
+    """
+    Relays events through the realtime_events table, for SQLite deployments.
+
+    Publishing queues a row for a writer thread, which inserts everything
+    queued since its last write in one transaction, so committing requests
+    never wait on the table or take SQLite's write lock a second time. Every
+    worker tails the table by id every ``poll_seconds``. Rows older than
+    ``retention_seconds`` are pruned.
+    """
+
+    name = "changelog"
+    # Published batches waiting for the writer; more are dropped
+    MAX_PENDING = 10000
+    _STOP = object()
+
+    def __init__(self, engine: Engine, poll_seconds: float = 0.25, retention_seconds: float = 60):
+        super().__init__()
+        self.engine = engine
+        self.poll_seconds = poll_seconds
+        self.retention_seconds = retention_seconds
+        self.dropped = 0
+        self._last_id = 0
+        self._task: Optional[asyncio.Task] = None
+        self._pending: "queue.Queue[Any]" = queue.Queue(self.MAX_PENDING)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    async def start(self, deliver: Deliver) -> None:
+        loop = asyncio.get_running_loop()
+        self._last_id = await loop.run_in_executor(None, self._max_id)
+        self._task = asyncio.create_task(self._tail(deliver))
+
+    def _max_id(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(RealtimeEvent.id))).scalar() or 0
+
+    def _read(self) -> List[Any]:
+        with self.engine.connect() as conn:
+            latest = conn.execute(select(func.max(RealtimeEvent.id))).scalar() or 0
+            if latest < self._last_id:
+                # Ids went backwards: a table created without AUTOINCREMENT was
+                # emptied by a prune and SQLite reused them. Every row is new.
+                self._last_id = 0
+            return conn.execute(
+                select(RealtimeEvent.id, RealtimeEvent.origin, RealtimeEvent.payload)
+                .where(RealtimeEvent.id > self._last_id)
+                .order_by(RealtimeEvent.id)
+            ).all()
+
+    def _prune(self) -> None:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        with self.engine.begin() as conn:
+            conn.execute(delete(RealtimeEvent).where(RealtimeEvent.created_at < cutoff))
+
+    async def _tail(self, deliver: Deliver) -> None:
+        loop = asyncio.get_running_loop()
+        polls_per_prune = max(1, int(self.retention_seconds / self.poll_seconds))
+        polls = 0
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                rows = await loop.run_in_executor(None, self._read)
+                for row_id, origin, payload in rows:
+                    self._last_id = row_id
+                    if origin == self.origin:
+                        continue
+                    events = json.loads(payload)
+                    self.received += len(events)
+                    deliver(events)
+                polls += 1
+                if polls % polls_per_prune == 0:
+                    await loop.run_in_executor(None, self._prune)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.warning("Could not read relayed change events: %s", e)
+
+    def publish(self, payloads: List[Payload]) -> None:
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="rt3-changelog-writer", daemon=True)
+                self._writer.start()
+        try:
+            self._pending.put_nowait(payloads)
+        except queue.Full:
+            self.dropped += len(payloads)
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._pending.get()]
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [payloads for payloads in batch if payloads is not self._STOP]
+            try:
+                if rows:
+                    self._insert(rows)
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+            if len(rows) < len(batch):
+                return
+
+    def _insert(self, rows: List[List[Payload]]) -> None:
+        now = datetime.utcnow()
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(RealtimeEvent), [
+                    {"origin": self.origin, "payload": json.dumps(payloads), "created_at": now}
+                    for payloads in rows
+                ])
+            self.relayed += sum(len(payloads) for payloads in rows)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Could not relay change events: %s", e)
+
+    def flush(self) -> None:
+        """Block until every event published so far has been written"""
+        self._pending.join()
+
+    def _stop_writer(self) -> None:
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._pending.put(self._STOP)
+            writer.join()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        # Write what is still queued before the worker exits
+        await asyncio.get_running_loop().run_in_executor(None, self._stop_writer)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "pending": self._pending.qsize(), "dropped": self.dropped}
+
+
+def create_backend(kind: str, engine: Engine, poll_ms: float, retention_seconds: float,
+                   workers: int = 1) -> BroadcastBackend:
+    """
+    Pick the broadcast backend. ``auto`` relays nothing for a single worker,
+    and with more uses LISTEN/NOTIFY on PostgreSQL and the change-log table
+    on SQLite.
+    """
+    dialect = engine.url.get_backend_name()
+    if kind == "auto":
+        if workers > 1:
+            kind = {"postgresql": "postgres", "sqlite": "changelog"}.get(dialect, "local")
+        else:
+            kind = "local"
+    if kind == "postgres":
+        return PostgresBroadcast(engine.url.render_as_string(hide_password=False))
+    if kind == "changelog":
+        return ChangeLogBroadcast(engine, poll_ms / 1000, retention_seconds)
+    if kind != "local":
+        raise ValueError(f"Unknown WS_BROADCAST_BACKEND: {kind}")
+    return BroadcastBackend()
@@ -5,11 +5,26 @@ from typing import Optional
 # Get the directory where this config file is located
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# Base directory for file uploads
+# Base directory for file uploads, created by app.bootstrap
 UPLOAD_DIR = str(BASE_DIR / "uploads")
 
-# Create uploads directory if it doesn't exist
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Grading queue: how long a grader's claim on a pending response lasts
+GRADING_LEASE_MINUTES = int(os.getenv("GRADING_LEASE_MINUTES", "15"))
+
+# How long question analytics are cached; other workers' submissions and edits show up after this
+ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "60"))
+
+# How long an authenticated user's roles/level are cached before re-reading the roster
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+
+# Lifetime of refresh tokens, which trade for new access tokens without a password check
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+# Password hashing: bcrypt work factor (existing hashes below it are upgraded on login),
+# hashing worker threads, and how many hash operations may queue before requests get a 503
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
 
 # LDAP Configuration
 LDAP_ENABLED = os.getenv("LDAP_ENABLED", "false").lower() == "true"
@@ -35,3 +50,101 @@ LDAP_LABEL = os.getenv("LDAP_LABEL", "LDAP")
 LDAP_CA_CERT_FILE = os.getenv("LDAP_CA_CERT_FILE", "")
 LDAP_VERIFY_SSL = os.getenv("LDAP_VERIFY_SSL", "true").lower() == "true"
 LDAP_TLS_VERSION = os.getenv("LDAP_TLS_VERSION", "1.2")  # 1.0, 1.1, 1.2, 1.3 
+
+
+# LDAP service-account connection pool
+LDAP_POOL_SIZE = int(os.getenv("LDAP_POOL_SIZE", "4"))
+LDAP_POOL_TIMEOUT = float(os.getenv("LDAP_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+LDAP_POOL_KEEPALIVE = float(os.getenv("LDAP_POOL_KEEPALIVE", "60"))  # idle seconds before a health check
+
+# LDAP directory sync: minutes between scheduled syncs (0 disables the schedule) and search page size
+LDAP_SYNC_INTERVAL_MINUTES = float(os.getenv("LDAP_SYNC_INTERVAL_MINUTES", "0"))
+LDAP_SYNC_PAGE_SIZE = int(os.getenv("LDAP_SYNC_PAGE_SIZE", "500"))
+
+# LDAP resilience. LDAP_HOST may list several servers separated by commas;
+# LDAP_SRV_DOMAIN discovers them from _ldap._tcp.<domain> SRV records instead.
+LDAP_SRV_DOMAIN = os.getenv("LDAP_SRV_DOMAIN", "")
+LDAP_SRV_CACHE_SECONDS = float(os.getenv("LDAP_SRV_CACHE_SECONDS", "300"))
+LDAP_SERVER_STRATEGY = os.getenv("LDAP_SERVER_STRATEGY", "first")  # first or round_robin
+LDAP_CONNECT_TIMEOUT = float(os.getenv("LDAP_CONNECT_TIMEOUT", "5"))
+LDAP_RECEIVE_TIMEOUT = float(os.getenv("LDAP_RECEIVE_TIMEOUT", "10"))
+LDAP_SERVER_RETRY_SECONDS = float(os.getenv("LDAP_SERVER_RETRY_SECONDS", "30"))  # skip a failed server this long
+LDAP_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LDAP_CIRCUIT_FAILURE_THRESHOLD", "5"))
+LDAP_CIRCUIT_RESET_SECONDS = float(os.getenv("LDAP_CIRCUIT_RESET_SECONDS", "30"))
+
+# /ws change notifications: rows a client may fall behind before it is told to refetch,
+# seconds a single send may block before the socket is dropped, how long to gather
+# events into one message, and how many events one commit may publish per topic
+# before they collapse into a refetch
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+WS_BATCH_MS = float(os.getenv("WS_BATCH_MS", "50"))
+WS_MAX_EVENTS_PER_COMMIT = int(os.getenv("WS_MAX_EVENTS_PER_COMMIT", "100"))
+
+# Number of uvicorn workers; uvicorn and gunicorn read WEB_CONCURRENCY as well
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# How /ws events reach sockets held by other uvicorn workers: "auto" ("local" unless
+# WEB_CONCURRENCY is over 1, then LISTEN/NOTIFY on PostgreSQL and the realtime_events
+# change-log table on SQLite), "postgres", "changelog", or "local" for a single worker.
+# The change log is polled every WS_BROADCAST_POLL_MS and rows are kept for
+# WS_BROADCAST_RETENTION_SECONDS.
+WS_BROADCAST_BACKEND = os.getenv("WS_BROADCAST_BACKEND", "auto")
+WS_BROADCAST_POLL_MS = float(os.getenv("WS_BROADCAST_POLL_MS", "250"))
+WS_BROADCAST_RETENTION_SECONDS = float(os.getenv("WS_BROADCAST_RETENTION_SECONDS", "60"))
+
+# /metrics: with several workers, each writes its metrics to METRICS_DIR every
+# METRICS_FLUSH_SECONDS and a scrape merges them all. Leave empty for a single worker;
+# clear the directory between deployments.
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "10"))
+
+# SQL auditing: "record" logs every request's repeated query shapes (N+1 candidates)
+# with the stack issuing them; "sample" records SQL_AUDIT_SAMPLE_RATE of requests and
+# writes offenders to the slow query log; "off" records only inside query_budget().
+# A shape run SQL_AUDIT_REPEAT_THRESHOLD times in one request is flagged.
+SQL_AUDIT_MODE = os.getenv("SQL_AUDIT_MODE", "off")
+SQL_AUDIT_SAMPLE_RATE = float(os.getenv("SQL_AUDIT_SAMPLE_RATE", "0.01"))
+SQL_AUDIT_REPEAT_THRESHOLD = int(os.getenv("SQL_AUDIT_REPEAT_THRESHOLD", "5"))
+
+# Slow query log: statements over SLOW_QUERY_MS (0 disables) are written with their
+# EXPLAIN output as JSON lines to SLOW_QUERY_LOG_FILE, rotated at SLOW_QUERY_LOG_MAX_BYTES.
+# A statement shape is re-explained at most every SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "logs/slow_queries.log")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "300"))
+
+# On-demand profiling: admins add "X-Profile: 1" or "?profile=1" to a request to have it
+# sampled every PROFILE_INTERVAL_MS. The newest PROFILE_MAX_FILES profiles are kept in PROFILE_DIR.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "logs/profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+
+# Application logging: records go through a queue of LOG_QUEUE_SIZE to a background
+# writer (records are dropped, not waited on, when it is full). LOG_FORMAT is "json" or
+# "text". LOG_FILE rotates at LOG_MAX_BYTES, or on LOG_ROTATE_WHEN ("midnight", "H", ...)
+# when set, keeping LOG_BACKUPS files. LOG_LEVELS overrides single loggers, e.g.
+# "app.crud=DEBUG,sqlalchemy.engine=WARNING".
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_FILE = os.getenv("LOG_FILE", "logs/app.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Backups (python -m app.backup, run by utils/backup_rt3.sh from cron) go to RT3_BACKUP_DIR.
+# SQLite is copied online, in one step in WAL mode and otherwise BACKUP_PAGES_PER_STEP
+# pages at a time so writers can commit between steps; a commit restarts the copy, and
+# one still unfinished after BACKUP_ONLINE_SECONDS is redone in a single step.
+# PostgreSQL is dumped with pg_dump.
+# Snapshots are gzipped at BACKUP_COMPRESS_LEVEL, verified, and the newest BACKUP_KEEP
+# of each kind are kept.
+BACKUP_DIR = os.getenv("RT3_BACKUP_DIR", "backup")
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "28"))
+BACKUP_COMPRESS_LEVEL = int(os.getenv("BACKUP_COMPRESS_LEVEL", "1"))
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+BACKUP_ONLINE_SECONDS = float(os.getenv("BACKUP_ONLINE_SECONDS", "60"))
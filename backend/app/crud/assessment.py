@@ -1,15 +1,20 @@
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 import json
+import logging
 import csv
 import io
 import base64
+from sqlalchemy import case, update as sql_update
 from sqlalchemy.sql import func
 
 from ..models import Assessment, AssessmentQuestion
 from ..schemas import AssessmentCreate, AssessmentUpdate
 from ..crud.category import get_or_create
+from . import assessment_analytics
+
+logger = logging.getLogger(__name__)
 
 def get(db: Session, assessment_id: int) -> Optional[Assessment]:
     """Get an assessment by ID."""
@@ -47,8 +52,8 @@ def create(db: Session, assessment_data: AssessmentCreate, created_by: int) -> A
         if isinstance(options, list):
             options = json.dumps(options)
 
-        print("Creating question with data:", question_data.model_dump())  # Debug logging
-        
+        logger.debug("Creating question for assessment %s: %s", db_assessment.id, question_data.question_text)
+
         db_question = AssessmentQuestion(
             assessment_id=db_assessment.id,
             question_text=question_data.question_text,
@@ -59,11 +64,11 @@ def create(db: Session, assessment_data: AssessmentCreate, created_by: int) -> A
             order=question_data.order,
             category_id=question_data.category_id
         )
-        print("Question object before commit:", db_question.__dict__)  # Debug logging
         db.add(db_question)
 
     db.commit()
     db.refresh(db_assessment)
+    assessment_analytics.invalidate()
     return db_assessment
 
 def update(db: Session, assessment_id: int, assessment_data: AssessmentUpdate) -> Optional[Assessment]:
@@ -129,6 +134,7 @@ def update(db: Session, assessment_id: int, assessment_data: AssessmentUpdate) -
 
     db.commit()
     db.refresh(db_assessment)
+    assessment_analytics.invalidate()
     return db_assessment
 
 def delete(db: Session, assessment_id: int) -> bool:
@@ -139,8 +145,57 @@ def delete(db: Session, assessment_id: int) -> bool:
 
     db.delete(db_assessment)
     db.commit()
+    assessment_analytics.invalidate()
     return True
 
+def reorder_questions(db: Session, assessment_id: int, orders: Dict[int, int]) -> int:
+    """Apply new ``order`` values to questions of an assessment in one statement.
+
+    Args:
+        db: Database session
+        assessment_id: ID of the assessment the questions must belong to
+        orders: Mapping of question ID to its new order value. Values may be
+            sparse (e.g. 100, 200, 150), so moving one question only needs
+            that question's row to change.
+
+    Returns:
+        Number of rows whose order actually changed
+
+    Raises:
+        ValueError: If any question ID does not belong to the assessment
+    """
+    if not orders:
+        return 0
+
+    # Validate ownership and read current orders with a single query
+    current = dict(
+        db.query(AssessmentQuestion.id, AssessmentQuestion.order).filter(
+            AssessmentQuestion.assessment_id == assessment_id,
+            AssessmentQuestion.id.in_(orders.keys())
+        ).all()
+    )
+    missing = set(orders) - set(current)
+    if missing:
+        raise ValueError(f"Questions not found in assessment: {sorted(missing)}")
+
+    # Only rewrite rows whose order is changing
+    changed = {qid: order for qid, order in orders.items() if current[qid] != order}
+    if not changed:
+        return 0
+
+    db.execute(
+        sql_update(AssessmentQuestion)
+        .where(
+            AssessmentQuestion.assessment_id == assessment_id,
+            AssessmentQuestion.id.in_(changed.keys())
+        )
+        .values(order=case(changed, value=AssessmentQuestion.id))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    assessment_analytics.invalidate()
+    return len(changed)
+
 def parse_options_string(options_str: str) -> list:
     """Parse options string in format 'a.Option1,b.Option2,c.Option3' into a list.
     
@@ -319,6 +374,7 @@ def import_from_csv(db: Session, csv_content: str, title: str, description: str
             db.add(question)
             
         db.commit()
+        assessment_analytics.invalidate()
         return assessment
         
     except (csv.Error, UnicodeDecodeError) as e:
@@ -387,16 +443,11 @@ def import_questions_to_existing(db: Session, assessment_id: int, csv_content: s
 
                 # First validate the correct answer since it's simpler
                 # Extract just the first character if it's a complex string
-                print(f"Raw correct_answer from row: {row.get('correct_answer')}")  # Debug print
-                print(f"Row keys: {row.keys()}")  # Debug print
-                print(f"Row values: {row}")  # Debug print
-                
                 correct_answer = str(row.get('correct_answer', '')).strip().lower()
-                print(f"Processed correct_answer: {correct_answer}")  # Debug print
+                logger.debug("Row %d: correct_answer %r", i, correct_answer)
                 
                 # Check if correct_answer is empty or None
                 if correct_answer is None or correct_answer == '':
-                    print(f"Row data for debugging: {row}")  # Debug print
                     raise ValueError(f"Missing correct_answer in row {i}")
 
                 # Handle different question types
@@ -411,7 +462,6 @@ def import_questions_to_existing(db: Session, assessment_id: int, csv_content: s
                     if '.' in correct_answer:
                         # If we got a full option instead of just the letter, take the first character
                         correct_answer = correct_answer.split('.')[0].strip().lower()
-                        print(f"Correct answer after splitting: {correct_answer}")  # Debug print
                     
                     if len(correct_answer) != 1 or not correct_answer.isalpha():
                         raise ValueError(f"Correct answer must be a single letter for multiple_choice, got '{correct_answer}'")
@@ -421,8 +471,6 @@ def import_questions_to_existing(db: Session, assessment_id: int, csv_content: s
                     if not options_str:
                         raise ValueError("Options string is empty")
 
-                    print(f"Processing options string: {options_str}")  # Debug print
-
                     # Find all letter prefixes first
                     prefixes = []
                     for letter in 'abcdefghijklmnopqrstuvwxyz':
@@ -452,13 +500,11 @@ def import_questions_to_existing(db: Session, assessment_id: int, csv_content: s
                         
                         if option_text:
                             cleaned_options.append(option_text)
-                            print(f"Added option {letter}: {option_text}")  # Debug print
 
                     if not cleaned_options:
                         raise ValueError("No valid options found after parsing")
 
-                    print(f"Final cleaned options: {cleaned_options}")  # Debug print
-                    print(f"Correct answer: {correct_answer}")  # Debug print
+                    logger.debug("Row %d: options %s, correct answer %r", i, cleaned_options, correct_answer)
 
                     # Validate the correct answer index
                     answer_index = ord(correct_answer) - ord('a')
@@ -500,14 +546,14 @@ def import_questions_to_existing(db: Session, assessment_id: int, csv_content: s
                     )
                     db.add(question)
                 except Exception as e:
-                    print(f"Error creating question object: {str(e)}")  # Debug print
-                    print(f"Question data: {row}")  # Debug print
+                    logger.debug("Error creating question from row %d %s: %s", i, row, str(e))
                     raise ValueError(f"Error creating question in row {i}: {str(e)}")
             except Exception as e:
                 raise ValueError(f"Error processing row {i}: {str(e)}")
             
         db.commit()
         db.refresh(assessment_obj)
+        assessment_analytics.invalidate()
         return assessment_obj
         
     except (csv.Error, UnicodeDecodeError) as e:
@@ -0,0 +1,200 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func, select
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime
+import json
+import math
+import threading
+import time
+
+from ..config import ANALYTICS_CACHE_TTL_SECONDS
+from ..models import AssessmentQuestion, AssessmentResponse, QuestionResponse, QuestionType
+
+# Thresholds used to flag questions for trainer review
+HARD_P_VALUE = 0.2
+EASY_P_VALUE = 0.95
+LOW_DISCRIMINATION = 0.2
+
+# Cached analytics keyed by ("assessment" | "category", id), with the time
+# they expire. Category results span assessments, so any submission, grade
+# or question edit clears the whole cache. That only reaches this worker's
+# cache; the others see the change once their entry expires.
+_cache: Dict[Tuple[str, int], Tuple[float, Dict[str, Any]]] = {}
+_cache_lock = threading.Lock()
+_generation = 0
+
+
+def invalidate() -> None:
+    """Drop all cached analytics. Call after submissions, grades or question edits."""
+    global _generation
+    with _cache_lock:
+        _cache.clear()
+        _generation += 1
+
+
+def _earned_points():
+    """SQL expression for points earned on a single question response.
+
+    Graded responses use ``points_awarded``; auto-scored multiple choice falls
+    back to ``is_correct``. Ungraded free-form answers yield NULL and are left
+    out of the statistics.
+    """
+    return case(
+        (QuestionResponse.points_awarded.isnot(None), QuestionResponse.points_awarded),
+        (QuestionResponse.is_correct.is_(True), AssessmentQuestion.points),
+        (QuestionResponse.is_correct.is_(False), 0),
+        else_=None
+    )
+
+
+def _point_biserial(n: int, se: float, see: float, st: float, stt: float, set_: float) -> Optional[float]:
+    """Corrected item-total correlation from running sums.
+
+    The item's own points are removed from each total (rest score) so a
+    question is not correlated with itself.
+    """
+    if n < 2:
+        return None
+    sr = st - se
+    srr = stt - 2 * set_ + see
+    ser = set_ - see
+    var_e = n * see - se * se
+    var_r = n * srr - sr * sr
+    if var_e <= 0 or var_r <= 0:
+        return None
+    return (n * ser - se * sr) / math.sqrt(var_e * var_r)
+
+
+def _compute(db: Session, scope_filter) -> Dict[str, Any]:
+    """Compute per-question statistics for all questions matching ``scope_filter``."""
+    questions = db.query(AssessmentQuestion).filter(scope_filter).order_by(
+        AssessmentQuestion.assessment_id, AssessmentQuestion.order, AssessmentQuestion.id
+    ).all()
+    if not questions:
+        return {"generated_at": datetime.utcnow(), "response_count": 0, "question_count": 0,
+                "mean_p_value": None, "questions": []}
+
+    assessment_ids = {q.assessment_id for q in questions}
+    earned = _earned_points()
+
+    # Total points earned per response across its whole assessment
+    totals = (
+        select(
+            QuestionResponse.assessment_response_id.label("response_id"),
+            func.sum(earned).label("total")
+        )
+        .join(AssessmentQuestion, AssessmentQuestion.id == QuestionResponse.question_id)
+        .where(AssessmentQuestion.assessment_id.in_(assessment_ids))
+        .group_by(QuestionResponse.assessment_response_id)
+        .subquery()
+    )
+
+    # One row of running sums per question
+    scored_total = case((earned.isnot(None), func.coalesce(totals.c.total, 0)), else_=None)
+    rows = db.execute(
+        select(
+            QuestionResponse.question_id,
+            func.count(QuestionResponse.id),
+            func.count(earned),
+            func.sum(earned),
+            func.sum(earned * earned),
+            func.sum(scored_total),
+            func.sum(scored_total * scored_total),
+            func.sum(earned * scored_total)
+        )
+        .join(AssessmentQuestion, AssessmentQuestion.id == QuestionResponse.question_id)
+        .join(totals, totals.c.response_id == QuestionResponse.assessment_response_id)
+        .where(scope_filter)
+        .group_by(QuestionResponse.question_id)
+    ).all()
+    sums = {row[0]: row[1:] for row in rows}
+
+    # Answer counts for multiple choice questions
+    distribution: Dict[int, Dict[str, int]] = {}
+    for question_id, answer, count in db.execute(
+        select(QuestionResponse.question_id, QuestionResponse.answer, func.count(QuestionResponse.id))
+        .join(AssessmentQuestion, AssessmentQuestion.id == QuestionResponse.question_id)
+        .where(scope_filter, AssessmentQuestion.question_type == QuestionType.multiple_choice)
+        .group_by(QuestionResponse.question_id, QuestionResponse.answer)
+    ):
+        distribution.setdefault(question_id, {})[answer] = count
+
+    response_count = db.query(func.count(AssessmentResponse.id)).filter(
+        AssessmentResponse.assessment_id.in_(assessment_ids)
+    ).scalar() or 0
+
+    results = []
+    for q in questions:
+        answered, n, se, see, st, stt, set_ = sums.get(q.id, (0, 0, 0, 0, 0, 0, 0))
+        se, see, st, stt, set_ = (float(v or 0) for v in (se, see, st, stt, set_))
+        points = q.points or 1
+        p_value = se / (n * points) if n else None
+        discrimination = _point_biserial(n, se, see, st, stt, set_)
+
+        flags = []
+        if p_value is not None and p_value < HARD_P_VALUE:
+            flags.append("too_hard")
+        if p_value is not None and p_value > EASY_P_VALUE:
+            flags.append("too_easy")
+        if discrimination is not None and discrimination < LOW_DISCRIMINATION:
+            flags.append("low_discrimination")
+
+        is_multiple_choice = q.question_type == QuestionType.multiple_choice
+        options = q.options
+        if isinstance(options, str):
+            try:
+                options = json.loads(options)
+            except json.JSONDecodeError:
+                options = None
+
+        results.append({
+            "question_id": q.id,
+            "assessment_id": q.assessment_id,
+            "category_id": q.category_id,
+            "question_text": q.question_text,
+            "question_type": q.question_type.value if hasattr(q.question_type, "value") else q.question_type,
+            "points": points,
+            "response_count": answered,
+            "scored_count": n,
+            "p_value": round(p_value, 4) if p_value is not None else None,
+            "discrimination": round(discrimination, 4) if discrimination is not None else None,
+            "average_points": round(se / n, 4) if n else None,
+            "option_distribution": distribution.get(q.id, {}) if is_multiple_choice else None,
+            "options": options if is_multiple_choice else None,
+            "correct_answer": q.correct_answer if is_multiple_choice else None,
+            "flags": flags
+        })
+
+    p_values = [r["p_value"] for r in results if r["p_value"] is not None]
+    return {
+        "generated_at": datetime.utcnow(),
+        "response_count": response_count,
+        "question_count": len(results),
+        "mean_p_value": round(sum(p_values) / len(p_values), 4) if p_values else None,
+        "questions": results
+    }
+
+
+def _cached(key: Tuple[str, int], scope_filter, db: Session,
+            ttl_seconds: float = ANALYTICS_CACHE_TTL_SECONDS) -> Dict[str, Any]:
+    with _cache_lock:
+        cached = _cache.get(key)
+        generation = _generation
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    result = {"scope": key[0], "scope_id": key[1], **_compute(db, scope_filter)}
+    with _cache_lock:
+        # Don't store results computed from data that changed mid-computation
+        if generation == _generation and ttl_seconds > 0:
+            _cache[key] = (time.monotonic() + ttl_seconds, result)
+    return result
+
+
+def get_for_assessment(db: Session, assessment_id: int) -> Dict[str, Any]:
+    """Get per-question difficulty and discrimination stats for an assessment."""
+    return _cached(("assessment", assessment_id), AssessmentQuestion.assessment_id == assessment_id, db)
+
+
+def get_for_category(db: Session, category_id: int) -> Dict[str, Any]:
+    """Get per-question stats for every question in a category, across assessments."""
+    return _cached(("category", category_id), AssessmentQuestion.category_id == category_id, db)
@@ -1,10 +1,12 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from sqlalchemy import func, or_, update as sql_update
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
 from fastapi import HTTPException
 
-from ..models import AssessmentResponse, QuestionResponse, AssessmentQuestion
+from ..models import AssessmentResponse, QuestionResponse, AssessmentQuestion, Assessment, AssessmentStatus, TeamRoster
 from ..schemas import AssessmentResponseCreate, AssessmentResponseUpdate, QuestionResponseCreate, QuestionResponseUpdate
+from . import assessment_analytics
 
 def get(db: Session, response_id: int) -> Optional[AssessmentResponse]:
     """Get an assessment response by ID."""
@@ -66,6 +68,7 @@ def create(db: Session, assessment_id: int, operator_id: int, response_data: Ass
 
     db.commit()
     db.refresh(db_response)
+    assessment_analytics.invalidate()
     return db_response
 
 def update_grades(db: Session, response_id: int, grades: List[QuestionResponseUpdate], grader_id: int) -> AssessmentResponse:
@@ -101,15 +104,18 @@ def update_grades(db: Session, response_id: int, grades: List[QuestionResponseUp
     # Calculate final score as a percentage
     final_score = round((total_score / total_possible) * 100) if total_possible > 0 else 0
 
-    # Update the response
+    # Update the response and release any grading queue claim
     response.score = total_score  # Store raw score
     response.final_score = final_score  # Store percentage
-    response.grader_id = grader_id
+    response.graded_by = grader_id
     response.graded_at = datetime.utcnow()
     response.status = "graded"
+    response.claimed_by = None
+    response.claim_expires_at = None
 
     db.commit()
     db.refresh(response)
+    assessment_analytics.invalidate()
     return response
 
 def get_by_assessment(db: Session, assessment_id: int) -> List[AssessmentResponse]:
@@ -128,4 +134,157 @@ def delete(db: Session, response_id: int) -> None:
     
     # Then delete the response itself
     db.delete(response)
-    db.commit() 
\ No newline at end of file
+    db.commit()
+    assessment_analytics.invalidate() 
+
+def _claim_available(now: datetime):
+    """Filter for responses that are unclaimed or whose lease has expired."""
+    return or_(
+        AssessmentResponse.claim_expires_at.is_(None),
+        AssessmentResponse.claim_expires_at < now
+    )
+
+def _queue_items(db: Session, *filters, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+    """Load pending responses with their assessment title and operator/claimer names in one query."""
+    now = datetime.utcnow()
+    query = (
+        db.query(
+            AssessmentResponse.id,
+            AssessmentResponse.assessment_id,
+            Assessment.title,
+            AssessmentResponse.operator_id,
+            TeamRoster.name,
+            AssessmentResponse.completed_at,
+            AssessmentResponse.claimed_by,
+            AssessmentResponse.claim_expires_at
+        )
+        .join(Assessment, Assessment.id == AssessmentResponse.assessment_id)
+        .outerjoin(TeamRoster, TeamRoster.id == AssessmentResponse.operator_id)
+        .filter(AssessmentResponse.status == AssessmentStatus.pending_review, *filters)
+        .order_by(AssessmentResponse.completed_at.asc(), AssessmentResponse.id.asc())
+    )
+    if offset:
+        query = query.offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+
+    items = []
+    for row in query.all():
+        claim_active = row.claim_expires_at is not None and row.claim_expires_at >= now
+        items.append({
+            "response_id": row.id,
+            "assessment_id": row.assessment_id,
+            "assessment_title": row.title,
+            "operator_id": row.operator_id,
+            "operator_name": row.name,
+            "completed_at": row.completed_at,
+            "age_seconds": int((now - row.completed_at).total_seconds()) if row.completed_at else None,
+            "claimed_by": row.claimed_by if claim_active else None,
+            "claim_expires_at": row.claim_expires_at if claim_active else None
+        })
+    return items
+
+def get_pending_queue(db: Session, limit: int = 50, offset: int = 0, unclaimed_only: bool = False) -> List[Dict[str, Any]]:
+    """List responses awaiting review, oldest submission first."""
+    filters = [_claim_available(datetime.utcnow())] if unclaimed_only else []
+    return _queue_items(db, *filters, limit=limit, offset=offset)
+
+def claim_next(db: Session, grader_id: int, count: int, lease_minutes: int) -> List[Dict[str, Any]]:
+    """Claim up to ``count`` of the oldest unclaimed pending responses for a grader.
+
+    The claim is a conditional UPDATE that only succeeds for rows that are
+    still unclaimed, so concurrent graders never receive the same response.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(minutes=lease_minutes)
+
+    candidate_ids = [
+        row.id for row in db.query(AssessmentResponse.id)
+        .filter(AssessmentResponse.status == AssessmentStatus.pending_review, _claim_available(now))
+        .order_by(AssessmentResponse.completed_at.asc(), AssessmentResponse.id.asc())
+        .limit(count)
+        .all()
+    ]
+    if not candidate_ids:
+        return []
+
+    db.execute(
+        sql_update(AssessmentResponse)
+        .where(
+            AssessmentResponse.id.in_(candidate_ids),
+            AssessmentResponse.status == AssessmentStatus.pending_review,
+            _claim_available(now)
+        )
+        .values(claimed_by=grader_id, claim_expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    # Return only the rows this call actually won
+    return _queue_items(
+        db,
+        AssessmentResponse.id.in_(candidate_ids),
+        AssessmentResponse.claimed_by == grader_id,
+        AssessmentResponse.claim_expires_at == expires_at
+    )
+
+def release_claim(db: Session, response_id: int, grader_id: Optional[int] = None) -> bool:
+    """Release a claim on a response. If ``grader_id`` is given, only that grader's claim is released."""
+    query = sql_update(AssessmentResponse).where(
+        AssessmentResponse.id == response_id,
+        AssessmentResponse.claimed_by.isnot(None)
+    )
+    if grader_id is not None:
+        query = query.where(AssessmentResponse.claimed_by == grader_id)
+    result = db.execute(
+        query.values(claimed_by=None, claim_expires_at=None).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount > 0
+
+def is_claimed_by_other(response: AssessmentResponse, grader_id: int) -> bool:
+    """Whether another grader holds a live claim on the response."""
+    return (
+        response.claimed_by is not None
+        and response.claimed_by != grader_id
+        and response.claim_expires_at is not None
+        and response.claim_expires_at >= datetime.utcnow()
+    )
+
+def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 1)
+
+def get_queue_metrics(db: Session, window_days: int = 30) -> Dict[str, Any]:
+    """Queue depth and grading latency (submission to grade) over the last ``window_days``."""
+    now = datetime.utcnow()
+    pending = AssessmentResponse.status == AssessmentStatus.pending_review
+
+    depth = db.query(func.count(AssessmentResponse.id)).filter(pending).scalar() or 0
+    claimed = db.query(func.count(AssessmentResponse.id)).filter(
+        pending, AssessmentResponse.claim_expires_at >= now
+    ).scalar() or 0
+    oldest = db.query(func.min(AssessmentResponse.completed_at)).filter(pending).scalar()
+
+    graded = db.query(AssessmentResponse.completed_at, AssessmentResponse.graded_at).filter(
+        AssessmentResponse.status == AssessmentStatus.graded,
+        AssessmentResponse.graded_at >= now - timedelta(days=window_days),
+        AssessmentResponse.completed_at.isnot(None)
+    ).all()
+    latencies = sorted(
+        (graded_at - completed_at).total_seconds() for completed_at, graded_at in graded
+    )
+
+    return {
+        "queue_depth": depth,
+        "claimed": claimed,
+        "unclaimed": depth - claimed,
+        "oldest_pending_age_seconds": int((now - oldest).total_seconds()) if oldest else None,
+        "window_days": window_days,
+        "graded_in_window": len(latencies),
+        "latency_avg_seconds": round(sum(latencies) / len(latencies), 1) if latencies else None,
+        "latency_p50_seconds": _percentile(latencies, 50),
+        "latency_p95_seconds": _percentile(latencies, 95)
+    }
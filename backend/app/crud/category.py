@@ -1,3 +1,4 @@
+import logging
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -5,6 +6,8 @@ from datetime import datetime
 from ..models import QuestionCategory
 from ..schemas import QuestionCategoryCreate
 
+logger = logging.getLogger(__name__)
+
 def get_all(db: Session) -> List[QuestionCategory]:
     """Get all question categories."""
     return db.query(QuestionCategory).order_by(QuestionCategory.name).all()
@@ -29,15 +32,13 @@ def create(db: Session, category_data: QuestionCategoryCreate) -> QuestionCatego
 
 def get_or_create(db: Session, name: str) -> QuestionCategory:
     """Get an existing category by name or create a new one."""
-    print(f"Looking for category with name: {name}")  # Debug logging
     existing = get_by_name(db, name)
     if existing:
-        print(f"Found existing category: {existing.__dict__}")  # Debug logging
+        logger.debug("Found existing category %r (id %s)", name, existing.id)
         return existing
     
-    print(f"Creating new category with name: {name}")  # Debug logging
     new_category = QuestionCategory(name=name)
     db.add(new_category)
     db.flush()  # Flush to get the ID
-    print(f"Created new category: {new_category.__dict__}")  # Debug logging
+    logger.debug("Created category %r (id %s)", name, new_category.id)
     return new_category 
\ No newline at end of file
@@ -1,3 +1,4 @@
+import logging
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session, joinedload
 from ..utils.db_utils import CRUDBase
@@ -9,6 +10,8 @@ from ..schemas import (
 )
 from ..enums import OperatorLevel
 
+logger = logging.getLogger(__name__)
+
 
 class CRUDJQRItem(CRUDBase[JQRItem, JQRItemUpdate, JQRItemUpdate]):
     """CRUD operations for JQR Items"""
@@ -74,21 +77,21 @@ class CRUDJQRTracker(CRUDBase[JQRTracker, JQRTrackerCreate, JQRTrackerUpdate]):
         try:
             # Get all active operators
             operators = db.query(TeamRoster).filter(TeamRoster.active == True).all()
-            print(f"Found {len(operators)} active operators")
+            logger.debug("Found %d active operators", len(operators))
             
             # Get all JQR items
             jqr_items = jqr_item.get_all(db)
-            print(f"Found {len(jqr_items)} JQR items")
+            logger.debug("Found %d JQR items", len(jqr_items))
             
             # Get operator levels
             operator_levels = {}
             for op in operators:
                 operator_levels[op.name] = op.operator_level
-            print(f"Operator levels: {operator_levels}")
+            logger.debug("Operator levels: %s", operator_levels)
             
             # Get existing tracker items
             existing_items = self.get_all(db)
-            print(f"Found {len(existing_items)} existing tracker items")
+            logger.debug("Found %d existing tracker items", len(existing_items))
             
             # Create a set of existing item IDs for quick lookup
             existing_item_ids = {f"{item.operator_name}_{item.task_id}" for item in existing_items}
@@ -103,14 +106,14 @@ class CRUDJQRTracker(CRUDBase[JQRTracker, JQRTrackerCreate, JQRTrackerUpdate]):
             # Remove orphaned tracker items (where JQR item no longer exists)
             for tracker_item in existing_items:
                 if tracker_item.task_id not in valid_jqr_ids:
-                    print(f"Removing orphaned tracker item: {tracker_item.operator_name} - Task ID {tracker_item.task_id}")
+                    logger.debug("Removing orphaned tracker item: %s - Task ID %s", tracker_item.operator_name, tracker_item.task_id)
                     db.delete(tracker_item)
                     deleted_count += 1
                     existing_item_ids.discard(f"{tracker_item.operator_name}_{tracker_item.task_id}")
             
             # Process each operator
             for op in operators:
-                print(f"Processing operator: {op.name}, level: {op.operator_level.value}")
+                logger.debug("Processing operator: %s, level: %s", op.name, op.operator_level.value)
                 
                 # For each JQR item
                 for item in jqr_items:
@@ -140,12 +143,12 @@ class CRUDJQRTracker(CRUDBase[JQRTracker, JQRTrackerCreate, JQRTrackerUpdate]):
                             db.add(tracker_item)
                             created_count += 1
                             existing_item_ids.add(item_key)
-                            print(f"Created tracker item for {op.name} - Task: {item.question}")
+                            logger.debug("Created tracker item for %s - Task: %s", op.name, item.question)
             
             # Commit all changes
             db.commit()
-            print(f"Total new entries created: {created_count}")
-            print(f"Total orphaned entries deleted: {deleted_count}")
+            logger.info("JQR roster sync created %d tracker entries and deleted %d orphaned ones",
+                        created_count, deleted_count)
             
             return {
                 "new_entries_created": created_count,
@@ -154,7 +157,7 @@ class CRUDJQRTracker(CRUDBase[JQRTracker, JQRTrackerCreate, JQRTrackerUpdate]):
             
         except Exception as e:
             db.rollback()
-            print(f"Error in sync_with_roster: {str(e)}")
+            logger.error("Error in sync_with_roster: %s", str(e), exc_info=True)
             raise e
     
     @staticmethod
@@ -1,18 +1,18 @@
 # backend/app/database.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 import os
-from .models import Base
-
-# Create data directory if it doesn't exist
-os.makedirs("/app/data", exist_ok=True)
+from .slow_queries import slow_query_log
 
 # Use a file-based SQLite database
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/rt3.db")
 
-# For SQLite, add the check_same_thread parameter
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# SQLite connections are shared with the threadpool; other drivers reject the argument.
+# Nothing connects until the first query, and the schema is created and migrated
+# by app.bootstrap before the workers start, not here.
+connect_args = {"check_same_thread": False} if make_url(DATABASE_URL).get_backend_name() == "sqlite" else {}
+engine = create_engine(DATABASE_URL, connect_args=connect_args)
+# Log statements slower than SLOW_QUERY_MS with their query plans
+slow_query_log.attach(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Create the tables. In production, consider using migrations.
-Base.metadata.create_all(bind=engine)
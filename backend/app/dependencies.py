@@ -2,8 +2,11 @@ from typing import Generator, Callable
 from sqlalchemy.orm import Session
 from .database import SessionLocal
 from .auth import get_current_user, admin_required
+from .principal_cache import Principal
+from .enums import Role
+from .roles import has_role
 from fastapi import Depends, HTTPException, Path
-from .models import RedTeamTraining, Certification, VendorTraining, SkillLevelHistory, TeamRoster
+from .models import RedTeamTraining, Certification, VendorTraining, SkillLevelHistory
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -36,20 +39,20 @@ def create_owner_or_admin_required(record_type: str) -> Callable:
     async def owner_or_admin_required(
         id: int = Path(..., gt=0),  # Changed from record_id to id to match path parameter
         db: Session = Depends(get_db),
-        user: TeamRoster = Depends(get_current_user)
-    ) -> TeamRoster:
+        user: Principal = Depends(get_current_user)
+    ) -> Principal:
         """
         Dependency to check if the user is either an admin or the owner of the record.
         
         Args:
             id: ID of the record to check (from path parameter)
             db: Database session
-            user: Current user information
+            user: Current user's token claims
         
         Returns:
             The user if authorized, otherwise raises HTTPException
         """
-        if "ADMIN" in user.team_role.upper():
+        if has_role(user, Role.ADMIN):
             return user
             
         # Get the record from the appropriate table
@@ -0,0 +1,33 @@
+"""
+The LDAP authenticator, imported on first use.
+
+ldap3 is one of the slower imports in a worker's boot and most
+deployments never enable LDAP, so app.ldap_auth is only imported when
+LDAP_ENABLED is set or LDAP is switched on at runtime.
+"""
+
+import sys
+
+from .config import LDAP_ENABLED
+
+_MODULE = __name__.rpartition(".")[0] + ".ldap_auth"
+
+
+class DirectoryUnavailable(Exception):
+    """The directory could not be reached to check a login"""
+
+
+def authenticator():
+    """The process-wide LDAPAuthenticator, importing ldap3 if needed"""
+    from .ldap_auth import ldap_auth
+    return ldap_auth
+
+
+def loaded() -> bool:
+    return _MODULE in sys.modules
+
+
+def enabled() -> bool:
+    if LDAP_ENABLED or loaded():
+        return authenticator().enabled
+    return False
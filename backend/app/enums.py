@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, IntFlag
 
 class OperatorLevel(str, Enum):
     team_member = "Team Member"
@@ -14,4 +14,19 @@ class UserRole(str, Enum):
     ADMIN = "ADMIN"
     OPERATOR = "OPERATOR"
     PLANNER = "PLANNER"
-    USER = "USER"  # Legacy value for compatibility 
\ No newline at end of file
+    USER = "USER"  # Legacy value for compatibility
+
+class Role(IntFlag):
+    """Team roles, stored as bits of TeamRoster.role_flags"""
+    ADMIN = 1
+    OPERATOR = 2
+    PLANNER = 4
+    DEVELOPER = 8
+    INFRASTRUCTURE = 16
+    BRANCH_CHIEF = 32
+    TEAM_MEMBER = 64
+
+class AuthSource(str, Enum):
+    """Backend that verifies a team member's password"""
+    local = "local"
+    ldap = "ldap"
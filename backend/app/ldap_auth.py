@@ -1,28 +1,358 @@
 import logging
 import ssl
 import os
-from typing import Optional, Dict, Any
-from ldap3 import Server, Connection, ALL, NTLM, SIMPLE, SUBTREE, Tls
-from ldap3.core.exceptions import LDAPException
+import threading
+import time
+from datetime import datetime
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Callable, Deque, Iterator, List, Tuple
+from ldap3 import Server, Connection, NONE, NTLM, SIMPLE, SUBTREE, SYNC, Tls
+from ldap3.core.exceptions import (
+    LDAPBindError, LDAPCommunicationError, LDAPException, LDAPResponseTimeoutError, LDAPStartTLSError
+)
+from ldap3.utils.conv import escape_filter_chars
 from sqlalchemy.orm import Session
 from .config import (
     LDAP_ENABLED, LDAP_HOST, LDAP_PORT, LDAP_BIND_DN, LDAP_BIND_PASSWORD,
     LDAP_BASE_DN, LDAP_USER_FILTER, LDAP_ATTRIBUTES, LDAP_ENCRYPTION,
     LDAP_ACTIVE_DIRECTORY, LDAP_LABEL, LDAP_CA_CERT_FILE, LDAP_VERIFY_SSL,
-    LDAP_TLS_VERSION
+    LDAP_TLS_VERSION, LDAP_POOL_SIZE, LDAP_POOL_TIMEOUT, LDAP_POOL_KEEPALIVE,
+    LDAP_SRV_DOMAIN, LDAP_SRV_CACHE_SECONDS, LDAP_SERVER_STRATEGY, LDAP_CONNECT_TIMEOUT,
+    LDAP_RECEIVE_TIMEOUT, LDAP_SERVER_RETRY_SECONDS, LDAP_CIRCUIT_FAILURE_THRESHOLD,
+    LDAP_CIRCUIT_RESET_SECONDS
 )
 from .models import TeamRoster
+from .enums import AuthSource
+from .utils.metrics_utils import LatencyWindow
 
 logger = logging.getLogger(__name__)
 
+
+# Errors that mean the server could not be reached or stopped answering,
+# as opposed to the directory rejecting a request
+_COMMUNICATION_ERRORS = (LDAPCommunicationError, LDAPResponseTimeoutError, LDAPStartTLSError)
+
+
+class LDAPUnavailable(LDAPException):
+    """The directory cannot be reached right now"""
+
+
+class LDAPCircuitOpen(LDAPUnavailable):
+    """Directory calls are being failed fast after repeated outages"""
+
+
+class LDAPPoolTimeout(LDAPUnavailable):
+    """No pooled connection became free within the pool timeout"""
+
+
+class LDAPCircuitBreaker:
+    """
+    Fails directory calls fast while the directory is down.
+
+    After ``failure_threshold`` consecutive failed calls the circuit opens
+    and calls are rejected for ``reset_seconds``. Then a single trial call is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self) -> None:
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+        raise LDAPCircuitOpen(f"LDAP directory unavailable, retrying in {retry_in:.0f}s")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                    logger.warning("LDAP circuit breaker opened after repeated directory failures")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """End a call whose outcome says nothing about directory health"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "trips": self.trips,
+                "rejected": self.rejected
+            }
+
+
+class LDAPServerSet:
+    """
+    The directory servers to try for each new connection, in order.
+
+    Servers come from a fixed list or from DNS SRV records, re-resolved after
+    the record TTL (capped at ``srv_cache_seconds``). Order is the configured
+    order (``first``) or rotates per connection (``round_robin``); a server
+    that fails to connect goes to the back of the order for ``retry_seconds``.
+    Connect, search and bind latency is tracked per server.
+    """
+
+    def __init__(
+        self,
+        make_server: Callable[[str, int], Server],
+        hosts: List[Tuple[str, int]],
+        strategy: str = "first",
+        retry_seconds: float = 30,
+        srv_domain: str = "",
+        srv_port: Optional[int] = None,
+        srv_cache_seconds: float = 300,
+        servers: Optional[List[Server]] = None
+    ):
+        self._make_server = make_server
+        self._hosts = hosts
+        self.strategy = strategy
+        self.retry_seconds = retry_seconds
+        self.srv_domain = srv_domain
+        self.srv_port = srv_port
+        self.srv_cache_seconds = srv_cache_seconds
+        self._lock = threading.Lock()
+        self._servers: Dict[Tuple[str, int], Server] = {}
+        self._order: List[Server] = list(servers or [])
+        self._fixed = servers is not None
+        self._srv_expires = 0.0
+        self._next = 0
+        self._health: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _key(server: Server) -> str:
+        return f"{server.host}:{server.port}"
+
+    def _resolve_srv(self) -> Tuple[List[Tuple[str, int]], float]:
+        # dnspython is installed as a dependency of email-validator
+        import dns.resolver
+        answer = dns.resolver.resolve(f"_ldap._tcp.{self.srv_domain}", "SRV", lifetime=LDAP_CONNECT_TIMEOUT)
+        records = sorted(answer, key=lambda record: (record.priority, -record.weight))
+        hosts = [(str(record.target).rstrip("."), self.srv_port or record.port) for record in records]
+        return hosts, min(float(answer.rrset.ttl), self.srv_cache_seconds)
+
+    def _current(self) -> List[Server]:
+        with self._lock:
+            if self._fixed or (self._order and time.monotonic() < self._srv_expires):
+                return list(self._order)
+            hosts, ttl = self._hosts, self.srv_cache_seconds
+            if self.srv_domain:
+                try:
+                    hosts, ttl = self._resolve_srv()
+                except Exception as e:
+                    # Keep using the last known servers rather than failing logins
+                    logger.warning(f"SRV lookup for {self.srv_domain} failed: {e}")
+                    hosts = [(s.host, s.port) for s in self._order] or self._hosts
+                    ttl = min(60.0, self.srv_cache_seconds)
+            for host in hosts:
+                if host not in self._servers:
+                    self._servers[host] = self._make_server(*host)
+            self._order = [self._servers[host] for host in hosts]
+            self._srv_expires = time.monotonic() + ttl
+            return list(self._order)
+
+    def candidates(self) -> List[Server]:
+        """Servers to try for a new connection, healthy ones first"""
+        servers = self._current()
+        now = time.monotonic()
+        with self._lock:
+            down = {key for key, health in self._health.items() if health["down_until"] > now}
+            healthy = [s for s in servers if self._key(s) not in down]
+            if self.strategy == "round_robin" and healthy:
+                start = self._next % len(healthy)
+                self._next += 1
+                healthy = healthy[start:] + healthy[:start]
+        return healthy + [s for s in servers if self._key(s) in down]
+
+    def _health_for(self, server: Server) -> Dict[str, Any]:
+        key = self._key(server)
+        health = self._health.get(key)
+        if health is None:
+            health = self._health[key] = {
+                "connect": LatencyWindow(), "search": LatencyWindow(), "bind": LatencyWindow(),
+                "failures": 0, "last_error": None, "down_until": 0.0
+            }
+        return health
+
+    def record(self, server: Server, operation: str, seconds: float) -> None:
+        with self._lock:
+            health = self._health_for(server)
+            if operation == "connect":
+                health["down_until"] = 0.0
+        health[operation].record(seconds)
+
+    def record_failure(self, server: Server, error: Exception) -> None:
+        with self._lock:
+            health = self._health_for(server)
+            health["failures"] += 1
+            health["last_error"] = str(error)
+            health["down_until"] = time.monotonic() + self.retry_seconds
+        logger.warning(f"LDAP server {self._key(server)} failed: {error}")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            health = dict(self._health)
+        return {
+            key: {
+                "available": entry["down_until"] <= now,
+                "failures": entry["failures"],
+                "last_error": entry["last_error"],
+                "connect": entry["connect"].summary(),
+                "search": entry["search"].summary(),
+                "bind": entry["bind"].summary()
+            }
+            for key, entry in health.items()
+        }
+
+
+class LDAPConnectionPool:
+    """
+    Bounded pool of bound service-account connections.
+
+    Each connection is used by one thread at a time. Connections idle for
+    longer than ``keepalive`` seconds are health-checked before reuse, and
+    any connection that raises an LDAP error is discarded rather than
+    returned, so the next checkout reconnects.
+    """
+
+    def __init__(self, factory: Callable[[], Connection], size: int, timeout: float, keepalive: float):
+        self._factory = factory
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle: Deque[Tuple[Connection, float]] = deque()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.health_checks = 0
+        self.timeouts = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise LDAPPoolTimeout(f"No LDAP connection available within {self.timeout}s")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except LDAPException:
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+            self._slots.release()
+
+    def _checkout(self) -> Connection:
+        while True:
+            with self._lock:
+                conn, last_used = self._idle.pop() if self._idle else (None, 0.0)
+            if conn is None:
+                conn = self._factory()
+                with self._lock:
+                    self.created += 1
+                return conn
+            if conn.closed or not conn.bound:
+                self._discard(conn)
+                continue
+            if time.monotonic() - last_used > self.keepalive:
+                with self._lock:
+                    self.health_checks += 1
+                try:
+                    conn.extend.standard.who_am_i()
+                except LDAPException as e:
+                    logger.info(f"Discarding stale LDAP connection: {e}")
+                    self._discard(conn)
+                    continue
+            with self._lock:
+                self.reused += 1
+            return conn
+
+    def _discard(self, conn: Connection) -> None:
+        with self._lock:
+            self.discarded += 1
+        try:
+            conn.unbind()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Unbind all idle connections"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            try:
+                conn.unbind()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "health_checks": self.health_checks,
+                "timeouts": self.timeouts
+            }
+
+
 class LDAPAuthenticator:
-    def __init__(self):
+    def __init__(self, server: Optional[Server] = None, client_strategy: str = SYNC):
+        """
+        ``server`` and ``client_strategy`` are normally left as defaults; tests
+        pass an ldap3 mock server with MOCK_SYNC.
+        """
         self.enabled = LDAP_ENABLED
-        if not self.enabled:
-            logger.info("LDAP authentication is disabled")
-            return
-            
+        self.client_strategy = client_strategy
+        self._fixed_server = server
+        self._server_set: Optional[LDAPServerSet] = None
+        self._server_lock = threading.Lock()
+        self._pool: Optional[LDAPConnectionPool] = None
+        self.breaker = LDAPCircuitBreaker(LDAP_CIRCUIT_FAILURE_THRESHOLD, LDAP_CIRCUIT_RESET_SECONDS)
         self.host = LDAP_HOST
+        self.srv_domain = LDAP_SRV_DOMAIN
+        self.server_strategy = LDAP_SERVER_STRATEGY
+        self.receive_timeout = LDAP_RECEIVE_TIMEOUT
         self.port = LDAP_PORT
         self.bind_dn = LDAP_BIND_DN
         self.bind_password = LDAP_BIND_PASSWORD
@@ -34,8 +364,12 @@ class LDAPAuthenticator:
         self.ca_cert_file = LDAP_CA_CERT_FILE
         self.verify_ssl = LDAP_VERIFY_SSL
         self.tls_version = LDAP_TLS_VERSION
+
+        if not self.enabled:
+            logger.info("LDAP authentication is disabled")
+            return
         
-        if not all([self.host, self.bind_dn, self.bind_password, self.base_dn]):
+        if not all([self.host or self.srv_domain, self.bind_dn, self.bind_password, self.base_dn]):
             logger.warning("LDAP configuration incomplete, LDAP authentication will be disabled")
             self.enabled = False
             return
@@ -80,97 +414,271 @@ class LDAPAuthenticator:
             logger.error(f"Error creating TLS configuration: {e}")
             return None
 
+    def _hosts(self) -> List[Tuple[str, int]]:
+        """Parse LDAP_HOST as a comma-separated list of host or host:port entries"""
+        hosts = []
+        for entry in (self.host or "").split(","):
+            entry = entry.strip()
+            if not entry:
+                continue
+            host, _, port = entry.rpartition(":")
+            if host and port.isdigit():
+                hosts.append((host, int(port)))
+            else:
+                hosts.append((entry, self.port))
+        return hosts
+
+    @property
+    def servers(self) -> LDAPServerSet:
+        """
+        The directory servers, created once along with their TLS context.
+        Schema and DSA info are not needed to search or bind, so none is fetched.
+        """
+        if self._server_set is None:
+            with self._server_lock:
+                if self._server_set is None:
+                    use_ssl = self.encryption in ["simple_tls", "start_tls"]
+                    tls_config = self._create_tls_config()
+
+                    def make_server(host: str, port: int) -> Server:
+                        return Server(
+                            host,
+                            port=port,
+                            use_ssl=use_ssl,
+                            get_info=NONE,
+                            tls=tls_config,
+                            connect_timeout=LDAP_CONNECT_TIMEOUT
+                        )
+
+                    self._server_set = LDAPServerSet(
+                        make_server,
+                        self._hosts(),
+                        strategy=self.server_strategy,
+                        retry_seconds=LDAP_SERVER_RETRY_SECONDS,
+                        srv_domain=self.srv_domain,
+                        # SRV advertises the plain LDAP port; LDAPS keeps the configured one
+                        srv_port=self.port if self.encryption == "simple_tls" else None,
+                        srv_cache_seconds=LDAP_SRV_CACHE_SECONDS,
+                        servers=[self._fixed_server] if self._fixed_server is not None else None
+                    )
+        return self._server_set
+
     def _get_server(self) -> Server:
-        """Create LDAP server connection"""
-        use_ssl = self.encryption in ["simple_tls", "start_tls"]
-        tls_config = self._create_tls_config()
-        
-        return Server(
-            self.host, 
-            port=self.port, 
-            use_ssl=use_ssl, 
-            get_info=ALL,
-            tls=tls_config
-        )
+        """The server a new connection would try first"""
+        return self.servers.candidates()[0]
 
-    def _get_bind_connection(self) -> Optional[Connection]:
-        """Create connection with service account bind"""
-        try:
-            server = self._get_server()
+    def _connect(self, user: str, password: str, read_only: bool = False) -> Connection:
+        """Open an unbound connection, failing over across servers"""
+        last_error: Optional[Exception] = None
+        for server in self.servers.candidates():
             conn = Connection(
                 server,
-                user=self.bind_dn,
-                password=self.bind_password,
+                user=user,
+                password=password,
                 authentication=SIMPLE,
-                auto_bind=True
+                client_strategy=self.client_strategy,
+                receive_timeout=self.receive_timeout,
+                read_only=read_only
             )
-            
-            if self.encryption == "start_tls":
-                conn.start_tls()
-                
+            started = time.perf_counter()
+            try:
+                conn.open()
+            except _COMMUNICATION_ERRORS as e:
+                self.servers.record_failure(server, e)
+                last_error = e
+                continue
+            self.servers.record(server, "connect", time.perf_counter() - started)
             return conn
+        raise LDAPUnavailable(f"No LDAP server reachable: {last_error}")
+
+    def _get_bind_connection(self) -> Optional[Connection]:
+        """Create connection with service account bind"""
+        try:
+            return self._open_bind_connection()
         except LDAPException as e:
             logger.error(f"Failed to bind to LDAP server: {e}")
             return None
 
-    def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
-        """Authenticate user against LDAP and return user info"""
-        if not self.enabled:
-            return None
-            
+    def _open_bind_connection(self) -> Connection:
+        conn = self._connect(self.bind_dn, self.bind_password)
+        if not conn.bind():
+            raise LDAPBindError(f"Service account bind failed: {conn.result.get('description') if conn.result else conn.last_error}")
+
+        if self.encryption == "start_tls":
+            conn.start_tls()
+
+        return conn
+
+    @contextmanager
+    def _directory_call(self) -> Iterator[None]:
+        """Run a directory operation under the circuit breaker, reporting outages as LDAPUnavailable"""
+        self.breaker.allow()
+        try:
+            yield
+        except LDAPPoolTimeout:
+            self.breaker.release()
+            raise
+        except LDAPUnavailable:
+            self.breaker.record_failure()
+            raise
+        except _COMMUNICATION_ERRORS as e:
+            self.breaker.record_failure()
+            raise LDAPUnavailable(str(e)) from e
+        except BaseException:
+            self.breaker.release()
+            raise
+        else:
+            self.breaker.record_success()
+
+    @property
+    def pool(self) -> LDAPConnectionPool:
+        """Service-account connection pool, created on first use"""
+        if self._pool is None:
+            with self._server_lock:
+                if self._pool is None:
+                    self._pool = LDAPConnectionPool(
+                        self._open_bind_connection, LDAP_POOL_SIZE, LDAP_POOL_TIMEOUT, LDAP_POOL_KEEPALIVE
+                    )
+        return self._pool
+
+    def _search_user(self, username: str):
+        """Find the user's entry with a pooled service-account connection"""
+        search_filter = f"(&({self.attributes['username']}={escape_filter_chars(username)}){self.user_filter})"
+        # A pooled connection may have been dropped by the server while idle;
+        # the pool discards it on error, so one retry gets a fresh connection
+        for attempt in range(2):
+            try:
+                with self.pool.connection() as conn:
+                    started = time.perf_counter()
+                    conn.search(
+                        search_base=self.base_dn,
+                        search_filter=search_filter,
+                        search_scope=SUBTREE,
+                        attributes=list(self.attributes.values())
+                    )
+                    self.servers.record(conn.server, "search", time.perf_counter() - started)
+                    return conn.entries[0] if conn.entries else None
+            except LDAPUnavailable:
+                # Every server was already tried; retrying would only repeat the timeouts
+                raise
+            except LDAPException as e:
+                if attempt:
+                    raise
+                logger.info(f"Retrying LDAP search after connection error: {e}")
+
+    def _verify_user_credentials(self, user_dn: str, password: str) -> bool:
+        """Bind as the user on a short-lived connection that is never pooled"""
+        user_conn = self._connect(user_dn, password, read_only=True)
         try:
-            # First, bind with service account to search for user
-            conn = self._get_bind_connection()
-            if not conn:
-                logger.error("Failed to establish LDAP bind connection")
-                return None
-
-            # Search for user
-            search_filter = f"(&({self.attributes['username']}={username}){self.user_filter})"
-            conn.search(
+            started = time.perf_counter()
+            bound = user_conn.bind()
+            self.servers.record(user_conn.server, "bind", time.perf_counter() - started)
+            if not bound:
+                return False
+            if self.encryption == "start_tls":
+                user_conn.start_tls()
+            return user_conn.bound
+        finally:
+            try:
+                user_conn.unbind()
+            except Exception:
+                pass
+
+    def _user_info(self, attributes: Dict[str, Any], dn: str, username: str = "") -> Dict[str, Any]:
+        """Map directory attributes to the user info dict used for roster records"""
+        def first(key: str, default: str = "") -> str:
+            value = attributes.get(self.attributes[key])
+            if isinstance(value, (list, tuple)):
+                value = value[0] if value else None
+            return str(value) if value else default
+
+        return {
+            "username": first("username", username),
+            "name": first("name", username),
+            "email": first("email"),
+            "display_name": first("display_name"),
+            "given_name": first("given_name"),
+            "surname": first("surname"),
+            "dn": dn
+        }
+
+    @staticmethod
+    def display_name(ldap_user_info: Dict[str, Any]) -> str:
+        """Best available full name for a directory user"""
+        display_name = ldap_user_info["display_name"] or ldap_user_info["name"]
+        if not display_name and (ldap_user_info["given_name"] or ldap_user_info["surname"]):
+            display_name = f"{ldap_user_info['given_name'] or ''} {ldap_user_info['surname'] or ''}".strip()
+        return display_name or ldap_user_info["username"]
+
+    def iter_directory_users(self, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Yield user info for every account matching the user filter, fetched with
+        a paged search on one pooled connection. Each dict also carries a
+        ``disabled`` flag (Active Directory's ACCOUNTDISABLE bit).
+        """
+        attributes = list(self.attributes.values())
+        if self.active_directory:
+            attributes.append("userAccountControl")
+        search_filter = f"(&({self.attributes['username']}=*){self.user_filter})"
+
+        with self._directory_call(), self.pool.connection() as conn:
+            for item in conn.extend.standard.paged_search(
                 search_base=self.base_dn,
                 search_filter=search_filter,
                 search_scope=SUBTREE,
-                attributes=list(self.attributes.values())
-            )
+                attributes=attributes,
+                paged_size=page_size,
+                generator=True
+            ):
+                if item.get("type") != "searchResEntry":
+                    continue
+                info = self._user_info(item["attributes"], item["dn"])
+                if not info["username"]:
+                    continue
+                info["disabled"] = self._is_disabled(item["attributes"])
+                yield info
 
-            if not conn.entries:
-                logger.warning(f"User {username} not found in LDAP")
-                return None
+    def _is_disabled(self, attributes: Dict[str, Any]) -> bool:
+        if not self.active_directory:
+            return False
+        value = attributes.get("userAccountControl")
+        if isinstance(value, (list, tuple)):
+            value = value[0] if value else None
+        try:
+            return bool(int(value) & 0x2)
+        except (TypeError, ValueError):
+            return False
 
-            user_dn = conn.entries[0].entry_dn
-            entry = conn.entries[0]
+    def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
+        """Authenticate user against LDAP and return user info"""
+        if not self.enabled:
+            return None
+        if not password:
+            # An empty password would be an anonymous bind, which always succeeds
+            return None
+            
+        try:
+            with self._directory_call():
+                entry = self._search_user(username)
+                if entry is None:
+                    logger.warning(f"User {username} not found in LDAP")
+                    return None
 
-            # Now try to bind as the user to verify credentials
-            user_conn = Connection(
-                self._get_server(),
-                user=user_dn,
-                password=password,
-                authentication=SIMPLE,
-                auto_bind=True
-            )
+                user_dn = entry.entry_dn
 
-            if self.encryption == "start_tls":
-                user_conn.start_tls()
+                # Now try to bind as the user to verify credentials
+                if not self._verify_user_credentials(user_dn, password):
+                    logger.warning(f"Failed to authenticate user {username} with LDAP")
+                    return None
 
-            if not user_conn.bound:
-                logger.warning(f"Failed to authenticate user {username} with LDAP")
-                return None
-
-            # Extract user attributes using getattr
-            user_info = {
-                "username": getattr(entry, self.attributes["username"], [username])[0] if getattr(entry, self.attributes["username"], None) else username,
-                "name": getattr(entry, self.attributes["name"], [username])[0] if getattr(entry, self.attributes["name"], None) else username,
-                "email": getattr(entry, self.attributes["email"], [""])[0] if getattr(entry, self.attributes["email"], None) else "",
-                "display_name": getattr(entry, self.attributes["display_name"], [""])[0] if getattr(entry, self.attributes["display_name"], None) else "",
-                "given_name": getattr(entry, self.attributes["given_name"], [""])[0] if getattr(entry, self.attributes["given_name"], None) else "",
-                "surname": getattr(entry, self.attributes["surname"], [""])[0] if getattr(entry, self.attributes["surname"], None) else "",
-                "dn": user_dn
-            }
+            user_info = self._user_info(entry.entry_attributes_as_dict, user_dn, username)
 
             logger.info(f"Successfully authenticated user {username} via LDAP")
             return user_info
 
+        except LDAPUnavailable as e:
+            logger.error(f"LDAP directory unavailable while authenticating {username}: {e}")
+            raise
         except LDAPException as e:
             logger.error(f"LDAP authentication error for user {username}: {e}")
             return None
@@ -178,43 +686,73 @@ class LDAPAuthenticator:
             logger.error(f"Unexpected error during LDAP authentication for user {username}: {e}")
             return None
 
+    def close(self) -> None:
+        """Release pooled connections"""
+        if self._pool is not None:
+            self._pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool, circuit breaker and per-server latency figures"""
+        return {
+            "pool": self.pool.stats(),
+            "circuit": self.breaker.stats(),
+            "servers": self.servers.stats()
+        }
+
     def get_or_create_user(self, db: Session, ldap_user_info: Dict[str, Any]) -> Optional[TeamRoster]:
         """Get existing user or create new user from LDAP info"""
         try:
             # Import here to avoid circular import
-            from .auth import get_password_hash
+            from .auth import UNUSABLE_PASSWORD
             
-            # Try to find existing user by username or email
+            email = ldap_user_info["email"] or None
+
+            # Only the account with the same handle is this directory user's. One
+            # that merely shares the email is someone else's: converting it would
+            # hand that account to this login and destroy its local password.
             existing_user = db.query(TeamRoster).filter(
-                (TeamRoster.operator_handle == ldap_user_info["username"]) |
-                (TeamRoster.email == ldap_user_info["email"])
+                TeamRoster.operator_handle == ldap_user_info["username"]
             ).first()
+            if existing_user is None and email:
+                holder = db.query(TeamRoster.operator_handle).filter(TeamRoster.email == email).first()
+                if holder:
+                    logger.warning(
+                        f"Refusing LDAP login for {ldap_user_info['username']}: its email {email} "
+                        f"belongs to roster member {holder.operator_handle}"
+                    )
+                    return None
 
             if existing_user:
-                # Update user info from LDAP if needed
-                if not existing_user.email and ldap_user_info["email"]:
-                    existing_user.email = ldap_user_info["email"]
+                # Update user info from LDAP if needed; commit only when something
+                # changed so routine logins stay read-only
+                changed = False
+                if not existing_user.email and email:
+                    existing_user.email = email
+                    changed = True
                 if not existing_user.name and ldap_user_info["display_name"]:
                     existing_user.name = ldap_user_info["display_name"]
-                db.commit()
-                db.refresh(existing_user)
+                    changed = True
+                if existing_user.auth_source != AuthSource.ldap:
+                    # Route future logins straight to LDAP
+                    existing_user.auth_source = AuthSource.ldap
+                    existing_user.hashed_password = UNUSABLE_PASSWORD
+                    changed = True
+                if changed:
+                    db.commit()
+                    db.refresh(existing_user)
                 logger.info(f"Found existing user {ldap_user_info['username']}")
                 return existing_user
 
             # Create new user
-            display_name = ldap_user_info["display_name"] or ldap_user_info["name"]
-            if not display_name and (ldap_user_info["given_name"] or ldap_user_info["surname"]):
-                display_name = f"{ldap_user_info['given_name'] or ''} {ldap_user_info['surname'] or ''}".strip()
-
             new_user = TeamRoster(
-                name=display_name or ldap_user_info["username"],
+                name=self.display_name(ldap_user_info),
                 operator_handle=ldap_user_info["username"],
-                email=ldap_user_info["email"],
+                email=email,
                 team_role="OPERATOR",  # Default role for LDAP users
-                onboarding_date=db.query(db.func.current_date()).scalar(),
+                onboarding_date=datetime.utcnow().date(),
                 active=True,
-                # Generate a random password for LDAP users (they won't use it)
-                hashed_password=get_password_hash("ldap_user_" + ldap_user_info["username"])
+                auth_source=AuthSource.ldap,
+                hashed_password=UNUSABLE_PASSWORD
             )
 
             db.add(new_user)
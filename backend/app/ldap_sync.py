@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from .config import LDAP_SYNC_PAGE_SIZE
+from .database import SessionLocal
+from .enums import AuthSource, Role
+from .ldap_auth import LDAPAuthenticator, ldap_auth
+from .models import TeamRoster
+from .principal_cache import principal_cache
+
+logger = logging.getLogger(__name__)
+
+
+class SyncInProgress(Exception):
+    """Raised when a directory sync is requested while another is running"""
+
+
+_sync_lock = threading.Lock()
+last_sync_result: Optional[Dict[str, Any]] = None
+
+
+def sync_directory(
+    db: Session,
+    authenticator: LDAPAuthenticator = ldap_auth,
+    page_size: int = LDAP_SYNC_PAGE_SIZE
+) -> Dict[str, Any]:
+    """
+    Bring the roster in line with the LDAP directory.
+
+    The directory is read with a paged search and diffed against the roster
+    in memory; only the differences are written, as one bulk INSERT and one
+    bulk UPDATE in a single transaction:
+
+    - directory users missing from the roster are created as LDAP accounts
+    - LDAP accounts get their email from the directory, and a name if blank
+      (names are not overwritten because training records are keyed by them)
+    - LDAP accounts that are disabled in, or gone from, the directory are
+      deactivated
+
+    Local accounts are never modified.
+    """
+    global last_sync_result
+    if not authenticator.enabled:
+        raise ValueError("LDAP authentication is not enabled")
+    if not _sync_lock.acquire(blocking=False):
+        raise SyncInProgress()
+    try:
+        # Import here to avoid circular import
+        from .auth import UNUSABLE_PASSWORD
+
+        started = time.perf_counter()
+        directory = list(authenticator.iter_directory_users(page_size))
+
+        rows = db.query(
+            TeamRoster.id, TeamRoster.operator_handle, TeamRoster.email,
+            TeamRoster.name, TeamRoster.active, TeamRoster.auth_source, TeamRoster.token_version
+        ).all()
+        by_handle = {row.operator_handle: row for row in rows if row.operator_handle}
+        by_email = {row.email.lower(): row for row in rows if row.email}
+
+        today = datetime.utcnow().date()
+        inserts: List[Dict[str, Any]] = []
+        updates: List[Dict[str, Any]] = []
+        changed_handles = set()
+        seen_ids = set()
+        updated = 0
+        deactivated = 0
+
+        for info in directory:
+            email = info["email"] or None
+            row = by_handle.get(info["username"]) or (by_email.get(email.lower()) if email else None)
+
+            if row is None:
+                if info["disabled"] or info["username"] in by_handle:
+                    continue
+                if email and email.lower() in by_email:
+                    email = None
+                inserts.append({
+                    "name": authenticator.display_name(info),
+                    "operator_handle": info["username"],
+                    "email": email,
+                    "team_role": "OPERATOR",  # Default role for LDAP users
+                    # Bulk inserts skip the model's validator that derives this
+                    "role_flags": int(Role.OPERATOR),
+                    "onboarding_date": today,
+                    "active": True,
+                    "auth_source": AuthSource.ldap,
+                    "hashed_password": UNUSABLE_PASSWORD
+                })
+                # Reserve the handle and email against duplicates later in the listing
+                by_handle[info["username"]] = None
+                if email:
+                    by_email[email.lower()] = None
+                continue
+
+            seen_ids.add(row.id)
+            if row.auth_source != AuthSource.ldap:
+                continue
+
+            changes: Dict[str, Any] = {}
+            # Take the directory email unless another roster member already has it
+            if email and email != row.email and by_email.get(email.lower(), row) is row:
+                changes["email"] = email
+            if not row.name and info["display_name"]:
+                changes["name"] = info["display_name"]
+            if changes:
+                updated += 1
+            if info["disabled"] and row.active:
+                changes["active"] = False
+                deactivated += 1
+            if changes:
+                if "name" in changes or "active" in changes:
+                    # Tokens carry both as claims
+                    changes["token_version"] = row.token_version + 1
+                updates.append({"id": row.id, **changes})
+                changed_handles.add(row.operator_handle)
+
+        # LDAP accounts no longer returned by the search. An empty result is
+        # more likely a misconfigured filter than an empty directory, so skip.
+        if directory:
+            for row in rows:
+                if row.auth_source == AuthSource.ldap and row.active and row.id not in seen_ids:
+                    updates.append({"id": row.id, "active": False, "token_version": row.token_version + 1})
+                    changed_handles.add(row.operator_handle)
+                    deactivated += 1
+
+        if inserts:
+            db.execute(insert(TeamRoster), inserts)
+        if updates:
+            db.execute(update(TeamRoster), updates)
+        if inserts or updates:
+            db.commit()
+            # Bulk statements bypass the ORM events that normally evict cached principals
+            principal_cache.invalidate(*changed_handles)
+
+        if inserts:
+            # Create JQR tracker rows for the new operators
+            from .crud.jqr import jqr_tracker
+            jqr_tracker.sync_with_roster(db)
+
+        result = {
+            "directory_users": len(directory),
+            "created": len(inserts),
+            "updated": updated,
+            "deactivated": deactivated,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "finished_at": datetime.utcnow().isoformat()
+        }
+        last_sync_result = result
+        logger.info(f"LDAP directory sync finished: {result}")
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        _sync_lock.release()
+
+
+async def run_periodic_sync(interval_minutes: float) -> None:
+    """Run sync_directory every ``interval_minutes`` until cancelled"""
+    while True:
+        if ldap_auth.enabled:
+            db = SessionLocal()
+            try:
+                await run_in_threadpool(sync_directory, db)
+            except SyncInProgress:
+                logger.info("Skipping scheduled LDAP sync; another sync is running")
+            except Exception as e:
+                logger.error(f"Scheduled LDAP sync failed: {e}")
+            finally:
+                db.close()
+        await asyncio.sleep(interval_minutes * 60)
@@ -0,0 +1,153 @@
+import atexit
+import contextvars
+import copy
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+from pythonjsonlogger import jsonlogger
+
+from .config import (
+    LOG_BACKUPS, LOG_FILE, LOG_FORMAT, LOG_LEVEL, LOG_LEVELS, LOG_MAX_BYTES, LOG_QUEUE_SIZE, LOG_ROTATE_WHEN
+)
+
+# The id of the request being served; threadpool workers see it through the
+# request's copied context
+request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+JSON_FORMAT = "%(asctime)s %(levelname)s %(name)s %(request_id)s %(message)s"
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request id, or "-" outside a request"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get() or "-"
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without waiting. When the queue is
+    full, because the disk or terminal cannot keep up, records are dropped
+    and counted rather than stalling the request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message and traceback here, while the arguments are
+        # still what they were, but leave formatting to the listener's
+        # handlers so JSON output keeps its fields
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """``"app.crud=DEBUG,sqlalchemy.engine=WARNING"`` as logger names to levels"""
+    levels = {}
+    for part in spec.split(","):
+        name, _, level = part.strip().partition("=")
+        if not name or not level:
+            continue
+        value = logging.getLevelName(level.strip().upper())
+        if not isinstance(value, int):
+            raise ValueError(f"Unknown log level for {name.strip()}: {level.strip()}")
+        levels[name.strip()] = value
+    return levels
+
+
+def file_handler(path: str, max_bytes: int, rotate_when: str, backups: int) -> logging.Handler:
+    """A file handler rotating on ``rotate_when`` ("midnight", "H", ...) if given, else on size"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if rotate_when:
+        return TimedRotatingFileHandler(path, when=rotate_when, backupCount=backups)
+    return RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+
+
+class LogPipeline:
+    """
+    Application logging behind a queue.
+
+    Loggers only put records on a bounded queue; a listener thread formats
+    them and writes them to stderr and the rotated log file. Records carry
+    the request id, and are JSON lines unless ``fmt`` is "text".
+    """
+
+    def __init__(self):
+        self.handler: Optional[NonBlockingQueueHandler] = None
+        self.listener: Optional[QueueListener] = None
+        self.outputs: List[logging.Handler] = []
+        self._module_levels: Dict[str, int] = {}
+        atexit.register(self.stop)
+
+    def configure(self, level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, log_file: str = LOG_FILE,
+                  max_bytes: int = LOG_MAX_BYTES, rotate_when: str = LOG_ROTATE_WHEN, backups: int = LOG_BACKUPS,
+                  module_levels: str = LOG_LEVELS, queue_size: int = LOG_QUEUE_SIZE, console: bool = True) -> None:
+        if fmt not in ("json", "text"):
+            raise ValueError(f"Unknown LOG_FORMAT: {fmt}")
+        levels = parse_levels(module_levels)
+        self.stop()
+
+        formatter = (jsonlogger.JsonFormatter(JSON_FORMAT) if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+        self.outputs = []
+        if console:
+            self.outputs.append(logging.StreamHandler(sys.stderr))
+        if log_file:
+            self.outputs.append(file_handler(log_file, max_bytes, rotate_when, backups))
+        for output in self.outputs:
+            output.setFormatter(formatter)
+
+        log_queue: queue.Queue = queue.Queue(max(1, queue_size))
+        self.handler = NonBlockingQueueHandler(log_queue)
+        self.handler.addFilter(RequestIdFilter())
+        self.listener = QueueListener(log_queue, *self.outputs, respect_handler_level=True)
+        self.listener.start()
+
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(level.upper())
+        for name, value in levels.items():
+            logging.getLogger(name).setLevel(value)
+        self._module_levels = levels
+
+    def stop(self) -> None:
+        """Write out everything queued and detach from the root logger"""
+        if self.listener is None:
+            return
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        for output in self.outputs:
+            output.close()
+        for name in self._module_levels:
+            logging.getLogger(name).setLevel(logging.NOTSET)
+        self.listener = None
+        self.outputs = []
+        self._module_levels = {}
+
+    def stats(self) -> Dict[str, Any]:
+        if self.handler is None:
+            return {"queued": 0, "dropped": 0}
+        return {"queued": self.handler.queue.qsize(), "dropped": self.handler.dropped}
+
+
+log_pipeline = LogPipeline()
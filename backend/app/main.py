@@ -1,33 +1,43 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException
+# First, so the boot report's import phase covers everything below
+from .boot import boot_report
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
-from .database import engine, Base
-from .routes import router as api_router
-from .models import TeamRoster
-from .auth import get_password_hash, SECRET_KEY, ALGORITHM
-from .enums import UserRole
+from fastapi.responses import PlainTextResponse, RedirectResponse
+from sqlalchemy.orm import Session
+from .database import engine, SessionLocal
+from .routes import include_routers
+from .auth import authenticate_token, admin_required, password_hasher, SECRET_KEY, ALGORITHM
+from .enums import Role
+from . import directory
+from .realtime import hub
+from .broadcast import create_backend
+from .middleware import RequestIdMiddleware, TimingMiddleware, TrailingSlashMiddleware, request_timer
+from .logging_setup import log_pipeline
+from .query_audit import query_auditor
+from .slow_queries import configure_slow_query_log, slow_query_log
+from .profiling import ProfilingMiddleware, folded, profile_store
+from .backup import backup_status
+from .dependencies import get_db
+from .roles import has_role
+from .metrics import instrument_engine, registry as metrics_registry, run_periodic_flush
+from .config import (
+    LDAP_SYNC_INTERVAL_MINUTES, METRICS_FLUSH_SECONDS, WEB_CONCURRENCY, WS_BROADCAST_BACKEND,
+    WS_BROADCAST_POLL_MS, WS_BROADCAST_RETENTION_SECONDS
+)
 import os
 import json
+import asyncio
 import jwt
 from jose import JWTError
 from datetime import datetime
 import logging
-import traceback
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('app.log')
-    ]
-)
+
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Importing this module has no side effects beyond building the app: the
+# schema, directories and default admin are set up by app.bootstrap, and
+# logging, the broadcast hub and LDAP start in startup_event
 
 app = FastAPI(
     title="RT3 Management System API",
@@ -57,63 +67,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Middleware to handle trailing slashes
-@app.middleware("http")
-async def trailing_slash_middleware(request: Request, call_next):
-    """
-    Middleware to handle trailing slashes in URLs consistently.
-    
-    This middleware:
-    1. Preserves trailing slashes for root path (/) and static files (/uploads/...)
-    2. Removes trailing slashes from all other routes
-    3. Falls back to original path if modified path results in 404
-    
-    Args:
-        request (Request): The incoming request
-        call_next (Callable): The next middleware/route handler
-        
-    Returns:
-        Response: The response from the next middleware/route handler
-    """
+# Pure ASGI middleware: no per-request task or body buffering, so file
+# responses under /uploads stream straight through
+app.add_middleware(TrailingSlashMiddleware, router=app.router)
+
+
+def authorize_profiling(token: str):
+    """The handle of the admin a bearer token belongs to, or None"""
+    db = SessionLocal()
     try:
-        path = request.url.path
-        
-        # Skip for root path and static files
-        if path == "/" or path.startswith("/uploads/"):
-            return await call_next(request)
-        
-        # Remove trailing slash for all other routes
-        original_path = path
-        if path.endswith("/") and len(path) > 1:
-            request.scope["path"] = path.rstrip("/")
-        
-        try:
-            response = await call_next(request)
-            return response
-        except HTTPException as e:
-            # If we get a 404 and we modified the path, try the original path
-            if e.status_code == 404 and original_path != request.scope["path"]:
-                request.scope["path"] = original_path
-                return await call_next(request)
-            raise
-            
-    except Exception as e:
-        # Log any unexpected errors but don't expose them to the client
-        logger.error(f"Error in trailing slash middleware: {str(e)}")
-        logger.error(traceback.format_exc())
-        raise HTTPException(
-            status_code=500,
-            detail="An internal server error occurred"
-        )
+        principal = authenticate_token(db, token)
+    finally:
+        db.close()
+    if principal is None or not has_role(principal, Role.ADMIN):
+        return None
+    return principal.operator_handle
 
-# Create uploads directory if it doesn't exist
-os.makedirs("uploads", exist_ok=True)
 
-# Mount static files directory
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.add_middleware(ProfilingMiddleware, store=profile_store, authorize=authorize_profiling)
+app.add_middleware(TimingMiddleware, timer=request_timer)
+app.add_middleware(RequestIdMiddleware)
+
+instrument_engine(engine, metrics_registry)
+metrics_registry.gauge("rt3_websocket_connections", "Open /ws connections", function=lambda: hub.connection_count)
+
+# Mount static files directory, created by app.bootstrap
+app.mount("/uploads", StaticFiles(directory="uploads", check_dir=False), name="uploads")
 
 # Include API routes
-app.include_router(api_router, prefix="/api")
+include_routers(app, prefix="/api")
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -139,62 +121,159 @@ async def websocket_endpoint(websocket: WebSocket):
                 if datetime.utcnow().timestamp() > payload["exp"]:
                     await websocket.close(code=4001, reason="Token expired")
                     return
+
+            # Check the token's version through the same principal cache as HTTP requests
+            db = SessionLocal()
+            try:
+                principal = authenticate_token(db, token)
+            finally:
+                db.close()
+            if principal is None:
+                await websocket.close(code=4001, reason="Token revoked or user not found")
+                return
                     
             # Accept the connection after successful authentication
             await websocket.accept()
-            print(f"WebSocket connection accepted for user: {username}")
-            
-            await websocket.send_json({"type": "auth", "status": "success"})
+            logger.info("WebSocket connection accepted for user: %s", username)
             
-            while True:
-                try:
-                    data = await websocket.receive_text()
-                    print(f"Received WebSocket message from {username}: {data}")
-                    await websocket.send_text(f"Message text was: {data}")
-                except WebSocketDisconnect:
-                    print(f"WebSocket disconnected for user: {username}")
-                    break
-                except Exception as e:
-                    print(f"WebSocket error for user {username}: {e}")
+            await websocket.send_json({"type": "auth", "status": "success", "topics": list(hub.TOPICS)})
+
+            # Change events flow out through the hub; this loop only reads
+            # subscription requests. Topics may also be given as ?topics=a,b
+            conn = hub.connect(websocket, principal)
+            initial_topics = [t for t in query_params.get("topics", "").split(",") if t]
+            if initial_topics:
+                conn.handle({"action": "subscribe", "topics": initial_topics})
+            sender = asyncio.create_task(hub.serve(conn))
+            try:
+                while True:
                     try:
-                        await websocket.close()
-                    except:
-                        pass
-                    break
+                        conn.handle(await websocket.receive_json())
+                    except WebSocketDisconnect:
+                        logger.info("WebSocket disconnected for user: %s", username)
+                        break
+                    except ValueError:
+                        conn.handle(None)
+                    except Exception as e:
+                        logger.warning("WebSocket error for user %s: %s", username, e)
+                        try:
+                            await websocket.close()
+                        except:
+                            pass
+                        break
+            finally:
+                sender.cancel()
+                hub.disconnect(conn)
                     
         except JWTError as e:
-            print(f"Token validation error: {e}")
+            logger.info("WebSocket token validation error: %s", e)
             await websocket.close(code=4001, reason="Invalid token")
             return
             
     except Exception as e:
-        print(f"WebSocket connection error: {e}")
+        logger.error("WebSocket connection error: %s", e, exc_info=True)
         try:
             await websocket.close()
         except:
             pass
 
+@app.get("/api/ws/stats")
+def websocket_stats(current_user: dict = Depends(admin_required)):
+    """Connection count and delivery counters for the /ws change feed"""
+    return hub.stats()
+
+@app.get("/api/http/stats")
+def http_stats(current_user: dict = Depends(admin_required)):
+    """Request durations per route, from arrival to the last byte sent, SQL audit, log queue counters and boot timing"""
+    return {**request_timer.stats(), "sql_audit": query_auditor.stats(), "logging": log_pipeline.stats(),
+            "boot": boot_report.stats()}
+
+@app.get("/api/db/slow-queries")
+def slow_queries(limit: int = 50, current_user: dict = Depends(admin_required)):
+    """This worker's statements over SLOW_QUERY_MS, grouped by shape, slowest in total first"""
+    return slow_query_log.stats(limit)
+
+@app.delete("/api/db/slow-queries")
+def clear_slow_queries(current_user: dict = Depends(admin_required)):
+    slow_query_log.clear()
+    return {"message": "Slow query statistics cleared"}
+
+@app.get("/api/db/backups")
+def list_backups(limit: int = 50, db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
+    """Recent database and uploads backups with their duration and size, and each kind's last success"""
+    return backup_status(db, limit)
+
+@app.get("/api/profiles")
+def list_profiles(current_user: dict = Depends(admin_required)):
+    """Stored request profiles, newest first"""
+    return profile_store.list()
+
+@app.get("/api/profiles/{profile_id}")
+def get_profile(profile_id: str, current_user: dict = Depends(admin_required)):
+    """A request profile: folded stacks with sample counts and the SQL timeline"""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@app.get("/api/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+def get_profile_folded(profile_id: str, current_user: dict = Depends(admin_required)):
+    """A request profile as collapsed stacks, for flamegraph.pl or speedscope"""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(folded(profile))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics(current_user: dict = Depends(admin_required)):
+    """All workers' request, SQL and WebSocket metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.on_event("startup")
 async def startup_event():
-    # Create default admin user if it doesn't exist
-    from sqlalchemy.orm import Session
-    from .database import SessionLocal
-    db = SessionLocal()
-    try:
-        admin = db.query(TeamRoster).filter(TeamRoster.operator_handle == "admin").first()
-        if not admin:
-            admin = TeamRoster(
-                operator_handle="admin",
-                email="admin@rt3.com",
-                team_role=UserRole.ADMIN,
-                hashed_password=get_password_hash("admin"),
-                name="Admin User",
-                active=False
-            )
-            db.add(admin)
-            db.commit()
-    finally:
-        db.close()
+    # Logging goes through a queue to a writer thread; see LOG_* in config
+    with boot_report.phase("logging"):
+        log_pipeline.configure()
+        # Sampled N+1 offenders go to the slow query log, whether or not any
+        # statement is ever slow enough to open it
+        if query_auditor.mode == "sample":
+            configure_slow_query_log()
+
+    # Sync routes commit on worker threads; the hub hands their events to this loop
+    # and relays them to the other workers
+    with boot_report.phase("broadcast"):
+        await hub.start(create_backend(
+            WS_BROADCAST_BACKEND, engine, WS_BROADCAST_POLL_MS, WS_BROADCAST_RETENTION_SECONDS,
+            WEB_CONCURRENCY
+        ))
+
+    if metrics_registry.directory:
+        app.state.metrics_flush_task = asyncio.create_task(
+            run_periodic_flush(metrics_registry, METRICS_FLUSH_SECONDS)
+        )
+
+    # Keep the roster in step with the directory between logins. ldap3 is
+    # only imported when LDAP is enabled.
+    with boot_report.phase("ldap"):
+        if LDAP_SYNC_INTERVAL_MINUTES > 0 and directory.enabled():
+            from .ldap_sync import run_periodic_sync
+            app.state.ldap_sync_task = asyncio.create_task(run_periodic_sync(LDAP_SYNC_INTERVAL_MINUTES))
+
+    boot_report.finish()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    sync_task = getattr(app.state, "ldap_sync_task", None)
+    if sync_task is not None:
+        sync_task.cancel()
+    await hub.stop()
+    flush_task = getattr(app.state, "metrics_flush_task", None)
+    if flush_task is not None:
+        flush_task.cancel()
+        metrics_registry.flush()
+    password_hasher.shutdown()
+    if directory.loaded():
+        directory.authenticator().close()
 
 @app.get("/")
 def read_root():
@@ -203,3 +282,5 @@ def read_root():
         "documentation": "/docs",
         "version": "1.0.0"
     }
+
+boot_report.mark("import")
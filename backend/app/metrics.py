@@ -0,0 +1,330 @@
+import asyncio
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import METRICS_DIR, METRICS_FLUSH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Prometheus' default buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """A named family of samples, one per combination of label values"""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[str]) -> LabelValues:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}")
+        return tuple(str(label) for label in labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"kind": self.kind, "help": self.help, "labels": self.labels,
+                    "values": [[list(key), value] for key, value in self._values.items()]}
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. ``function`` gauges are read at scrape
+    time instead of being set.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labels)
+        self.function = function
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self.function is not None:
+            with self._lock:
+                self._values[()] = self.function()
+        return super().snapshot()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (non-cumulative), the overflow bucket last, then sum
+                state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            state["counts"][index] += 1
+            state["sum"] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"kind": self.kind, "help": self.help, "labels": self.labels, "buckets": list(self.buckets),
+                    "values": [[list(key), {"counts": list(state["counts"]), "sum": state["sum"]}]
+                               for key, state in self._values.items()]}
+
+
+class MetricsRegistry:
+    """
+    Holds this process's metrics and renders them in the Prometheus text format.
+
+    With several uvicorn workers each process only sees its own requests.
+    When ``directory`` is set, every worker writes its snapshot there
+    (see ``flush``) and a scrape of any worker merges all of them: counters
+    and histograms are summed across every file, including those of workers
+    that have exited, while gauges only count workers that flushed within
+    ``stale_seconds``.
+    """
+
+    def __init__(self, directory: str = "", stale_seconds: float = 60):
+        self.directory = directory
+        self.stale_seconds = stale_seconds
+        self._metrics: Dict[str, Metric] = {}
+        self._path = os.path.join(directory, f"metrics-{os.getpid()}.json") if directory else ""
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = (),
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, help, labels, function))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def flush(self) -> None:
+        """Write this worker's snapshot for the other workers to merge"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{self._path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"pid": os.getpid(), "written_at": time.time(), "metrics": self.snapshot()}, f)
+        os.replace(temp_path, self._path)
+
+    def _snapshots(self) -> List[Tuple[bool, Dict[str, Any]]]:
+        """(is_live, metrics) for this process and every other worker's last flush"""
+        snapshots = [(True, self.snapshot())]
+        if not self.directory or not os.path.isdir(self.directory):
+            return snapshots
+        now = time.time()
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            if not filename.endswith(".json") or path == self._path:
+                continue
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            snapshots.append((now - data.get("written_at", 0) < self.stale_seconds, data["metrics"]))
+        return snapshots
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """Merge the snapshots of all workers into one set of families"""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for live, snapshot in self._snapshots():
+            for name, family in snapshot.items():
+                if family["kind"] == "gauge" and not live:
+                    continue
+                target = merged.setdefault(name, {**family, "values": {}})
+                for labels, value in family["values"]:
+                    key = tuple(labels)
+                    if family["kind"] == "histogram":
+                        state = target["values"].setdefault(key, {"counts": [0] * len(value["counts"]), "sum": 0.0})
+                        state["counts"] = [a + b for a, b in zip(state["counts"], value["counts"])]
+                        state["sum"] += value["sum"]
+                    else:
+                        target["values"][key] = target["values"].get(key, 0) + value
+        return merged
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, family in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for key, value in sorted(family["values"].items()):
+                labels = list(zip(family["labels"], key))
+                if family["kind"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(family["buckets"]) + ["+Inf"], value["counts"]):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+@dataclass
+class RequestQueries:
+    """SQL work done while serving one request"""
+    statements: int = 0
+    seconds: float = 0.0
+    pool_wait: float = 0.0
+    # Every statement, when the query auditor is recording this request
+    log: Optional[Any] = None
+    # The ASGI scope, which names the matched route once routing has run
+    scope: Optional[Dict[str, Any]] = None
+    # (perf_counter start, seconds, statement) for each statement, when the request is profiled
+    timeline: Optional[List[Tuple[float, float, str]]] = None
+
+
+def route_name(scope: Dict[str, Any]) -> str:
+    """The path template of the route the router matched for ``scope``"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "app_root_path" in scope:
+        return scope["root_path"]  # A mount such as /uploads
+    if "endpoint" in scope:
+        return scope["path"]  # A plain Starlette route such as /docs
+    return "unmatched"
+
+
+# Set by the timing middleware for the duration of each HTTP request. Sync
+# routes run in a threadpool with a copy of the context, so they share it.
+current_queries: contextvars.ContextVar[Optional[RequestQueries]] = contextvars.ContextVar(
+    "current_queries", default=None
+)
+
+
+def instrument_engine(engine: Engine, registry: "MetricsRegistry") -> None:
+    """Time every statement and every pool checkout on ``engine``"""
+    statement_seconds = registry.histogram(
+        "rt3_db_statement_duration_seconds", "SQL statement execution time"
+    )
+    pool_wait = registry.histogram(
+        "rt3_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection"
+    )
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        statement_seconds.observe(elapsed)
+        queries = current_queries.get()
+        if queries is not None:
+            queries.statements += 1
+            queries.seconds += elapsed
+            if queries.log is not None:
+                queries.log.add(statement, elapsed)
+            if queries.timeline is not None:
+                queries.timeline.append((time.perf_counter() - elapsed, elapsed, statement))
+
+    # SQLAlchemy has no event before a checkout starts waiting, so time the
+    # pool's own getter
+    pool = engine.pool
+    do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            elapsed = time.perf_counter() - started
+            pool_wait.observe(elapsed)
+            queries = current_queries.get()
+            if queries is not None:
+                queries.pool_wait += elapsed
+
+    pool._do_get = timed_do_get
+
+
+async def run_periodic_flush(registry: MetricsRegistry, interval_seconds: float) -> None:
+    """Write this worker's snapshot every ``interval_seconds`` until cancelled"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await loop.run_in_executor(None, registry.flush)
+        except OSError as e:
+            logger.warning("Could not write metrics snapshot: %s", e)
+
+
+registry = MetricsRegistry(METRICS_DIR, stale_seconds=3 * METRICS_FLUSH_SECONDS)
+
+http_requests = registry.counter(
+    "rt3_http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+)
+http_duration = registry.histogram(
+    "rt3_http_request_duration_seconds", "HTTP request duration until the last byte is sent", ("method", "route")
+)
+http_in_flight = registry.gauge("rt3_http_requests_in_flight", "HTTP requests being served")
+db_statements_per_request = registry.histogram(
+    "rt3_db_statements_per_request", "SQL statements executed per HTTP request", ("method", "route"), COUNT_BUCKETS
+)
+db_time_per_request = registry.histogram(
+    "rt3_db_time_per_request_seconds", "Time spent executing SQL per HTTP request", ("method", "route")
+)
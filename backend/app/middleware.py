@@ -0,0 +1,231 @@
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+from starlette.routing import BaseRoute, Mount, Router
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .logging_setup import request_id
+from .metrics import (
+    RequestQueries, current_queries, db_statements_per_request, db_time_per_request,
+    http_duration, http_in_flight, http_requests, route_name
+)
+from .query_audit import query_auditor
+from .utils.metrics_utils import LatencyWindow
+
+
+class RouteTable:
+    """
+    Paths and methods the application can serve, for matching without dispatching.
+
+    Routes without path parameters are looked up in a dict; the rest are
+    tried in order by their compiled regex. Mounts and WebSocket routes
+    accept any method.
+    """
+
+    def __init__(self, routes: Iterable[BaseRoute]):
+        self.static: Dict[str, Optional[Set[str]]] = {}
+        self.patterns: List[Tuple[Pattern[str], Optional[Set[str]]]] = []
+        for route in routes:
+            regex = getattr(route, "path_regex", None)
+            if regex is None:
+                continue
+            methods = getattr(route, "methods", None)
+            if isinstance(route, Mount) or getattr(route, "param_convertors", None):
+                self.patterns.append((regex, methods))
+            elif route.path in self.static:
+                known = self.static[route.path]
+                self.static[route.path] = None if known is None or methods is None else known | methods
+            else:
+                self.static[route.path] = set(methods) if methods is not None else None
+
+    def matches(self, path: str, method: str) -> bool:
+        if path in self.static:
+            methods = self.static[path]
+            if methods is None or method in methods:
+                return True
+        return any(pattern.match(path) and (methods is None or method in methods)
+                   for pattern, methods in self.patterns)
+
+
+class TrailingSlashMiddleware:
+    """
+    Serves "/api/items/" and "/api/items" from the same route.
+
+    A path is rewritten in place, once, to whichever form exists in the route
+    table, so the request is never dispatched twice or redirected. Paths that
+    match nothing are passed through unchanged to 404 as usual. The table is
+    built from ``router`` at startup.
+    """
+
+    # Rewritten paths are remembered; ids in paths make this unbounded otherwise
+    CACHE_SIZE = 4096
+
+    def __init__(self, app: ASGIApp, router: Router, passthrough: Tuple[str, ...] = ("/uploads/",)):
+        self.app = app
+        self.router = router
+        self.passthrough = passthrough
+        self.table: Optional[RouteTable] = None
+        self._cache: Dict[str, str] = {}
+
+    def build(self) -> RouteTable:
+        self.table = RouteTable(self.router.routes)
+        self._cache.clear()
+        return self.table
+
+    def normalize(self, path: str, method: str = "GET") -> str:
+        if path == "/" or path.startswith(self.passthrough):
+            return path
+        key = f"{method} {path}"
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        table = self.table or self.build()
+        resolved = path
+        if not table.matches(path, method):
+            alternate = path.rstrip("/") if path.endswith("/") else path + "/"
+            if alternate and table.matches(alternate, method):
+                resolved = alternate
+
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[key] = resolved
+        return resolved
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            self.build()
+        elif scope["type"] in ("http", "websocket"):
+            # WebSocket routes have no methods, so any method label matches them
+            path = self.normalize(scope["path"], scope.get("method", "GET"))
+            if path != scope["path"]:
+                # Rewritten in place: outer middleware reads the matched route from this scope
+                scope["path"] = path
+                scope["raw_path"] = path.encode()
+        await self.app(scope, receive, send)
+
+
+class RequestTimer:
+    """Per-route request durations, keyed by the matched route's path template"""
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], LatencyWindow] = {}
+        self._status: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route)
+        window = self._routes.get(key)
+        if window is None:
+            with self._lock:
+                window = self._routes.setdefault(key, LatencyWindow())
+        window.record(seconds)
+        status_class = f"{status // 100}xx"
+        with self._lock:
+            self._status[status_class] = self._status.get(status_class, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = dict(self._routes)
+            status = dict(self._status)
+        return {
+            "status": status,
+            "routes": {f"{method} {route}": window.summary() for (method, route), window in sorted(routes.items())}
+        }
+
+
+class TimingMiddleware:
+    """
+    Times HTTP requests from arrival until the last body chunk is sent.
+
+    The time until the response headers are sent is also reported to the
+    client in a ``Server-Timing`` header. Requests no route matched are
+    grouped under "unmatched" so scanners cannot grow the table. Each
+    request's duration, status and SQL statement count and time also feed
+    the /metrics histograms, and the query auditor sees its statements.
+    """
+
+    def __init__(self, app: ASGIApp, timer: RequestTimer):
+        self.app = app
+        self.timer = timer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        queries = RequestQueries(log=query_auditor.begin(), scope=scope)
+        token = current_queries.set(queries)
+        http_in_flight.inc()
+
+        async def send_timed(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", f"app;dur={elapsed_ms:.1f}".encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            # The router records what it matched in the shared scope
+            name = route_name(scope)
+            elapsed = time.perf_counter() - started
+            current_queries.reset(token)
+            http_in_flight.dec()
+            method = scope["method"]
+            self.timer.record(method, name, status, elapsed)
+            http_requests.inc(method, name, str(status))
+            http_duration.observe(elapsed, method, name)
+            db_statements_per_request.observe(queries.statements, method, name)
+            db_time_per_request.observe(queries.seconds, method, name)
+            if queries.log is not None:
+                query_auditor.finish(queries.log, method, name, status)
+
+
+class RequestIdMiddleware:
+    """
+    Gives each HTTP request and WebSocket connection an id for its log
+    records, echoed in an ``X-Request-ID`` response header. An id sent by
+    the client or a proxy is kept when it looks like one.
+    """
+
+    VALID_ID = re.compile(rb"[A-Za-z0-9._-]{1,64}")
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        rid = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id" and self.VALID_ID.fullmatch(value):
+                rid = value.decode()
+        rid = rid or uuid.uuid4().hex
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (b"x-request-id", rid.encode())
+                ])
+            await send(message)
+
+        token = request_id.set(rid)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
+
+
+request_timer = RequestTimer()
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Date, Enum, DateTime, ForeignKey, Text, Boolean, ARRAY, JSON
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Date, Enum, DateTime, ForeignKey, Text, Boolean, ARRAY, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
-from .enums import OperatorLevel, ComplianceStatus, UserRole
+from .enums import OperatorLevel, ComplianceStatus, UserRole, AuthSource
+from .roles import parse_roles
 import enum
 from datetime import datetime
 
@@ -27,12 +28,15 @@ class TeamRoster(Base):
     name = Column(String)
     operator_handle = Column(String, unique=True, index=True)  # Now used as username
     team_role = Column(String)  # Stores roles as comma-separated string
+    role_flags = Column(Integer, default=0, server_default="0", nullable=False, index=True)  # enums.Role bits parsed from team_role
     onboarding_date = Column(Date)
     operator_level = Column(Enum(OperatorLevel), default=OperatorLevel.team_member)
     compliance_8570 = Column(Enum(ComplianceStatus), default=ComplianceStatus.non_compliant)
     legal_document_status = Column(Enum(ComplianceStatus), default=ComplianceStatus.non_compliant)
     active = Column(Boolean, default=True)
     hashed_password = Column(String)
+    auth_source = Column(Enum(AuthSource), default=AuthSource.local, nullable=False)
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)  # Bumped to revoke issued tokens
     email = Column(String, unique=True, index=True)
     avatar_id = Column(Integer, ForeignKey("images.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -42,6 +46,12 @@ class TeamRoster(Base):
     avatar = relationship("Image", foreign_keys=[avatar_id], back_populates="team_roster_avatar")
     uploaded_images = relationship("Image", foreign_keys="Image.uploaded_by", back_populates="uploader")
 
+    @validates("team_role")
+    def _sync_role_flags(self, key, value):
+        # Keep the indexed bitmask in step with the display string
+        self.role_flags = int(parse_roles(value))
+        return value
+
 class JQRItem(Base):
     __tablename__ = "jqr_items"
     id = Column(Integer, primary_key=True, index=True)
@@ -197,11 +207,19 @@ class AssessmentResponse(Base):
     status = Column(Enum(AssessmentStatus), default=AssessmentStatus.pending_review)
     graded_by = Column(Integer, ForeignKey("team_roster.id"))
     graded_at = Column(DateTime)
+    claimed_by = Column(Integer, ForeignKey("team_roster.id"), nullable=True)  # Grader holding the lease
+    claim_expires_at = Column(DateTime, nullable=True)
+
+    # Grading queue lists pending responses oldest first
+    __table_args__ = (
+        Index("ix_assessment_responses_status_completed_at", "status", "completed_at"),
+    )
 
     # Relationships
     assessment = relationship("Assessment", back_populates="responses")
     operator = relationship("TeamRoster", foreign_keys=[operator_id])
     grader = relationship("TeamRoster", foreign_keys=[graded_by])
+    claimer = relationship("TeamRoster", foreign_keys=[claimed_by])
     question_responses = relationship("QuestionResponse", back_populates="assessment_response", cascade="all, delete-orphan")
 
 class QuestionResponse(Base):
@@ -221,3 +239,27 @@ class QuestionResponse(Base):
     assessment_response = relationship("AssessmentResponse", back_populates="question_responses")
     question = relationship("AssessmentQuestion", back_populates="responses")
     grader = relationship("TeamRoster", foreign_keys=[graded_by])
+
+class RealtimeEvent(Base):
+    """Change events relayed between worker processes by the change-log broadcast backend"""
+    __tablename__ = "realtime_events"
+    # Never reuse ids once pruning empties the table; workers tail it by id
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, index=True)
+    origin = Column(String, nullable=False)  # Publishing worker, so it can skip its own events
+    payload = Column(Text, nullable=False)  # JSON list of serialized change events
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class BackupRun(Base):
+    """One database or uploads backup made by python -m app.backup"""
+    __tablename__ = "backup_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # "database" or "uploads"
+    status = Column(String, nullable=False)  # "ok" once written and verified, otherwise "failed"
+    started_at = Column(DateTime, default=datetime.utcnow, index=True)
+    duration_seconds = Column(Float)
+    size_bytes = Column(BigInteger)
+    path = Column(String)
+    error = Column(Text)
@@ -0,0 +1,191 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from .config import PRINCIPAL_CACHE_TTL_SECONDS
+from .models import TeamRoster
+
+# Session.info key collecting handles to evict once the transaction commits
+_PENDING_KEY = "principal_cache_pending"
+
+# Changing any of these bumps TeamRoster.token_version, revoking tokens whose
+# claims were issued from the old values
+TOKEN_REVOKING_FIELDS = (
+    "name", "operator_handle", "team_role", "operator_level", "active", "hashed_password", "auth_source"
+)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated user's fields used by authorization checks.
+
+    Access tokens carry these as claims. Attribute names match TeamRoster so
+    routes can use either interchangeably for reads. Routes that need other
+    columns, relationships, or want to modify the user must load the
+    TeamRoster row instead.
+    """
+    id: int
+    name: Optional[str]
+    operator_handle: str
+    team_role: Optional[str]
+    role_flags: int
+    operator_level: Optional[str]
+    active: Optional[bool]
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user: TeamRoster) -> "Principal":
+        return cls(
+            id=user.id,
+            name=user.name,
+            operator_handle=user.operator_handle,
+            team_role=user.team_role,
+            role_flags=user.role_flags or 0,
+            operator_level=user.operator_level,
+            active=user.active,
+            token_version=user.token_version or 0
+        )
+
+    def claims(self) -> Dict[str, Any]:
+        """JWT claims describing this principal"""
+        return {
+            "sub": self.operator_handle,
+            "uid": self.id,
+            "name": self.name,
+            "role": self.team_role,
+            "roles": self.role_flags,
+            "lvl": self.operator_level,
+            "active": self.active,
+            "ver": self.token_version
+        }
+
+    @classmethod
+    def from_claims(cls, claims: Dict[str, Any]) -> "Principal":
+        """Rebuild a principal from verified claims; raises KeyError if any are missing"""
+        return cls(
+            id=claims["uid"],
+            name=claims["name"],
+            operator_handle=claims["sub"],
+            team_role=claims["role"],
+            role_flags=claims["roles"],
+            operator_level=claims["lvl"],
+            active=claims["active"],
+            token_version=claims["ver"]
+        )
+
+
+class PrincipalCache:
+    """In-process TTL cache of principals keyed by operator handle"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, Principal]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, handle: str) -> Optional[Principal]:
+        """Return the cached principal for a handle, or None if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[handle]
+            self.misses += 1
+            return None
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every invalidation; pass it to put() to avoid caching stale rows"""
+        return self._generation
+
+    def put(self, user: TeamRoster, generation: Optional[int] = None) -> Principal:
+        """
+        Cache and return the principal for a TeamRoster row.
+
+        If ``generation`` is given and an invalidation happened since it was
+        read, the row may predate that change and is returned without caching.
+        """
+        principal = Principal.from_user(user)
+        if self.ttl_seconds > 0:
+            with self._lock:
+                if generation is None or generation == self._generation:
+                    self._entries[principal.operator_handle] = (time.monotonic() + self.ttl_seconds, principal)
+        return principal
+
+    def invalidate(self, *handles: str) -> None:
+        """Evict the given handles"""
+        with self._lock:
+            self._generation += 1
+            for handle in handles:
+                if self._entries.pop(handle, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Global principal cache instance
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def _bump_token_version(mapper, connection, target: TeamRoster) -> None:
+    """Revoke outstanding tokens when a field they carry as a claim changes"""
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in TOKEN_REVOKING_FIELDS):
+        target.token_version = (target.token_version or 0) + 1
+
+
+def _queue_invalidation(mapper, connection, target: TeamRoster) -> None:
+    """Record the handles of a changed or deleted roster row on its session"""
+    session = object_session(target)
+    if session is None:
+        principal_cache.invalidate(target.operator_handle)
+        return
+    handles: Set[str] = session.info.setdefault(_PENDING_KEY, set())
+    handles.add(target.operator_handle)
+    # A renamed handle must also evict the entry cached under the old one
+    history = inspect(target).attrs.operator_handle.history
+    handles.update(h for h in history.deleted or () if h)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session: Session) -> None:
+    handles = session.info.pop(_PENDING_KEY, None)
+    if handles:
+        principal_cache.invalidate(*handles)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+event.listen(TeamRoster, "before_update", _bump_token_version)
+event.listen(TeamRoster, "after_update", _queue_invalidation)
+event.listen(TeamRoster, "after_delete", _queue_invalidation)
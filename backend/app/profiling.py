@@ -0,0 +1,228 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_MAX_FILES
+from .metrics import current_queries, route_name
+from .query_audit import normalize_sql
+
+# The profile a request is being sampled into; threadpool workers run with a
+# copy of the request's context, which is how their samples are attributed
+current_profile: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # Folded stacks use ";" between frames
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class ProfileSession:
+    """
+    Samples the stacks of one request until stopped.
+
+    A background thread reads every thread's current frame each
+    ``interval`` seconds. A sample belongs to this request when the thread
+    is either the event loop running this request's middleware frame, or a
+    threadpool worker running a sync route or dependency with this
+    request's context. Samples are kept as folded stacks, root first, ready
+    for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.loop_code = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, loop_code) -> None:
+        """``loop_code`` is the code object of the middleware frame on the event loop"""
+        self.loop_code = loop_code
+        self._thread = threading.Thread(target=self._run, name=f"profile-{self.id}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        sampler = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == sampler:
+                    continue
+                stack = self._request_stack(frame)
+                if stack:
+                    self.stacks[";".join(stack)] += 1
+                    self.samples += 1
+
+    def _request_stack(self, frame) -> Optional[List[str]]:
+        """This request's part of a thread's stack, root first, or None if it is not serving this request"""
+        frames = []
+        while frame is not None:
+            if frame.f_code is self.loop_code and frame.f_locals.get("session") is self:
+                break
+            context = frame.f_locals.get("context") if frame.f_code.co_name == "run" else None
+            if isinstance(context, contextvars.Context) and context.get(current_profile) is self:
+                break
+            frames.append(frame)
+            frame = frame.f_back
+        else:
+            return None
+        return [_frame_label(f) for f in reversed(frames)]
+
+
+class ProfileStore:
+    """Profiles as JSON files in ``directory``, keeping only the newest ``max_files``"""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max(1, max_files)
+        self._lock = threading.Lock()
+
+    def _files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(f for f in os.listdir(self.directory) if f.endswith(".json"))
+
+    def save(self, profile: Dict[str, Any]) -> None:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{int(profile['started_at'] * 1000):015d}-{profile['id']}.json"
+            with open(os.path.join(self.directory, name), "w") as f:
+                json.dump(profile, f)
+            files = self._files()
+            for old in files[:max(0, len(files) - self.max_files)]:
+                os.remove(os.path.join(self.directory, old))
+
+    def list(self) -> List[Dict[str, Any]]:
+        summaries = []
+        for name in reversed(self._files()):
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profile = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summaries.append({key: profile[key] for key in (
+                "id", "started_at", "method", "path", "route", "status", "user", "duration_ms", "samples",
+                "sql_statements"
+            )})
+        return summaries
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        for name in self._files():
+            if name.endswith(f"-{profile_id}.json"):
+                with open(os.path.join(self.directory, name)) as f:
+                    return json.load(f)
+        return None
+
+
+def folded(profile: Dict[str, Any]) -> str:
+    """A stored profile in the collapsed-stack format flame graph tools read"""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request when an admin asks for it with an ``X-Profile: 1``
+    header or ``profile=1`` query parameter.
+
+    The response carries an ``X-Profile-Id`` header; the profile, with the
+    request's SQL timeline, is stored in ``store`` once the response has
+    been sent. ``authorize`` maps a bearer token to the admin's handle, or
+    None. Requests without the flag only pay for the flag check.
+    """
+
+    def __init__(self, app: ASGIApp, store: ProfileStore, authorize: Callable[[str], Optional[str]],
+                 interval_ms: float = PROFILE_INTERVAL_MS):
+        self.app = app
+        self.store = store
+        self.authorize = authorize
+        self.interval = interval_ms / 1000
+
+    @staticmethod
+    def _requested(scope: Scope) -> Optional[str]:
+        """The bearer token of a request asking to be profiled"""
+        query = scope.get("query_string", b"")
+        flagged = b"profile=1" in query and b"profile=1" in query.split(b"&")
+        token = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile" and value == b"1":
+                flagged = True
+            elif name == b"authorization" and value[:7].lower() == b"bearer ":
+                token = value[7:].decode("latin-1")
+        return token if flagged else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = self._requested(scope)
+        user = await run_in_threadpool(self.authorize, token) if token else None
+        if user is None:
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(self.interval)
+        status = 500
+        queries = current_queries.get()
+        if queries is not None:
+            queries.timeline = []
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (b"x-profile-id", session.id.encode())
+                ])
+            await send(message)
+
+        profile_token = current_profile.set(session)
+        started_at = time.time()
+        session.start(sys._getframe().f_code)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            session.stop()
+            current_profile.reset(profile_token)
+            timeline = queries.timeline if queries is not None else []
+            profile = {
+                "id": session.id,
+                "started_at": started_at,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route_name(scope),
+                "status": status,
+                "user": user,
+                "duration_ms": round((time.perf_counter() - session.started) * 1000, 2),
+                "interval_ms": self.interval * 1000,
+                "samples": session.samples,
+                "stacks": dict(session.stacks.most_common()),
+                "sql_statements": len(timeline),
+                "sql": [
+                    {"offset_ms": round((start - session.started) * 1000, 2), "ms": round(seconds * 1000, 2),
+                     "sql": normalize_sql(statement)}
+                    for start, seconds, statement in timeline
+                ]
+            }
+            await run_in_threadpool(self.store.save, profile)
+
+
+profile_store = ProfileStore(PROFILE_DIR, PROFILE_MAX_FILES)
@@ -0,0 +1,209 @@
+import logging
+import os
+import random
+import re
+import sysconfig
+import threading
+import traceback
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from .config import SQL_AUDIT_MODE, SQL_AUDIT_REPEAT_THRESHOLD, SQL_AUDIT_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+# Offenders found by production sampling go to the slow query log
+slow_logger = logging.getLogger("app.slow_queries")
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_NAMED_PARAM = re.compile(r"%\(\w+\)s|:\w+\b|\$\d+|%s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\?\))(?:\s*,\s*\(\?\))+", re.IGNORECASE)
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Reduce a statement to its shape: literals and bind parameters become ?,
+    and IN lists and multi-row VALUES collapse, so statements differing only
+    in their values share one fingerprint.
+    """
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NAMED_PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?)", sql)
+    sql = _VALUES_LIST.sub(r"\1", sql)
+    return sql
+
+
+_LIBRARY_PATHS = tuple({sysconfig.get_paths()["stdlib"], sysconfig.get_paths()["purelib"],
+                        sysconfig.get_paths()["platlib"]})
+_INSTRUMENTATION_FILES = {
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ("query_audit.py", "metrics.py", "middleware.py")
+}
+
+
+def _caller_stack(limit: int = 8) -> List[str]:
+    """The innermost application frames, skipping libraries and the instrumentation itself"""
+    frames = [
+        f"{frame.filename}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()
+        if not frame.filename.startswith(_LIBRARY_PATHS)
+        and frame.filename not in _INSTRUMENTATION_FILES
+    ]
+    return frames[-limit:]
+
+
+@dataclass
+class StatementShape:
+    """Every execution of one normalized statement within a request"""
+    sql: str
+    count: int = 0
+    seconds: float = 0.0
+    stack: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"sql": self.sql, "count": self.count, "ms": round(self.seconds * 1000, 2), "stack": self.stack}
+
+
+class StatementLog:
+    """
+    The statements executed while serving one request, grouped by shape.
+
+    The stack of the first execution of each shape is kept, which for an
+    N+1 pattern points at the loop issuing it.
+    """
+
+    def __init__(self):
+        self.shapes: Dict[str, StatementShape] = {}
+        self.statements = 0
+
+    def add(self, statement: str, seconds: float) -> None:
+        sql = normalize_sql(statement)
+        shape = self.shapes.get(sql)
+        if shape is None:
+            shape = self.shapes[sql] = StatementShape(sql, stack=_caller_stack())
+        shape.count += 1
+        shape.seconds += seconds
+        self.statements += 1
+
+    def repeated(self, threshold: int) -> List[StatementShape]:
+        """Shapes executed at least ``threshold`` times, most frequent first"""
+        return sorted((s for s in self.shapes.values() if s.count >= threshold), key=lambda s: -s.count)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by query_budget when a request ran more statements than allowed"""
+
+
+@dataclass
+class _Budget:
+    limit: int
+    route: Optional[str]
+    violations: List[str] = field(default_factory=list)
+
+
+class QueryAuditor:
+    """
+    Records SQL per request to find N+1 patterns and enforce query budgets.
+
+    Modes:
+      off     only requests inside a query_budget() block are recorded
+      record  every request is recorded; repeated shapes are logged as
+              N+1 candidates with the stack that issued them (dev/test)
+      sample  ``sample_rate`` of requests are recorded; candidates go to
+              the slow query log (production)
+
+    When a request is not recorded, ``begin`` returns None and the engine
+    listeners do no extra work.
+    """
+
+    def __init__(self, mode: str = "off", sample_rate: float = 0.01, repeat_threshold: int = 5):
+        if mode not in ("off", "record", "sample"):
+            raise ValueError(f"Unknown SQL_AUDIT_MODE: {mode}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.repeat_threshold = max(2, repeat_threshold)
+        self._budgets: List[_Budget] = []
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.flagged = 0
+
+    def begin(self) -> Optional[StatementLog]:
+        if self._budgets or self.mode == "record" or (self.mode == "sample" and random.random() < self.sample_rate):
+            return StatementLog()
+        return None
+
+    def finish(self, log: StatementLog, method: str, route: str, status: int) -> None:
+        endpoint = f"{method} {route}"
+        with self._lock:
+            self.recorded += 1
+            budgets = list(self._budgets)
+        for budget in budgets:
+            if budget.route in (None, endpoint) and log.statements > budget.limit:
+                budget.violations.append(self._describe_violation(endpoint, log, budget.limit))
+
+        if self.mode == "off":
+            return
+        candidates = log.repeated(self.repeat_threshold)
+        if not candidates:
+            return
+        with self._lock:
+            self.flagged += 1
+        for shape in candidates:
+            entry = {
+                "event": "n_plus_one",
+                "route": endpoint,
+                "status": status,
+                "request_statements": log.statements,
+                **shape.to_dict()
+            }
+            if self.mode == "sample":
+                slow_logger.warning("Repeated query in %s", endpoint, extra={"query": entry})
+            else:
+                logger.warning(
+                    "Possible N+1 in %s: %d x %s\n  %s", endpoint, shape.count, shape.sql, "\n  ".join(shape.stack)
+                )
+
+    @staticmethod
+    def _describe_violation(endpoint: str, log: StatementLog, limit: int) -> str:
+        lines = [f"{endpoint} ran {log.statements} SQL statements (budget {limit}):"]
+        for shape in sorted(log.shapes.values(), key=lambda s: -s.count):
+            lines.append(f"  {shape.count:>4} x {shape.sql}")
+            if shape.count > 1 and shape.stack:
+                lines.append(f"         from {shape.stack[-1]}")
+        return "\n".join(lines)
+
+    @contextmanager
+    def budget(self, limit: int, route: Optional[str] = None) -> Iterator[_Budget]:
+        """
+        Fail if any request served inside the block runs more than ``limit``
+        SQL statements. ``route`` ("GET /api/items/{id}") limits the budget to
+        one endpoint.
+        """
+        budget = _Budget(limit, route)
+        with self._lock:
+            self._budgets.append(budget)
+        try:
+            yield budget
+        finally:
+            with self._lock:
+                self._budgets.remove(budget)
+        if budget.violations:
+            raise QueryBudgetExceeded("\n".join(budget.violations))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "repeat_threshold": self.repeat_threshold,
+            "recorded": self.recorded,
+            "flagged": self.flagged
+        }
+
+
+query_auditor = QueryAuditor(SQL_AUDIT_MODE, SQL_AUDIT_SAMPLE_RATE, SQL_AUDIT_REPEAT_THRESHOLD)
+query_budget = query_auditor.budget
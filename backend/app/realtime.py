@@ -0,0 +1,434 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from .broadcast import BroadcastBackend, Payload
+from .config import WS_BATCH_MS, WS_MAX_EVENTS_PER_COMMIT, WS_SEND_QUEUE_SIZE, WS_SEND_TIMEOUT_SECONDS
+from .enums import Role
+from .models import (
+    AssessmentResponse, AssessmentStatus, Certification, Image, ImageType, JQRTracker, RedTeamTraining,
+    SkillLevelHistory, TeamRoster, VendorTraining
+)
+from .principal_cache import Principal
+from .roles import has_role
+from .utils.metrics_utils import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Session.info key collecting change events to publish once the transaction commits
+_PENDING_KEY = "realtime_pending"
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """
+    A committed change to one row, sent to subscribers of its topic.
+
+    ``data`` holds only the changed columns for updates. Events with an owner
+    are delivered to that operator and to admins; others go to every
+    subscriber.
+    """
+    topic: str
+    entity: str
+    action: str  # added, updated, deleted, graded, changed or resync
+    id: Any = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    owner_id: Optional[int] = None
+    owner_name: Optional[str] = None
+    published_at: float = 0.0  # wall clock, comparable across workers
+
+    @property
+    def key(self) -> Tuple[str, Any]:
+        return self.entity, self.id
+
+    def visible_to(self, principal: Principal) -> bool:
+        if self.owner_id is None and self.owner_name is None:
+            return True
+        if has_role(principal, Role.ADMIN):
+            return True
+        return principal.id == self.owner_id or (self.owner_name is not None and principal.name == self.owner_name)
+
+    def merge(self, newer: "ChangeEvent") -> Optional["ChangeEvent"]:
+        """Collapse two events for the same row; None if they cancel out"""
+        if newer.action == "deleted":
+            return None if self.action == "added" else newer
+        action = self.action if self.action == "added" else newer.action
+        return replace(newer, action=action, data={**self.data, **newer.data})
+
+    def to_message(self) -> Dict[str, Any]:
+        return {"topic": self.topic, "entity": self.entity, "action": self.action, "id": self.id, "data": self.data}
+
+    def to_dict(self) -> Payload:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, payload: Payload) -> "ChangeEvent":
+        return cls(**payload)
+
+
+class ClientConnection:
+    """
+    One subscribed WebSocket with its own send queue.
+
+    Pending events are keyed by row, so repeated changes to the same row
+    coalesce into a single delta. A client that falls more than
+    ``queue_size`` rows behind gets a resync message for the affected topics
+    instead, and one that blocks a send for ``send_timeout`` is disconnected.
+    """
+
+    def __init__(self, websocket: WebSocket, principal: Principal, queue_size: int,
+                 send_timeout: float, batch_seconds: float):
+        self.websocket = websocket
+        self.principal = principal
+        self.queue_size = max(1, queue_size)
+        self.send_timeout = send_timeout
+        self.batch_seconds = batch_seconds
+        self.topics: Set[str] = set()
+        self._pending: "OrderedDict[Tuple[str, Any], ChangeEvent]" = OrderedDict()
+        self._resync: Set[str] = set()
+        self._replies: List[Dict[str, Any]] = []
+        self._ready = asyncio.Event()
+        self.sent = 0
+        self.coalesced = 0
+        self.overflows = 0
+
+    def offer(self, change: ChangeEvent) -> bool:
+        """Queue an event if the client is subscribed and allowed to see it"""
+        if change.topic not in self.topics or not change.visible_to(self.principal):
+            return False
+        if change.action == "resync" or change.topic in self._resync:
+            self._resync.add(change.topic)
+        elif change.key in self._pending:
+            merged = self._pending.pop(change.key).merge(change)
+            if merged is not None:
+                self._pending[change.key] = merged
+            self.coalesced += 1
+        elif len(self._pending) >= self.queue_size:
+            # Too far behind to catch up with deltas; have it refetch instead
+            self.overflows += 1
+            self._resync.update(pending.topic for pending in self._pending.values())
+            self._resync.add(change.topic)
+            self._pending.clear()
+        else:
+            self._pending[change.key] = change
+        self._ready.set()
+        return True
+
+    def handle(self, message: Any) -> None:
+        """Apply a client request: subscribe, unsubscribe or ping"""
+        action = message.get("action") if isinstance(message, dict) else None
+        if action in ("subscribe", "unsubscribe"):
+            topics = message.get("topics") or []
+            unknown = sorted(set(topics) - set(NotificationHub.TOPICS))
+            if unknown:
+                self._reply({"type": "error", "message": f"Unknown topics: {', '.join(unknown)}"})
+                return
+            if action == "subscribe":
+                self.topics.update(topics)
+            else:
+                self.topics.difference_update(topics)
+            self._reply({"type": "subscribed", "topics": sorted(self.topics)})
+        elif action == "ping":
+            self._reply({"type": "pong"})
+        else:
+            self._reply({"type": "error", "message": "Unknown action"})
+
+    def _reply(self, message: Dict[str, Any]) -> None:
+        # Replies go through the sender task so only one coroutine writes to the socket
+        self._replies.append(message)
+        self._ready.set()
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        messages, self._replies = self._replies, []
+        if self._resync:
+            messages.append({"type": "resync", "topics": sorted(self._resync)})
+            # Deltas for a topic being refetched are redundant
+            for key in [k for k, pending in self._pending.items() if pending.topic in self._resync]:
+                del self._pending[key]
+            self._resync.clear()
+        if self._pending:
+            messages.append({"type": "changes", "events": [pending.to_message() for pending in self._pending.values()]})
+            self._pending.clear()
+        self._ready.clear()
+        return messages
+
+    async def run_sender(self) -> None:
+        """Send queued events in batches until the socket closes or stalls"""
+        while True:
+            await self._ready.wait()
+            if self.batch_seconds > 0 and not self._replies:
+                # Let a burst of commits accumulate into one message
+                await asyncio.sleep(self.batch_seconds)
+            for message in self._take_batch():
+                await asyncio.wait_for(self.websocket.send_json(message), timeout=self.send_timeout)
+                self.sent += 1
+
+
+class NotificationHub:
+    """
+    Fans committed change events out to subscribed WebSocket clients.
+
+    Events go straight to this worker's sockets and through ``backend`` to
+    the other workers' hubs.
+    """
+
+    TOPICS = ("jqr_tracker", "training", "assessment", "roster", "dashboard_image")
+
+    def __init__(self, queue_size: int, send_timeout: float, batch_ms: float):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.batch_seconds = batch_ms / 1000
+        self.backend = BroadcastBackend()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connections: Set[ClientConnection] = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.slow_disconnects = 0
+        # Commit in any worker to events being queued on this worker's sockets
+        self.fanout_latency = LatencyWindow()
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Bind to the server's event loop; events published before this are dropped"""
+        self._loop = loop
+
+    async def start(self, backend: BroadcastBackend) -> None:
+        """Attach to the running loop and start receiving other workers' events"""
+        self.attach(asyncio.get_running_loop())
+        self.backend = backend
+        await backend.start(self._receive)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    def connect(self, websocket: WebSocket, principal: Principal) -> ClientConnection:
+        if self._loop is None:
+            self.attach(asyncio.get_running_loop())
+        conn = ClientConnection(websocket, principal, self.queue_size, self.send_timeout, self.batch_seconds)
+        self._connections.add(conn)
+        return conn
+
+    def disconnect(self, conn: ClientConnection) -> None:
+        self._connections.discard(conn)
+
+    async def serve(self, conn: ClientConnection) -> None:
+        """Run a connection's sender; closes the socket if a send stalls"""
+        try:
+            await conn.run_sender()
+        except asyncio.TimeoutError:
+            self.slow_disconnects += 1
+            logger.warning("Closing slow WebSocket for %s", conn.principal.operator_handle)
+            try:
+                await conn.websocket.close(code=1013, reason="Client too slow")
+            except Exception:
+                pass
+        except Exception:
+            # The socket closed underneath us; the receive loop cleans up
+            pass
+        finally:
+            self.disconnect(conn)
+
+    def publish(self, changes: Iterable[ChangeEvent]) -> None:
+        """Deliver events to all subscribers. Safe to call from any thread."""
+        now = time.time()
+        changes = [replace(change, published_at=now) for change in changes]
+        if not changes:
+            return
+        with self._lock:
+            self.published += len(changes)
+        self.backend.publish([change.to_dict() for change in changes])
+        self._deliver(changes)
+
+    def _receive(self, payloads: List[Payload]) -> None:
+        """Events relayed from another worker"""
+        changes = []
+        for payload in payloads:
+            if payload.get("topic") == "*":
+                # The relay may have missed events; every topic must be refetched
+                changes.extend(ChangeEvent(topic=topic, entity=topic, action="resync") for topic in self.TOPICS)
+            else:
+                changes.append(ChangeEvent.from_dict(payload))
+        self._deliver(changes)
+
+    def _deliver(self, changes: List[ChangeEvent]) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            with self._lock:
+                self.dropped += len(changes)
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._dispatch(changes)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, changes)
+
+    def _dispatch(self, changes: List[ChangeEvent]) -> None:
+        delivered = 0
+        for conn in list(self._connections):
+            for change in changes:
+                if conn.offer(change):
+                    delivered += 1
+        self.delivered += delivered
+        now = time.time()
+        for change in changes:
+            if change.published_at:
+                self.fanout_latency.record(max(0.0, now - change.published_at))
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._connections)
+
+    def stats(self) -> Dict[str, Any]:
+        connections = list(self._connections)
+        return {
+            "worker": os.getpid(),
+            "connections": len(connections),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "coalesced": sum(conn.coalesced for conn in connections),
+            "overflows": sum(conn.overflows for conn in connections),
+            "slow_disconnects": self.slow_disconnects,
+            "queued": sum(len(conn._pending) for conn in connections),
+            "fanout_latency": self.fanout_latency.summary(),
+            "broadcast": self.backend.stats()
+        }
+
+
+# Global notification hub instance
+hub = NotificationHub(WS_SEND_QUEUE_SIZE, WS_SEND_TIMEOUT_SECONDS, WS_BATCH_MS)
+
+
+def publish_after_commit(session: Session, change: ChangeEvent) -> None:
+    """Queue an event on the session; it is published only if the transaction commits"""
+    session.info.setdefault(_PENDING_KEY, []).append(change)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    changes: List[ChangeEvent] = session.info.pop(_PENDING_KEY, None)
+    if not changes:
+        return
+    by_topic: Dict[str, List[ChangeEvent]] = {}
+    for change in changes:
+        by_topic.setdefault(change.topic, []).append(change)
+    batch: List[ChangeEvent] = []
+    for topic, topic_changes in by_topic.items():
+        if len(topic_changes) > WS_MAX_EVENTS_PER_COMMIT:
+            # Bulk operations (imports, roster syncs) become a single refetch
+            batch.append(ChangeEvent(topic=topic, entity=topic, action="resync"))
+        else:
+            batch.extend(topic_changes)
+    hub.publish(batch)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _columns(target: Any, fields: Optional[Iterable[str]] = None, changed_only: bool = False) -> Dict[str, Any]:
+    state = inspect(target)
+    names = fields if fields is not None else [column.key for column in state.mapper.column_attrs]
+    data = {}
+    for name in names:
+        if changed_only and not state.attrs[name].history.has_changes():
+            continue
+        data[name] = getattr(target, name)
+    return jsonable_encoder(data)
+
+
+# Roster columns safe to broadcast (no password hash or token state)
+_ROSTER_FIELDS = (
+    "name", "operator_handle", "email", "team_role", "onboarding_date", "operator_level",
+    "compliance_8570", "legal_document_status", "active", "avatar_id"
+)
+
+
+def _row_events(topic: str, fields: Optional[Tuple[str, ...]] = None,
+                owner: Callable[[Any], Dict[str, Any]] = lambda target: {}):
+    """Build insert/update/delete listeners that publish a model's row changes"""
+
+    def queue(target: Any, action: str, changed_only: bool = False) -> None:
+        session = object_session(target)
+        if session is None:
+            return
+        data = {} if action == "deleted" else _columns(target, fields, changed_only)
+        if action == "updated" and not data:
+            return
+        publish_after_commit(session, ChangeEvent(
+            topic=topic, entity=target.__tablename__, action=action, id=target.id, data=data, **owner(target)
+        ))
+
+    return (
+        lambda mapper, connection, target: queue(target, "added"),
+        lambda mapper, connection, target: queue(target, "updated", changed_only=True),
+        lambda mapper, connection, target: queue(target, "deleted"),
+    )
+
+
+def _listen_rows(model: Any, topic: str, **kwargs: Any) -> None:
+    added, updated, deleted = _row_events(topic, **kwargs)
+    event.listen(model, "after_insert", added)
+    event.listen(model, "after_update", updated)
+    event.listen(model, "after_delete", deleted)
+
+
+def _operator_owner(target: Any) -> Dict[str, Any]:
+    return {"owner_name": target.operator_name}
+
+
+_listen_rows(JQRTracker, "jqr_tracker", owner=_operator_owner)
+for _training_model in (RedTeamTraining, Certification, VendorTraining, SkillLevelHistory):
+    _listen_rows(_training_model, "training", owner=_operator_owner)
+_listen_rows(TeamRoster, "roster", fields=_ROSTER_FIELDS)
+
+
+@event.listens_for(AssessmentResponse, "after_update")
+def _assessment_graded(mapper, connection, target: AssessmentResponse) -> None:
+    history = inspect(target).attrs.status.history
+    if not history.has_changes() or target.status not in (AssessmentStatus.graded, AssessmentStatus.graded.value):
+        return
+    session = object_session(target)
+    if session is not None:
+        publish_after_commit(session, ChangeEvent(
+            topic="assessment", entity="assessment_responses", action="graded", id=target.id,
+            data=jsonable_encoder({
+                "assessment_id": target.assessment_id,
+                "operator_id": target.operator_id,
+                "final_score": target.final_score,
+                "graded_at": target.graded_at
+            }),
+            owner_id=target.operator_id
+        ))
+
+
+def _dashboard_image_changed(mapper, connection, target: Image) -> None:
+    if target.image_type != ImageType.dashboard or not target.is_active:
+        return
+    if not inspect(target).attrs.is_active.history.has_changes():
+        return
+    session = object_session(target)
+    if session is not None:
+        publish_after_commit(session, ChangeEvent(
+            topic="dashboard_image", entity="images", action="changed", id="active",
+            data={"image_id": target.id, "direct_url": f"/uploads/dashboard/{target.filename}"}
+        ))
+
+
+event.listen(Image, "after_insert", _dashboard_image_changed)
+event.listen(Image, "after_update", _dashboard_image_changed)
@@ -0,0 +1,92 @@
+from enum import Enum
+from typing import Any, Dict, List, Union
+
+from sqlalchemy import ColumnElement
+
+from .enums import Role
+
+# How each role is written in the team_role display string
+ROLE_LABELS: Dict[Role, str] = {
+    Role.ADMIN: "ADMIN",
+    Role.OPERATOR: "Operator",
+    Role.PLANNER: "Planner",
+    Role.DEVELOPER: "Developer",
+    Role.INFRASTRUCTURE: "Infrastructure",
+    Role.BRANCH_CHIEF: "Branch Chief",
+    Role.TEAM_MEMBER: "Team Member",
+}
+
+# Lower-cased spellings accepted in team_role values and roster CSV imports
+ROLE_ALIASES: Dict[str, Role] = {
+    "admin": Role.ADMIN,
+    "admins": Role.ADMIN,
+    "administrator": Role.ADMIN,
+    "operator": Role.OPERATOR,
+    "operators": Role.OPERATOR,
+    "planner": Role.PLANNER,
+    "planners": Role.PLANNER,
+    "developer": Role.DEVELOPER,
+    "developers": Role.DEVELOPER,
+    "infrastructure": Role.INFRASTRUCTURE,
+    "branch chief": Role.BRANCH_CHIEF,
+    "team member": Role.TEAM_MEMBER,
+    "team members": Role.TEAM_MEMBER,
+    "team": Role.TEAM_MEMBER,
+}
+
+
+def _split_roles(team_role: Union[str, List[str], None]) -> List[str]:
+    if team_role is None:
+        return []
+    if isinstance(team_role, Enum):
+        team_role = team_role.value
+    if isinstance(team_role, str):
+        team_role = team_role.split(",")
+    return [" ".join(str(role).replace("_", " ").split()) for role in team_role if str(role).strip()]
+
+
+def parse_roles(team_role: Union[str, List[str], None]) -> Role:
+    """Convert a comma-separated team_role string (or list of roles) to role flags"""
+    flags = Role(0)
+    for role in _split_roles(team_role):
+        flags |= ROLE_ALIASES.get(role.lower(), Role(0))
+    return flags
+
+
+def normalize_roles(team_role: Union[str, List[str], None]) -> str:
+    """
+    Rewrite known roles with their standard label, de-duplicated and sorted.
+    Unrecognized roles are kept, upper-cased, so no information is lost.
+    """
+    labels = set()
+    for role in _split_roles(team_role):
+        known = ROLE_ALIASES.get(role.lower())
+        labels.add(ROLE_LABELS[known] if known else role.upper())
+    return ", ".join(sorted(labels))
+
+
+def has_role(user: Any, *roles: Role) -> bool:
+    """Whether a TeamRoster row or Principal holds any of the given roles"""
+    flags = getattr(user, "role_flags", None)
+    if flags is None:
+        flags = parse_roles(getattr(user, "team_role", None))
+    wanted = Role(0)
+    for role in roles:
+        wanted |= role
+    return bool(flags & wanted)
+
+
+def role_filter(column: ColumnElement, *roles: Role) -> ColumnElement:
+    """
+    SQL condition matching rows that hold any of the given roles.
+
+    Spelled as an IN over every flag combination containing one of the roles
+    rather than a bitwise AND, so the database can use the column's index.
+    """
+    wanted = 0
+    for role in roles:
+        wanted |= int(role)
+    all_roles = 0
+    for role in Role:
+        all_roles |= int(role)
+    return column.in_([flags for flags in range(all_roles + 1) if flags & wanted])
@@ -1,5 +1,3 @@
-from fastapi import APIRouter
-
 from .team_roster import router as team_roster_router
 from .missions import router as missions_router
 from .training import router as training_router
@@ -9,15 +7,21 @@ from .images import router as images_router
 from .assessments import router as assessments_router
 from .reports import router as reports_router
 
-# Create main router
-router = APIRouter()
+# (router, prefix, tags). They are included straight into the app rather
+# than through one combined router: include_router copies every route, so
+# an intermediate router doubles that work on every worker boot.
+routers = [
+    (team_roster_router, "/team-roster", ["team-roster"]),
+    (missions_router, "/missions", ["missions"]),
+    (training_router, "", ["training"]),
+    (documents_router, "/training", None),
+    (jqr_router, "/jqr", ["jqr"]),
+    (images_router, "/images", ["images"]),
+    (assessments_router, "", ["assessments"]),
+    (reports_router, "", ["reports"]),
+]
+
 
-# Include all routers
-router.include_router(team_roster_router, prefix="/team-roster", tags=["team-roster"])
-router.include_router(missions_router, prefix="/missions", tags=["missions"])
-router.include_router(training_router, tags=["training"])
-router.include_router(documents_router, prefix="/training")
-router.include_router(jqr_router, prefix="/jqr", tags=["jqr"])
-router.include_router(images_router, prefix="/images", tags=["images"])
-router.include_router(assessments_router, tags=["assessments"])
-router.include_router(reports_router, tags=["reports"])
+def include_routers(app, prefix: str = "") -> None:
+    for router, path, tags in routers:
+        app.include_router(router, prefix=prefix + path, tags=tags)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, File, UploadFile, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, Path, File, UploadFile, Form, Request, Query
 from sqlalchemy.orm import Session
 from typing import List, Any, Optional
 from datetime import datetime
@@ -8,13 +8,17 @@ import logging
 
 from ..dependencies import get_db, get_current_user_dependency as get_current_user, admin_required_dependency as admin_required
 from ..models import Assessment, AssessmentQuestion, AssessmentResponse, QuestionResponse, TeamRoster, QuestionCategory
+from ..enums import Role
+from ..roles import has_role
 from ..schemas import (
     AssessmentCreate, AssessmentUpdate, AssessmentResponse as AssessmentResponseSchema,
     AssessmentResponseCreate, AssessmentResponseUpdate, AssessmentResponseResponse,
     QuestionResponseCreate, QuestionResponseUpdate, QuestionCategoryResponse, AssessmentCSVImport,
-    QuestionUpdate, QuestionCreate, QuestionReorder
+    QuestionUpdate, QuestionCreate, QuestionReorder, QuestionBankAnalytics,
+    GradingQueueItem, GradingClaimRequest, GradingQueueMetrics
 )
-from ..crud import assessment, assessment_response, category
+from ..crud import assessment, assessment_response, category, assessment_analytics
+from ..config import GRADING_LEASE_MINUTES
 
 router = APIRouter(prefix="/assessments", tags=["assessments"])
 
@@ -44,6 +48,58 @@ def get_categories(
     """Get all question categories."""
     return category.get_all(db)
 
+@router.get("/categories/{category_id}/analytics", response_model=QuestionBankAnalytics)
+def get_category_analytics(
+    category_id: int = Path(..., gt=0),
+    db: Session = Depends(get_db),
+    user: TeamRoster = Depends(admin_required)
+):
+    """Get difficulty and discrimination stats for every question in a category. Only admins can view analytics."""
+    if not category.get(db, category_id):
+        raise HTTPException(status_code=404, detail="Category not found")
+    return assessment_analytics.get_for_category(db, category_id)
+
+@router.get("/grading-queue", response_model=List[GradingQueueItem])
+def get_grading_queue(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    unclaimed_only: bool = False,
+    db: Session = Depends(get_db),
+    user: TeamRoster = Depends(admin_required)
+):
+    """List responses pending review, oldest first. Only admins can grade responses."""
+    return assessment_response.get_pending_queue(db, limit=limit, offset=offset, unclaimed_only=unclaimed_only)
+
+@router.post("/grading-queue/claim", response_model=List[GradingQueueItem])
+def claim_grading_work(
+    claim: GradingClaimRequest,
+    db: Session = Depends(get_db),
+    user: TeamRoster = Depends(admin_required)
+):
+    """Claim the oldest unclaimed pending responses under a time-limited lease."""
+    lease_minutes = claim.lease_minutes or GRADING_LEASE_MINUTES
+    return assessment_response.claim_next(db, user.id, claim.count, lease_minutes)
+
+@router.post("/grading-queue/{response_id}/release")
+def release_grading_claim(
+    response_id: int = Path(..., gt=0),
+    db: Session = Depends(get_db),
+    user: TeamRoster = Depends(admin_required)
+):
+    """Release the current user's claim on a response so another grader can take it."""
+    if not assessment_response.release_claim(db, response_id, user.id):
+        raise HTTPException(status_code=404, detail="No claim held on this response")
+    return {"message": "Claim released"}
+
+@router.get("/grading-queue/metrics", response_model=GradingQueueMetrics)
+def get_grading_queue_metrics(
+    window_days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_db),
+    user: TeamRoster = Depends(admin_required)
+):
+    """Queue depth and grading latency metrics."""
+    return assessment_response.get_queue_metrics(db, window_days)
+
 def process_question_category(db: Session, question_data: dict) -> int:
     """Process the category for a question, creating it if needed."""
     if question_data.get('category_id'):
@@ -146,6 +202,17 @@ def get_assessment_responses(
     
     return assessment_response.get_by_assessment(db, id)
 
+@router.get("/{id}/analytics", response_model=QuestionBankAnalytics)
+def get_assessment_analytics(
+    id: int = Path(..., gt=0),
+    db: Session = Depends(get_db),
+    user: TeamRoster = Depends(admin_required)
+):
+    """Get per-question difficulty and discrimination stats. Only admins can view analytics."""
+    if not db.query(Assessment.id).filter(Assessment.id == id).first():
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    return assessment_analytics.get_for_assessment(db, id)
+
 @router.post("/{id}/responses", response_model=AssessmentResponseResponse)
 def submit_assessment_response(
     response_data: AssessmentResponseCreate,
@@ -194,7 +261,7 @@ def get_assessment_response(
         raise HTTPException(status_code=404, detail="Assessment response not found")
     
     # Only allow admins or the response owner to view it
-    if "ADMIN" not in user.team_role.upper() and result.operator_id != user.id:
+    if not has_role(user, Role.ADMIN) and result.operator_id != user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view this response")
     
     return result
@@ -221,6 +288,10 @@ def grade_assessment_response(
     # Verify the response belongs to this assessment
     if result.assessment_id != assessment_id:
         raise HTTPException(status_code=404, detail="Assessment response not found")
+
+    # Don't grade over another grader's active claim
+    if assessment_response.is_claimed_by_other(result, user.id):
+        raise HTTPException(status_code=409, detail="Response is claimed by another grader")
     
     return assessment_response.update_grades(db, response_id, grades, user.id)
 
@@ -353,7 +424,7 @@ def create_question(
 ):
     """Add a new question to an assessment."""
     # Check if user has permission
-    if not current_user.team_role == "ADMIN":
+    if not has_role(current_user, Role.ADMIN):
         raise HTTPException(status_code=403, detail="Not authorized to add questions")
 
     # Check if assessment exists
@@ -377,6 +448,7 @@ def create_question(
     db.add(question)
     db.commit()
     db.refresh(question)
+    assessment_analytics.invalidate()
     return question
 
 @router.patch("/{assessment_id}/questions/reorder")
@@ -388,25 +460,20 @@ def reorder_questions(
 ):
     """Reorder questions in an assessment."""
     # Check if user has permission
-    if not current_user.team_role == "ADMIN":
+    if not has_role(current_user, Role.ADMIN):
         raise HTTPException(status_code=403, detail="Not authorized to reorder questions")
 
-    # Check if assessment exists
-    assessment_obj = assessment.get(db, assessment_id)
-    if not assessment_obj:
+    # Check if assessment exists (without loading its questions)
+    if not db.query(Assessment.id).filter(Assessment.id == assessment_id).first():
         raise HTTPException(status_code=404, detail="Assessment not found")
 
-    # Update order for each question
-    for update in updates.updates:
-        question = db.query(AssessmentQuestion).filter(
-            AssessmentQuestion.id == update.id,
-            AssessmentQuestion.assessment_id == assessment_id
-        ).first()
-        if not question:
-            raise HTTPException(status_code=404, detail=f"Question {update.id} not found")
-        question.order = update.order
+    # Later entries win if the same question is listed twice
+    orders = {update.id: update.order for update in updates.updates}
+    try:
+        assessment.reorder_questions(db, assessment_id, orders)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-    db.commit()
     return {"message": "Questions reordered successfully"}
 
 @router.patch("/{assessment_id}/questions/{question_id}")
@@ -419,7 +486,7 @@ def update_question(
 ):
     """Update a specific question in an assessment."""
     # Check if user has permission
-    if not current_user.team_role == "ADMIN":
+    if not has_role(current_user, Role.ADMIN):
         raise HTTPException(status_code=403, detail="Not authorized to update questions")
 
     # Check if assessment exists and belongs to user
@@ -449,6 +516,7 @@ def update_question(
 
     db.commit()
     db.refresh(question)
+    assessment_analytics.invalidate()
     return question
 
 @router.delete("/{assessment_id}/questions/{question_id}")
@@ -460,7 +528,7 @@ def delete_question(
 ):
     """Delete a specific question from an assessment."""
     # Check if user has permission
-    if not current_user.team_role == "ADMIN":
+    if not has_role(current_user, Role.ADMIN):
         raise HTTPException(status_code=403, detail="Not authorized to delete questions")
 
     # Check if assessment exists
@@ -478,4 +546,5 @@ def delete_question(
 
     db.delete(question)
     db.commit()
+    assessment_analytics.invalidate()
     return {"message": "Question deleted successfully"} 
\ No newline at end of file
@@ -5,6 +5,8 @@ from typing import Optional
 from ..auth import get_current_user
 from ..database import SessionLocal
 from ..models import RedTeamTraining, Certification, VendorTraining, SkillLevelHistory
+from ..enums import Role
+from ..roles import has_role
 from ..utils.file_utils import save_uploaded_file, delete_file
 from ..utils.constants import VALID_DOCUMENT_TYPES, DOCUMENT_URL_FIELD_MAP
 from ..utils.db_utils import update_document_url
@@ -42,7 +44,7 @@ async def upload_document(
         raise HTTPException(status_code=400, detail="Invalid document type")
     
     # Check if user has permission to upload for this operator
-    if user.team_role != "ADMIN" and user.name != operator_name:
+    if not has_role(user, Role.ADMIN) and user.name != operator_name:
         raise HTTPException(status_code=403, detail="You can only upload documents for your own records")
     
     # Save the file and get the relative path
@@ -89,7 +91,7 @@ async def delete_document(
         raise HTTPException(status_code=400, detail="Invalid document type")
     
     # Check if user has permission to delete for this operator
-    if user.team_role != "ADMIN" and user.name != operator_name:
+    if not has_role(user, Role.ADMIN) and user.name != operator_name:
         raise HTTPException(status_code=403, detail="You can only delete documents from your own records")
     
     # Get the record and file URL
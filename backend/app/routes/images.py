@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from ..database import SessionLocal
 from ..models import Image, ImageType, TeamRoster
 from ..auth import get_current_user
+from ..enums import Role
+from ..roles import has_role
 import os
 import uuid
 from datetime import datetime
@@ -20,8 +22,6 @@ def get_db():
         db.close()
 
 UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
 
 @router.post("/upload/")
 async def upload_image(
@@ -127,7 +127,7 @@ async def set_active_dashboard_image(
     db: Session = Depends(get_db),
     current_user: TeamRoster = Depends(get_current_user)
 ):
-    if "ADMIN" not in current_user.team_role.upper():
+    if not has_role(current_user, Role.ADMIN):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can set dashboard images"
@@ -215,7 +215,7 @@ async def delete_image(
         raise HTTPException(status_code=404, detail="Image not found")
     
     # Only allow users to delete their own images or admins to delete any image
-    if current_user.team_role != "ADMIN":
+    if not has_role(current_user, Role.ADMIN):
         raise HTTPException(status_code=403, detail="Not authorized to delete this image")
     
     # Delete file
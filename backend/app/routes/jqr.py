@@ -13,7 +13,9 @@ from ..schemas import (
     JQRTrackerResponse, JQRTrackerUpdate, JQRTrackerBulkUpdate, JQRTrackerCreate
 )
 from ..crud import jqr_item, jqr_tracker
-from ..enums import OperatorLevel
+from ..enums import OperatorLevel, Role
+from ..roles import has_role, parse_roles
+from ..principal_cache import Principal
 
 router = APIRouter(tags=["jqr"])
 
@@ -22,22 +24,9 @@ def isAdmin(user) -> bool:
     Check if a user has admin privileges.
     Consistent with frontend isAdmin check.
     """
-    try:
-        # First try object attribute access
-        team_role = getattr(user, "team_role", None)
-        if team_role is None and hasattr(user, "get"):
-            # Try dictionary access
-            team_role = user.get("team_role", None)
-            
-        # Handle both string and list roles
-        if isinstance(team_role, str):
-            return "ADMIN" in team_role
-        elif isinstance(team_role, (list, tuple)):
-            return "ADMIN" in team_role
-            
-        return False
-    except Exception:
-        return False
+    if isinstance(user, dict):
+        return bool(parse_roles(user.get("team_role")) & Role.ADMIN)
+    return has_role(user, Role.ADMIN)
 
 # JQR Questionnaire routes
 @router.get("/questionnaire", response_model=List[JQRItemResponse], summary="Get JQR questionnaire")
@@ -282,7 +271,7 @@ def update_jqr_tracker_item(
     id: int = Path(..., gt=0),
     tracker_data: JQRTrackerUpdate = Body(...),
     db: Session = Depends(get_db),
-    user: dict = Depends(get_current_user)
+    user: Principal = Depends(get_current_user)
 ):
     """
     Update a single JQR tracker item
@@ -298,40 +287,18 @@ def update_jqr_tracker_item(
     if not item:
         raise HTTPException(status_code=404, detail="JQR tracker item not found")
     
-    # Get user's role and name
-    try:
-        # First try object attributes
-        user_name = getattr(user, "name", None)
-        user_level = getattr(user, "operator_level", None)
-        
-        # If attributes are None, try dictionary access
-        if user_name is None and hasattr(user, "get"):
-            user_name = user.get("name", None)
-            user_level = user.get("operator_level", None)
-        
-        # If we still don't have the values and user is a TeamRoster object
-        if user_name is None and isinstance(user, TeamRoster):
-            user_name = user.name
-            user_level = user.operator_level
-            
-        if not user_name:
-            raise ValueError("Could not determine user name")
-            
-    except Exception as e:
+    # Name and level come straight from the verified token claims
+    user_name = user.name
+    user_level = user.operator_level
+    if not user_name:
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing user information: {str(e)}"
+            detail="Error processing user information: Could not determine user name"
         )
     
-    # If user level is missing, try to get it from the team roster
-    if user_level is None:
-        operator = db.query(TeamRoster).filter(TeamRoster.name == user_name).first()
-        if operator:
-            user_level = operator.operator_level
-        else:
-            # For admin users, assign a master level to ensure they can update anything
-            if isAdmin(user):
-                user_level = "Master"
+    # For admin users without a level, assign a master level to ensure they can update anything
+    if user_level is None and isAdmin(user):
+        user_level = "Master"
     
     # Check if this is the user's own record
     is_own_record = item.operator_name == user_name
@@ -1,31 +1,57 @@
 # backend/app/routes/team_roster.py
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Body, UploadFile, File
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Body, UploadFile, File, Query
 from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from ..auth import admin_required, get_current_user, verify_password, get_password_hash, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, authenticate_user
-from ..database import SessionLocal
+from ..auth import admin_required, get_current_user, get_current_user_record, get_db, has_usable_password, password_hasher, authenticate_token, issue_tokens, authenticate_user
+from ..password_hashing import PasswordHasherBusy
+from ..utils.metrics_utils import LatencyWindow
+from ..principal_cache import principal_cache
 from ..models import TeamRoster, Image
-from ..schemas import TeamRosterResponse, TeamRosterUpdate, TeamRosterBase, Token
-from ..ldap_auth import ldap_auth
+from ..schemas import TeamRosterResponse, TeamRosterUpdate, TeamRosterBase, Token, RefreshTokenRequest
+from .. import directory
+from fastapi.concurrency import run_in_threadpool
+from ..enums import AuthSource, Role
+from ..roles import has_role, normalize_roles, parse_roles, role_filter
+import logging
 import os
 import uuid
+import time
 from pathlib import Path
-from datetime import timedelta, datetime, date
+from datetime import datetime, date
 from ..config import UPLOAD_DIR
 import csv
 from io import StringIO
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
+# End-to-end /login latency, split by outcome
+login_latency = {"success": LatencyWindow(), "failure": LatencyWindow()}
+
+async def hash_password_or_503(password: str) -> str:
+    """Hash a password on the worker pool, shedding load when the pool is saturated"""
     try:
-        yield db
-    finally:
-        db.close()
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password service is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+
+async def verify_password_or_503(password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(password, hashed_password)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password service is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
 
 class LdapToggleRequest(BaseModel):
     enabled: bool
@@ -33,13 +59,14 @@ class LdapToggleRequest(BaseModel):
 @router.get("/ldap/status")
 async def get_ldap_status():
     """Get LDAP authentication status"""
+    ldap_auth = directory.authenticator() if directory.enabled() else None
     return {
-        "enabled": ldap_auth.enabled,
-        "host": ldap_auth.host if ldap_auth.enabled else None,
-        "port": ldap_auth.port if ldap_auth.enabled else None,
-        "label": ldap_auth.attributes.get("label", "LDAP") if ldap_auth.enabled else None,
-        "encryption": ldap_auth.encryption if ldap_auth.enabled else None,
-        "active_directory": ldap_auth.active_directory if ldap_auth.enabled else None
+        "enabled": ldap_auth is not None,
+        "host": ldap_auth.host if ldap_auth else None,
+        "port": ldap_auth.port if ldap_auth else None,
+        "label": ldap_auth.attributes.get("label", "LDAP") if ldap_auth else None,
+        "encryption": ldap_auth.encryption if ldap_auth else None,
+        "active_directory": ldap_auth.active_directory if ldap_auth else None
     }
 
 @router.post("/ldap/toggle")
@@ -52,8 +79,9 @@ async def toggle_ldap_status(
         # Update the environment variable
         os.environ["LDAP_ENABLED"] = str(enabled).lower()
         
-        # Reinitialize the LDAP authenticator
-        ldap_auth.enabled = enabled
+        # Reinitialize the LDAP authenticator; turning it off needn't import it
+        if enabled or directory.loaded():
+            directory.authenticator().enabled = enabled
         
         return {
             "success": True,
@@ -66,12 +94,59 @@ async def toggle_ldap_status(
             detail=f"Failed to toggle LDAP status: {str(e)}"
         )
 
+@router.post("/ldap/sync")
+async def sync_ldap_directory(
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(admin_required)
+):
+    """Create, update and deactivate LDAP accounts to match the directory"""
+    from .. import ldap_sync
+    from ldap3.core.exceptions import LDAPException
+    try:
+        return await run_in_threadpool(ldap_sync.sync_directory, db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ldap_sync.SyncInProgress:
+        raise HTTPException(status_code=409, detail="A directory sync is already running")
+    except LDAPException as e:
+        raise HTTPException(status_code=502, detail=f"LDAP directory sync failed: {e}")
+
+@router.get("/ldap/sync")
+async def get_ldap_sync_status(current_user: dict = Depends(admin_required)):
+    """Result of the most recent directory sync"""
+    from .. import ldap_sync
+    return {"last_sync": ldap_sync.last_sync_result}
+
+@router.get("/auth/cache-stats", response_model=dict)
+async def get_principal_cache_stats(current_user: dict = Depends(admin_required)):
+    """Hit/miss counters for the authenticated principal cache"""
+    return principal_cache.stats()
+
+@router.get("/auth/login-metrics", response_model=dict)
+async def get_login_metrics(current_user: dict = Depends(admin_required)):
+    """Login latency percentiles and password hashing pool utilisation"""
+    return {
+        "login": {outcome: window.summary() for outcome, window in login_latency.items()},
+        "password_hashing": password_hasher.stats(),
+        "ldap": directory.authenticator().stats() if directory.enabled() else None
+    }
+
 @router.get("", response_model=List[TeamRosterResponse])
 def read_team_roster(
+    role: Optional[List[str]] = Query(None, description="Only members holding any of these roles, e.g. ?role=planner"),
+    active: Optional[bool] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    roster = db.query(TeamRoster).order_by(TeamRoster.name.asc()).all()
+    query = db.query(TeamRoster)
+    if role:
+        role_flags = parse_roles(role)
+        if not role_flags:
+            raise HTTPException(status_code=400, detail=f"Unknown role: {', '.join(role)}")
+        query = query.filter(role_filter(TeamRoster.role_flags, role_flags))
+    if active is not None:
+        query = query.filter(TeamRoster.active == active)
+    roster = query.order_by(TeamRoster.name.asc()).all()
     return roster
 
 @router.get("/active-count", response_model=dict)
@@ -95,7 +170,7 @@ async def create_team_member(
         )
     
     # Hash the password
-    hashed_password = get_password_hash(member.password)
+    hashed_password = await hash_password_or_503(member.password)
     
     # Create the team roster entry
     entry_data = member.model_dump(exclude={'password'})
@@ -120,7 +195,7 @@ async def update_team_member(
     db: Session = Depends(get_db),
     current_user: dict = Depends(admin_required)
 ):
-    if "ADMIN" not in current_user.team_role.upper():
+    if not has_role(current_user, Role.ADMIN):
         raise HTTPException(status_code=403, detail="Only admins can update team members")
     
     db_member = db.query(TeamRoster).filter(TeamRoster.id == id).first()
@@ -149,7 +224,9 @@ async def update_team_member(
     update_data = member.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         if field == "password" and value:
-            setattr(db_member, "hashed_password", get_password_hash(value))
+            setattr(db_member, "hashed_password", await hash_password_or_503(value))
+            # An admin-set password makes this a local account again
+            db_member.auth_source = AuthSource.local
         else:
             setattr(db_member, field, value)
     
@@ -196,27 +273,55 @@ async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
+    started = time.perf_counter()
     # Use the unified authentication function that handles both local and LDAP
-    user = authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent logins, please retry",
+            headers={"Retry-After": "1"}
+        )
+    except directory.DirectoryUnavailable:
+        login_latency["failure"].record(time.perf_counter() - started)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Directory service is unavailable, please retry shortly",
+            headers={"Retry-After": "30"}
+        )
     
     if not user:
+        login_latency["failure"].record(time.perf_counter() - started)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username/email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={
-            "sub": user.operator_handle,
-            "role": user.team_role,
-            "name": user.name,
-        },
-        expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Warm the principal cache so the client's first requests skip the roster query
+    principal = principal_cache.put(user)
+
+    login_latency["success"].record(time.perf_counter() - started)
+    return issue_tokens(principal)
+
+@router.post("/refresh", response_model=Token)
+def refresh_access_token(
+    request: RefreshTokenRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Exchange a refresh token for a new access/refresh token pair without a
+    password check. Fails once the user's token_version has been bumped.
+    """
+    principal = authenticate_token(db, request.refresh_token, token_type="refresh")
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return issue_tokens(principal)
 
 @router.post("/create")
 async def create_team_member(
@@ -239,7 +344,7 @@ async def create_team_member(
         )
     
     # Create new team member
-    hashed_password = get_password_hash(password)
+    hashed_password = await hash_password_or_503(password)
     new_member = TeamRoster(
         name=name,
         operator_handle=operator_handle,
@@ -260,30 +365,32 @@ async def create_team_member(
 async def change_me_password(
     password_data: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: TeamRoster = Depends(get_current_user)
+    current_user: TeamRoster = Depends(get_current_user_record)
 ):
     try:
-        print(f"Received password change request: {password_data}")
         current_password = password_data.get("current_password")
         new_password = password_data.get("new_password")
         
         if not current_password or not new_password:
-            print(f"Missing password fields. Current: {bool(current_password)}, New: {bool(new_password)}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password and new password are required"
             )
         
-        print(f"Verifying current password for user {current_user.operator_handle}")
+        if not has_usable_password(current_user):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Password is managed by the directory (LDAP)"
+            )
+
         # Verify current password
-        if not verify_password(current_password, current_user.hashed_password):
-            print("Current password verification failed")
+        if not await verify_password_or_503(current_password, current_user.hashed_password):
+            logger.info("Password change for %s rejected: current password incorrect", current_user.operator_handle)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password is incorrect"
             )
         
-        print("Current password verified, updating to new password")
         # Get a fresh copy of the user from the database
         user = db.query(TeamRoster).filter(TeamRoster.id == current_user.id).first()
         if not user:
@@ -293,13 +400,13 @@ async def change_me_password(
             )
         
         # Update password
-        user.hashed_password = get_password_hash(new_password)
+        user.hashed_password = await hash_password_or_503(new_password)
         try:
             db.commit()
             db.refresh(user)
-            print("Password updated successfully")
+            logger.info("Password changed for %s", user.operator_handle)
         except Exception as e:
-            print(f"Database error during password update: {str(e)}")
+            logger.error("Database error during password update: %s", str(e))
             db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -317,7 +424,7 @@ async def change_me_password(
             "active": user.active
         }
     except Exception as e:
-        print(f"Unexpected error in password change: {str(e)}")
+        logger.debug("Password change failed: %s", str(e))
         raise
 
 @router.put("/{member_id}/password")
@@ -329,7 +436,7 @@ async def change_member_password(
     current_user: TeamRoster = Depends(get_current_user)
 ):
     # Verify current user is admin or the member themselves
-    if current_user.id != member_id and "ADMIN" not in current_user.team_role:
+    if current_user.id != member_id and not has_role(current_user, Role.ADMIN):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
@@ -343,14 +450,20 @@ async def change_member_password(
         )
     
     # If not admin, verify current password
-    if current_user.id == member_id and not verify_password(current_password, member.hashed_password):
+    if current_user.id == member_id and not has_usable_password(member):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Password is managed by the directory (LDAP)"
+        )
+    if current_user.id == member_id and not await verify_password_or_503(current_password, member.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Current password is incorrect"
         )
     
     # Update password
-    member.hashed_password = get_password_hash(new_password)
+    member.hashed_password = await hash_password_or_503(new_password)
+    member.auth_source = AuthSource.local
     db.commit()
     
     return {"message": "Password updated successfully"}
@@ -358,7 +471,7 @@ async def change_member_password(
 @router.get("/me")
 async def get_current_user_info(
     db: Session = Depends(get_db),
-    current_user: TeamRoster = Depends(get_current_user)
+    current_user: TeamRoster = Depends(get_current_user_record)
 ):
     # Load the avatar relationship
     avatar = None
@@ -428,7 +541,7 @@ async def upload_avatar(
 async def update_avatar(
     image_data: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: TeamRoster = Depends(get_current_user)
+    current_user: TeamRoster = Depends(get_current_user_record)
 ):
     # Get the image
     image = db.query(Image).filter(Image.id == image_data["image_id"]).first()
@@ -444,7 +557,7 @@ async def update_avatar(
             db.delete(current_user.avatar)
             db.commit()
         except Exception as e:
-            print(f"Error deleting old avatar: {str(e)}")
+            logger.warning("Error deleting old avatar: %s", str(e))
             # Continue even if deletion fails
     
     # Update user's avatar
@@ -465,7 +578,7 @@ async def update_avatar(
 @router.delete("/me/avatar")
 async def delete_avatar(
     db: Session = Depends(get_db),
-    current_user: TeamRoster = Depends(get_current_user)
+    current_user: TeamRoster = Depends(get_current_user_record)
 ):
     if not current_user.avatar:
         raise HTTPException(status_code=404, detail="No avatar found")
@@ -483,7 +596,7 @@ async def delete_avatar(
         current_user.avatar_id = None
         db.commit()
     except Exception as e:
-        print(f"Error deleting avatar: {str(e)}")
+        logger.error("Error deleting avatar: %s", str(e))
         raise HTTPException(status_code=500, detail="Failed to delete avatar")
     
     return {
@@ -501,7 +614,7 @@ async def delete_avatar(
 async def update_email(
     email_data: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: TeamRoster = Depends(get_current_user)
+    current_user: TeamRoster = Depends(get_current_user_record)
 ):
     new_email = email_data.get("email")
     if not new_email:
@@ -574,23 +687,6 @@ async def import_team_roster(
         csv_reader = csv.DictReader(csv_data)
         
         imported_members = []
-        role_mapping = {
-            'planners': 'Planner',
-            'planner': 'Planner',
-            'operators': 'Operator',
-            'operator': 'Operator',
-            'developers': 'Developer',
-            'developer': 'Developer',
-            'infrastructure': 'Infrastructure',
-            'branch chief': 'Branch Chief',
-            'team members': 'Team Member',
-            'team member': 'Team Member',
-            'team': 'Team Member',
-            'admin': 'ADMIN',
-            'administrator': 'ADMIN',
-            'admins': 'ADMIN'
-        }
-        
         compliance_mapping = {
             'compliant': 'Compliant',
             'non-compliant': 'Non-Compliant',
@@ -598,29 +694,11 @@ async def import_team_roster(
             'not compliant': 'Non-Compliant'
         }
         
-        def process_team_roles(roles_str):
-            """Process comma-separated roles and return standardized role string"""
-            if not roles_str:
-                return ''
-            
-            # Split by comma and clean up each role
-            roles = [role.strip().lower() for role in roles_str.split(',')]
-            
-            # Map each role and remove duplicates
-            mapped_roles = set()
-            for role in roles:
-                if role in role_mapping:
-                    mapped_roles.add(role_mapping[role])
-                else:
-                    # If role not found in mapping, keep original (capitalized)
-                    mapped_roles.add(role.upper())
-            
-            # Join roles with comma and space
-            return ', '.join(sorted(mapped_roles))
-        
         for row in csv_reader:
-            # Process team roles (can be single or comma-separated)
-            team_role = process_team_roles(row.get('team_role', ''))
+            # Process team roles (can be single or comma-separated); known roles and
+            # their aliases are standardized via roles.ROLE_ALIASES, from which the
+            # model derives the role_flags bitmask
+            team_role = normalize_roles(row.get('team_role', ''))
             
             # Map compliance statuses
             compliance_8570 = row.get('compliance_8570', '').strip().lower()
@@ -672,7 +750,7 @@ async def import_team_roster(
                 continue
             
             # Hash the default password
-            hashed_password = get_password_hash('temp')
+            hashed_password = await hash_password_or_503('temp')
             
             # Create new team member with hashed password
             entry = TeamRoster(
@@ -9,6 +9,8 @@ from ..dependencies import (
     create_owner_or_admin_required
 )
 from ..models import RedTeamTraining, Certification, VendorTraining, SkillLevelHistory, TeamRoster
+from ..enums import Role
+from ..roles import has_role
 from ..schemas import (
     RedTeamTrainingUpdate, RedTeamTrainingResponse,
     CertificationUpdate, CertificationResponse,
@@ -53,7 +55,7 @@ def create_red_team_training(
     Users can only create records for themselves.
     """
     # Ensure users can only create records for themselves
-    if user.team_role != "ADMIN" and data.operator_name != user.name:
+    if not has_role(user, Role.ADMIN) and data.operator_name != user.name:
         raise HTTPException(
             status_code=403,
             detail="You can only create records for yourself"
@@ -78,7 +80,7 @@ def update_red_team_training(
         raise HTTPException(status_code=404, detail="Training record not found")
     
     # Ensure users can only update their own records
-    if user.team_role != "ADMIN" and data.operator_name != user.name:
+    if not has_role(user, Role.ADMIN) and data.operator_name != user.name:
         raise HTTPException(
             status_code=403,
             detail="You can only update your own records"
@@ -135,7 +137,7 @@ def create_cert(
     Users can only create records for themselves.
     """
     # Ensure users can only create records for themselves
-    if user.team_role != "ADMIN" and data.operator_name != user.name:
+    if not has_role(user, Role.ADMIN) and data.operator_name != user.name:
         raise HTTPException(
             status_code=403,
             detail="You can only create records for yourself"
@@ -160,7 +162,7 @@ def update_cert(
         raise HTTPException(status_code=404, detail="Certification record not found")
     
     # Ensure users can only update their own records
-    if user.team_role != "ADMIN" and data.operator_name != user.name:
+    if not has_role(user, Role.ADMIN) and data.operator_name != user.name:
         raise HTTPException(
             status_code=403,
             detail="You can only update your own records"
@@ -217,7 +219,7 @@ def create_vendor_training(
     Users can only create records for themselves.
     """
     # Ensure users can only create records for themselves
-    if user.team_role != "ADMIN" and data.operator_name != user.name:
+    if not has_role(user, Role.ADMIN) and data.operator_name != user.name:
         raise HTTPException(
             status_code=403,
             detail="You can only create records for yourself"
@@ -242,7 +244,7 @@ def update_vendor_training(
         raise HTTPException(status_code=404, detail="Vendor training record not found")
     
     # Ensure users can only update their own records
-    if user.team_role != "ADMIN" and data.operator_name != user.name:
+    if not has_role(user, Role.ADMIN) and data.operator_name != user.name:
         raise HTTPException(
             status_code=403,
             detail="You can only update your own records"
@@ -299,7 +301,7 @@ def create_skill_level(
     Users can only create records for themselves.
     """
     # Ensure users can only create records for themselves
-    if user.team_role != "ADMIN" and data.operator_name != user.name:
+    if not has_role(user, Role.ADMIN) and data.operator_name != user.name:
         raise HTTPException(
             status_code=403,
             detail="You can only create records for yourself"
@@ -324,7 +326,7 @@ def update_skill_level(
         raise HTTPException(status_code=404, detail="Skill level history record not found")
     
     # Ensure users can only update their own records
-    if user.team_role != "ADMIN" and data.operator_name != user.name:
+    if not has_role(user, Role.ADMIN) and data.operator_name != user.name:
         raise HTTPException(
             status_code=403,
             detail="You can only update your own records"
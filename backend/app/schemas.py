@@ -1,8 +1,8 @@
 # backend/app/schemas.py
 from pydantic import BaseModel, EmailStr, Field
 from datetime import date, datetime
-from typing import Union, Optional, List
-from .enums import OperatorLevel, ComplianceStatus, UserRole
+from typing import Union, Optional, List, Dict
+from .enums import OperatorLevel, ComplianceStatus, UserRole, AuthSource
 from pydantic import validator
 import json
 from enum import Enum
@@ -31,6 +31,7 @@ class TeamRosterUpdate(TeamRosterBase):
 
 class TeamRosterResponse(TeamRosterBase):
     id: int
+    auth_source: Optional[AuthSource] = AuthSource.local
 
     model_config = {"from_attributes": True}  # Pydantic V2
 
@@ -244,6 +245,10 @@ class SkillLevelHistoryResponse(SkillLevelHistoryUpdate):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -555,6 +560,62 @@ class AssessmentResponseResponse(AssessmentResponseBase):
 
     model_config = {"from_attributes": True}
 
+class QuestionAnalytics(BaseModel):
+    """Difficulty and discrimination statistics for a single question."""
+    question_id: int
+    assessment_id: int
+    category_id: Optional[int] = None
+    question_text: str
+    question_type: str
+    points: int
+    response_count: int  # All answers submitted
+    scored_count: int  # Answers with a score (auto-scored or graded)
+    p_value: Optional[float] = None  # Mean fraction of points earned
+    discrimination: Optional[float] = None  # Corrected point-biserial correlation
+    average_points: Optional[float] = None
+    option_distribution: Optional[Dict[str, int]] = None  # Multiple choice only
+    options: Optional[List[str]] = None
+    correct_answer: Optional[str] = None
+    flags: List[str] = []
+
+class QuestionBankAnalytics(BaseModel):
+    """Question statistics for an assessment or a question category."""
+    scope: str  # "assessment" or "category"
+    scope_id: int
+    generated_at: datetime
+    response_count: int
+    question_count: int
+    mean_p_value: Optional[float] = None
+    questions: List[QuestionAnalytics] = []
+
+class GradingQueueItem(BaseModel):
+    """A response waiting for review in the grading queue."""
+    response_id: int
+    assessment_id: int
+    assessment_title: str
+    operator_id: int
+    operator_name: Optional[str] = None
+    completed_at: Optional[datetime] = None
+    age_seconds: Optional[int] = None
+    claimed_by: Optional[int] = None
+    claim_expires_at: Optional[datetime] = None
+
+class GradingClaimRequest(BaseModel):
+    """Request to claim the next pending responses."""
+    count: int = Field(1, ge=1, le=50)
+    lease_minutes: Optional[int] = Field(None, ge=1, le=240)
+
+class GradingQueueMetrics(BaseModel):
+    queue_depth: int
+    claimed: int
+    unclaimed: int
+    oldest_pending_age_seconds: Optional[int] = None
+    window_days: int
+    graded_in_window: int
+    latency_avg_seconds: Optional[float] = None
+    latency_p50_seconds: Optional[float] = None
+    latency_p95_seconds: Optional[float] = None
+
 class AssessmentCSVImport(BaseModel):
     title: str
     description: Optional[str] = None
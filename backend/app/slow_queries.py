@@ -0,0 +1,261 @@
+import atexit
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+from pythonjsonlogger import jsonlogger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import (
+    LOG_QUEUE_SIZE, SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS, SLOW_QUERY_LOG_BACKUPS, SLOW_QUERY_LOG_FILE,
+    SLOW_QUERY_LOG_MAX_BYTES, SLOW_QUERY_MS
+)
+from .logging_setup import NonBlockingQueueHandler, RequestIdFilter
+from .metrics import current_queries, route_name
+from .query_audit import normalize_sql
+
+logger = logging.getLogger(__name__)
+# Structured entries only; kept out of the main application log
+slow_logger = logging.getLogger("app.slow_queries")
+
+_EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+class SlowQueryFile:
+    """
+    The slow query log file, behind a queue like the application log.
+
+    app.slow_queries records are only put on a bounded queue by the thread
+    that logs them; a listener thread formats them as JSON lines and writes
+    and rotates the file.
+    """
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.handler: Optional[NonBlockingQueueHandler] = None
+        self.listener: Optional[QueueListener] = None
+        self.output: Optional[logging.Handler] = None
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def configure(self, path: str = SLOW_QUERY_LOG_FILE, max_bytes: int = SLOW_QUERY_LOG_MAX_BYTES,
+                  backups: int = SLOW_QUERY_LOG_BACKUPS, queue_size: int = LOG_QUEUE_SIZE) -> None:
+        if not path:
+            return
+        with self._lock:
+            if self.path == os.path.abspath(path):
+                return
+            self._stop()
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.output = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+            self.output.setFormatter(
+                jsonlogger.JsonFormatter("%(asctime)s %(levelname)s %(name)s %(request_id)s %(message)s")
+            )
+            log_queue: queue.Queue = queue.Queue(max(1, queue_size))
+            self.handler = NonBlockingQueueHandler(log_queue)
+            # The request id is read here, on the logging thread, before the record is queued
+            self.handler.addFilter(RequestIdFilter())
+            self.listener = QueueListener(log_queue, self.output)
+            self.listener.start()
+            self.path = os.path.abspath(path)
+            slow_logger.addHandler(self.handler)
+            slow_logger.setLevel(logging.INFO)
+            slow_logger.propagate = False
+
+    def stop(self) -> None:
+        """Write out everything queued, close the file and detach from app.slow_queries"""
+        with self._lock:
+            self._stop()
+
+    def _stop(self) -> None:
+        if self.listener is None:
+            return
+        slow_logger.removeHandler(self.handler)
+        slow_logger.propagate = True
+        self.listener.stop()
+        self.output.close()
+        self.path = self.handler = self.listener = self.output = None
+
+    def stats(self) -> Dict[str, Any]:
+        if self.handler is None:
+            return {"queued": 0, "dropped": 0}
+        return {"queued": self.handler.queue.qsize(), "dropped": self.handler.dropped}
+
+
+slow_query_file = SlowQueryFile()
+configure_slow_query_log = slow_query_file.configure
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """
+    Bound parameters with their values replaced by type names. Runs of one
+    type, as in an expanded IN list, are collapsed to "int x 40".
+    """
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        shape: List[str] = []
+        runs: List[int] = []
+        for value in parameters:
+            name = type(value).__name__
+            if shape and shape[-1] == name:
+                runs[-1] += 1
+            else:
+                shape.append(name)
+                runs.append(1)
+        return [name if run == 1 else f"{name} x {run}" for name, run in zip(shape, runs)]
+    return type(parameters).__name__
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(sql.encode()).hexdigest()[:12]
+
+
+class SlowQueryLog:
+    """
+    Logs statements slower than ``threshold_ms`` with their query plan.
+
+    Each entry records the normalized SQL, the shapes (not values) of its
+    parameters, its duration, the route being served and the EXPLAIN output.
+    A plan is captured at most once per statement shape every
+    ``explain_interval`` seconds, on a separate cursor of the same
+    connection. Entries are also aggregated in memory by shape for the
+    admin endpoint; each worker reports its own.
+    """
+
+    MAX_FINGERPRINTS = 500
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, explain_interval: float = SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+                 log_file: str = SLOW_QUERY_LOG_FILE):
+        self.threshold = threshold_ms / 1000
+        self.explain_interval = explain_interval
+        self.log_file = log_file
+        self._log_configured = False
+        self._queries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, engine: Engine) -> None:
+        if self.threshold <= 0:
+            return
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["slow_query_started"].pop()
+            if elapsed >= self.threshold:
+                self.record(conn.dialect.name, cursor, statement, parameters, executemany, elapsed)
+
+    def record(self, dialect: str, cursor: Any, statement: str, parameters: Any, executemany: bool,
+               seconds: float) -> None:
+        sql = normalize_sql(statement)
+        key = fingerprint(sql)
+        queries = current_queries.get()
+        route = route_name(queries.scope) if queries is not None and queries.scope is not None else "background"
+        if executemany and parameters:
+            shape = {"rows": len(parameters), "row": parameter_shape(parameters[0])}
+        else:
+            shape = parameter_shape(parameters)
+
+        now = time.time()
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is None:
+                if len(self._queries) >= self.MAX_FINGERPRINTS:
+                    # Forget the shape seen longest ago
+                    del self._queries[min(self._queries, key=lambda k: self._queries[k]["last_seen"])]
+                entry = self._queries[key] = {
+                    "fingerprint": key, "sql": sql, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "routes": {}, "parameters": shape, "plan": None, "explained_at": 0.0, "last_seen": now
+                }
+            entry["count"] += 1
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+            entry["routes"][route] = entry["routes"].get(route, 0) + 1
+            entry["last_seen"] = now
+            explain = now - entry["explained_at"] >= self.explain_interval
+            if explain:
+                entry["explained_at"] = now
+
+        plan = None
+        if explain:
+            plan = self.explain(dialect, cursor, statement, parameters[0] if executemany and parameters else parameters)
+            with self._lock:
+                entry["plan"] = plan
+
+        # The log file is opened by the first slow statement, not at import
+        if not self._log_configured:
+            configure_slow_query_log(self.log_file)
+            self._log_configured = True
+        slow_logger.warning("Slow query", extra={"query": {
+            "fingerprint": key,
+            "sql": sql,
+            "parameters": shape,
+            "ms": round(seconds * 1000, 2),
+            "route": route,
+            "plan": plan if explain else entry["plan"]
+        }})
+
+    @staticmethod
+    def explain(dialect: str, cursor: Any, statement: str, parameters: Any) -> Optional[List[str]]:
+        prefix = _EXPLAIN_PREFIXES.get(dialect)
+        if prefix is None or not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return None
+        explain_cursor = cursor.connection.cursor()
+        try:
+            if dialect == "postgresql":
+                # A failed EXPLAIN must not abort the request's transaction
+                explain_cursor.execute("SAVEPOINT rt3_explain")
+            try:
+                explain_cursor.execute(prefix + statement, parameters or ())
+                rows = explain_cursor.fetchall()
+            except Exception as e:
+                if dialect == "postgresql":
+                    explain_cursor.execute("ROLLBACK TO SAVEPOINT rt3_explain")
+                logger.debug("Could not explain slow query: %s", e)
+                return None
+            if dialect == "postgresql":
+                explain_cursor.execute("RELEASE SAVEPOINT rt3_explain")
+                return [row[0] for row in rows]
+            # SQLite rows are (id, parent, notused, detail); indent children under parents
+            depth = {0: 0}
+            lines = []
+            for node_id, parent, _, detail in rows:
+                depth[node_id] = depth.get(parent, 0) + 1
+                lines.append("  " * (depth[node_id] - 1) + detail)
+            return lines
+        finally:
+            explain_cursor.close()
+
+    def stats(self, limit: int = 50) -> Dict[str, Any]:
+        with self._lock:
+            entries = [dict(entry, routes=dict(entry["routes"])) for entry in self._queries.values()]
+        entries.sort(key=lambda e: -e["total_ms"])
+        for entry in entries:
+            entry["mean_ms"] = round(entry["total_ms"] / entry["count"], 2)
+            entry["total_ms"] = round(entry["total_ms"], 2)
+            entry["max_ms"] = round(entry["max_ms"], 2)
+            del entry["explained_at"]
+        return {
+            "worker": os.getpid(),
+            "threshold_ms": self.threshold * 1000,
+            "queries": entries[:limit]
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._queries.clear()
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,281 @@
+"""
+Incremental, deduplicated uploads backups.
+
+Files are stored once under ``<backup dir>/objects``, named by their
+SHA-256. An uploads backup is only a manifest, ``uploads_<timestamp>.json.gz``,
+listing each file's path, size, mtime and hash. A file whose size and
+mtime match the previous manifest is not read again, and a file whose
+content is already stored is not copied again, so a run where nothing
+changed writes just the manifest.
+
+    python -m app.upload_store list
+    python -m app.upload_store verify [SNAPSHOT] [--deep]
+    python -m app.upload_store restore SNAPSHOT TARGET [--overwrite]
+    python -m app.upload_store gc
+
+Pruning manifests (app.backup keeps BACKUP_KEEP) leaves objects no
+manifest refers to; ``collect_garbage`` removes them.
+"""
+
+import argparse
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .config import BACKUP_DIR
+
+CHUNK_SIZE = 1024 * 1024
+MANIFEST_PATTERN = "uploads_*.json.gz"
+# Unreferenced objects younger than this may belong to a snapshot still being written
+GC_GRACE_SECONDS = 3600
+
+
+class SnapshotError(Exception):
+    """A snapshot is missing, refers to missing or damaged objects, or cannot be restored"""
+
+
+class UploadStore:
+    """The manifests and shared objects of the uploads backups in ``directory``"""
+
+    def __init__(self, directory: str = BACKUP_DIR):
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def manifests(self) -> List[Path]:
+        """Snapshot manifests, oldest first"""
+        return sorted(self.directory.glob(MANIFEST_PATTERN))
+
+    def find(self, name: str) -> Path:
+        """A manifest by path, by file name in the backup directory, or "latest" """
+        if name == "latest":
+            manifests = self.manifests()
+            if not manifests:
+                raise SnapshotError(f"No uploads snapshots in {self.directory}")
+            return manifests[-1]
+        for candidate in (Path(name), self.directory / name):
+            if candidate.is_file():
+                return candidate
+        raise SnapshotError(f"Snapshot not found: {name}")
+
+    @staticmethod
+    def load(manifest: Path) -> Dict[str, object]:
+        with gzip.open(manifest, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Keeps a snapshot and a garbage collection from running at the same time"""
+        self.objects.mkdir(parents=True, exist_ok=True)
+        with open(self.objects / ".lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _store(self, path: str) -> Tuple[str, int, bool]:
+        """Copy a file into the store, hashing it as it is read; returns (sha256, size, newly stored)"""
+        fd, incoming = tempfile.mkstemp(dir=self.objects, prefix=".incoming-")
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with open(path, "rb") as src, os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            target = self.object_path(digest.hexdigest())
+            if target.exists():
+                os.remove(incoming)
+                return digest.hexdigest(), size, False
+            target.parent.mkdir(exist_ok=True)
+            os.replace(incoming, target)
+            return digest.hexdigest(), size, True
+        except BaseException:
+            if os.path.exists(incoming):
+                os.remove(incoming)
+            raise
+
+    def snapshot(self, source: str, manifest: str) -> int:
+        """
+        Store the files under ``source`` that the newest manifest does not
+        already account for and write a manifest of all of them to
+        ``manifest``. Returns the number of bytes newly stored.
+        """
+        if not os.path.isdir(source):
+            raise SnapshotError(f"Uploads directory not found: {source}")
+        with self.lock():
+            manifests = self.manifests()
+            previous = {entry["path"]: entry for entry in self.load(manifests[-1])["files"]} if manifests else {}
+            files = []
+            new_objects = new_bytes = 0
+            for root, dirs, names in os.walk(source):
+                dirs.sort()
+                for name in sorted(names):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.lstat(path)
+                        if not stat.S_ISREG(st.st_mode):
+                            continue
+                        relative = os.path.relpath(path, source).replace(os.sep, "/")
+                        known = previous.get(relative)
+                        if (known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns
+                                and self.object_path(known["sha256"]).exists()):
+                            digest, size = known["sha256"], st.st_size
+                        else:
+                            digest, size, added = self._store(path)
+                            if added:
+                                new_objects += 1
+                                new_bytes += size
+                    except FileNotFoundError:
+                        # Deleted while the snapshot was running
+                        continue
+                    files.append({"path": relative, "size": size, "mtime_ns": st.st_mtime_ns, "sha256": digest})
+
+            with gzip.open(manifest, "wt", encoding="utf-8") as f:
+                json.dump({
+                    "created_at": datetime.utcnow().isoformat(),
+                    "source": os.path.abspath(source),
+                    "total_bytes": sum(entry["size"] for entry in files),
+                    "new_objects": new_objects,
+                    "new_bytes": new_bytes,
+                    "files": files,
+                }, f)
+        return new_bytes
+
+    def verify(self, manifest: str, deep: bool = False) -> int:
+        """
+        Check every object a manifest refers to is present with the right
+        size, or with ``deep`` the right hash too. Returns the file count.
+        """
+        files = self.load(Path(manifest))["files"]
+        for entry in files:
+            path = self.object_path(entry["sha256"])
+            if not path.is_file() or path.stat().st_size != entry["size"]:
+                raise SnapshotError(f"Object for {entry['path']} is missing or truncated: {path}")
+            if deep and _sha256(path) != entry["sha256"]:
+                raise SnapshotError(f"Object for {entry['path']} is damaged: {path}")
+        return len(files)
+
+    def restore(self, manifest: str, target: str, overwrite: bool = False) -> int:
+        """
+        Materialize a snapshot's files, with their mtimes, under ``target``.
+        Every file is checked against its hash as it is copied. ``target``
+        must be empty unless ``overwrite`` is set; files the snapshot does
+        not contain are left alone. Returns the number of files written.
+        """
+        root = Path(target).resolve()
+        if root.exists() and any(root.iterdir()) and not overwrite:
+            raise SnapshotError(f"{root} is not empty (use --overwrite to restore into it)")
+        files = self.load(Path(manifest))["files"]
+        for entry in files:
+            destination = (root / entry["path"]).resolve()
+            if root not in destination.parents:
+                raise SnapshotError(f"Refusing to restore outside {root}: {entry['path']}")
+            source = self.object_path(entry["sha256"])
+            if not source.is_file():
+                raise SnapshotError(f"Object for {entry['path']} is missing: {source}")
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            fd, incoming = tempfile.mkstemp(dir=destination.parent, prefix=".restoring-")
+            try:
+                digest = hashlib.sha256()
+                with open(source, "rb") as src, os.fdopen(fd, "wb") as out:
+                    for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        out.write(chunk)
+                if digest.hexdigest() != entry["sha256"]:
+                    raise SnapshotError(f"Object for {entry['path']} is damaged: {source}")
+                os.utime(incoming, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+                os.replace(incoming, destination)
+            except BaseException:
+                if os.path.exists(incoming):
+                    os.remove(incoming)
+                raise
+        return len(files)
+
+    def collect_garbage(self, grace_seconds: float = GC_GRACE_SECONDS) -> Tuple[int, int]:
+        """Delete objects no manifest refers to; returns (objects removed, bytes freed)"""
+        if not self.objects.is_dir():
+            return 0, 0
+        with self.lock():
+            # A manifest that cannot be read raises here, before anything is deleted
+            referenced = set()
+            for manifest in self.manifests():
+                referenced.update(entry["sha256"] for entry in self.load(manifest)["files"])
+            cutoff = time.time() - grace_seconds
+            removed = freed = 0
+            for path in self.objects.glob("*/*"):
+                digest = path.parent.name + path.name
+                if digest in referenced:
+                    continue
+                st = path.stat()
+                if st.st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+                    freed += st.st_size
+            # Copies left behind by an interrupted snapshot
+            for path in self.objects.glob(".incoming-*"):
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+        return removed, freed
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="List, verify, restore and clean up uploads backups")
+    parser.add_argument("--directory", default=BACKUP_DIR, help="backup directory (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list snapshots, oldest first")
+    verify = commands.add_parser("verify", help="check a snapshot's objects are all present")
+    verify.add_argument("snapshot", nargs="?", default="latest", help="manifest name or path (default: latest)")
+    verify.add_argument("--deep", action="store_true", help="rehash every object")
+    restore = commands.add_parser("restore", help="write a snapshot's files to a directory")
+    restore.add_argument("snapshot", help='manifest name or path, or "latest"')
+    restore.add_argument("target", help="directory to restore into")
+    restore.add_argument("--overwrite", action="store_true", help="restore into a non-empty directory")
+    commands.add_parser("gc", help="delete objects no snapshot refers to")
+    args = parser.parse_args(argv)
+
+    store = UploadStore(args.directory)
+    try:
+        if args.command == "list":
+            for manifest in store.manifests():
+                snapshot = store.load(manifest)
+                print(f"{manifest.name}  {len(snapshot['files']):6d} files  "
+                      f"{snapshot['total_bytes'] / 1024 / 1024:9.1f} MB  "
+                      f"{snapshot['new_bytes'] / 1024 / 1024:9.1f} MB new")
+        elif args.command == "verify":
+            manifest = store.find(args.snapshot)
+            print(f"{manifest.name}: {store.verify(str(manifest), deep=args.deep)} files OK")
+        elif args.command == "restore":
+            manifest = store.find(args.snapshot)
+            count = store.restore(str(manifest), args.target, overwrite=args.overwrite)
+            print(f"Restored {count} files from {manifest.name} to {args.target}")
+        else:
+            removed, freed = store.collect_garbage()
+            print(f"Removed {removed} unreferenced objects ({freed / 1024 / 1024:.1f} MB)")
+    except SnapshotError as e:
+        raise SystemExit(f"ERROR: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
+import logging
 import os
 import shutil
 import uuid
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 BASE_UPLOAD_DIR = "uploads"
 
 def ensure_directory(path: str) -> None:
@@ -71,6 +74,6 @@ def delete_file(file_url: Optional[str]) -> bool:
             return True
     except Exception as e:
         # Log the error
-        print(f"Error deleting file: {str(e)}")
+        logger.warning("Error deleting file %s: %s", file_url, str(e))
     
     return False 
\ No newline at end of file
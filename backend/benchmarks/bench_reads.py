@@ -0,0 +1,56 @@
+"""
+Read paths: the roster sync, both reports, the JQR tracker and login.
+"""
+
+from sqlalchemy import text
+
+from app.crud.jqr import jqr_tracker
+from app.models import TeamRoster
+
+
+def bench_sync_with_roster_unchanged(dataset, bench):
+    def sync():
+        with dataset.session() as db:
+            assert jqr_tracker.sync_with_roster(db)["new_entries_created"] == 0
+
+    bench(sync)
+
+
+def bench_sync_with_roster_backfill(dataset, bench):
+    """A tenth of the tracker missing, as after members join or are promoted"""
+    def drop_rows():
+        dataset.fresh()
+        with dataset.engine.begin() as conn:
+            conn.execute(text("DELETE FROM jqr_tracker WHERE id % 10 = 0"))
+
+    def sync(_):
+        with dataset.session() as db:
+            assert jqr_tracker.sync_with_roster(db)["new_entries_created"] > 0
+
+    bench(sync, setup=drop_rows)
+
+
+def bench_annual_report(dataset, bench, client):
+    headers = dataset.admin_headers()
+    bench(lambda: client.get("/api/reports/annual-red-team-training", headers=headers).raise_for_status())
+
+
+def bench_quarterly_report(dataset, bench, client):
+    headers = dataset.admin_headers()
+    bench(lambda: client.get("/api/reports/quarterly-legal-briefings", headers=headers).raise_for_status())
+
+
+def bench_jqr_tracker(dataset, bench, client):
+    headers = dataset.admin_headers()
+    bench(lambda: client.get("/api/jqr/tracker", headers=headers).raise_for_status())
+
+
+def bench_login(dataset, bench, client):
+    with dataset.session() as db:
+        handles = [handle for (handle,) in db.query(TeamRoster.operator_handle).filter(TeamRoster.active == True).limit(10)]
+
+    def login():
+        for handle in handles:
+            client.post("/api/team-roster/login", data={"username": handle, "password": dataset.password}).raise_for_status()
+
+    bench(login)
@@ -0,0 +1,160 @@
+"""
+Write paths: roster, JQR and red team file imports, and assessment submission and grading.
+"""
+
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Assessment, AssessmentQuestion, AssessmentResponse, AssessmentStatus, TeamRoster
+from app.routes.red_team_training import extract_operator_from_filename
+
+IMPORT_ROWS = 50
+
+
+def bench_roster_csv_import(dataset, bench, client):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["name", "operator_handle", "email", "team_role", "onboarding_date", "operator_level",
+                     "compliance_8570", "legal_document_status", "active"])
+    for n in range(IMPORT_ROWS):
+        writer.writerow([f"Imported Member {n}", f"imported{n}", f"imported{n}@rt3.example", "Operator",
+                         "01/15/2025", "Apprentice", "compliant", "compliant", "true"])
+    body = out.getvalue().encode()
+
+    def setup():
+        dataset.fresh()
+        return dataset.admin_headers()
+
+    def upload(headers):
+        response = client.post("/api/team-roster/import", headers=headers,
+                               files={"file": ("roster.csv", body, "text/csv")})
+        response.raise_for_status()
+        assert len(response.json()) == IMPORT_ROWS
+
+    bench(upload, setup=setup)
+
+
+def bench_jqr_csv_import(dataset, bench, client):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["Task", "Description"])
+    for section in range(5):
+        writer.writerow([f"9.{section}", f"Imported Section {section}"])
+        for n in range(IMPORT_ROWS // 5):
+            writer.writerow([f"9.{section}.{n}.1", f"Imported task {section}.{n}"])
+    body = out.getvalue().encode()
+
+    def setup():
+        dataset.fresh()
+        return dataset.admin_headers()
+
+    def upload(headers):
+        response = client.post("/api/jqr/questionnaire/import", headers=headers, data={"section": "apprentice"},
+                               files={"file": ("jqr.csv", body, "text/csv")})
+        response.raise_for_status()
+        assert len(response.json()) == IMPORT_ROWS
+
+    bench(upload, setup=setup)
+
+
+def bench_red_team_file_import(dataset, bench, client):
+    with dataset.session() as db:
+        members = db.query(TeamRoster).filter(TeamRoster.active == True).all()
+    files = []
+    for name in [member.name for member in members]:
+        first, last = name.split()[:2]
+        agreement = f"{first}_{last}_Red_Team_Code_of_Conduct_Agreement_20260115.pdf"
+        # Only members the filename matcher resolves unambiguously
+        if extract_operator_from_filename(agreement, members) != name:
+            continue
+        files.append(("files", (agreement, b"%PDF-1.4", "application/pdf")))
+        files.append(("files", (f"{first}_{last}_Red_Team_Legal_Brief_Q1_20260115.pdf", b"%PDF-1.4", "application/pdf")))
+        if len(files) >= IMPORT_ROWS:
+            break
+    if not files:
+        pytest.skip(f"no member's name resolves to a red team file at scale {dataset.scale:g}")
+
+    def setup():
+        dataset.fresh()
+        return dataset.admin_headers()
+
+    def upload(headers):
+        response = client.post("/api/training/red-team/import", headers=headers, files=files)
+        response.raise_for_status()
+        assert not response.json().get("errors"), response.json()["errors"][:3]
+
+    bench(upload, setup=setup)
+
+
+def bench_assessment_submit(dataset, bench, client):
+    """Members answering an assessment they have not taken yet"""
+    # The first active assessment some active members have not answered; small
+    # datasets may have none
+    target_id, member_ids = None, []
+    with dataset.session() as db:
+        for assessment_id in db.scalars(
+            select(Assessment.id).where(Assessment.is_active == True).order_by(Assessment.id)
+        ):
+            answered = select(AssessmentResponse.operator_id).where(AssessmentResponse.assessment_id == assessment_id)
+            member_ids = db.scalars(
+                select(TeamRoster.id).where(TeamRoster.active == True, TeamRoster.id.not_in(answered))
+                .order_by(TeamRoster.id).limit(20)
+            ).all()
+            if member_ids:
+                target_id = assessment_id
+                break
+    if target_id is None:
+        pytest.skip(f"no active member has an active assessment left to take at scale {dataset.scale:g}")
+
+    def setup():
+        dataset.fresh()
+        with dataset.session() as db:
+            members = db.scalars(select(TeamRoster).where(TeamRoster.id.in_(member_ids))).all()
+            answers = []
+            for question in db.scalars(select(AssessmentQuestion).where(AssessmentQuestion.assessment_id == target_id)):
+                options = json.loads(question.options) if question.options else None
+                answers.append({"question_id": question.id, "answer": options[0] if options else "An answer"})
+            payload = {"assessment_id": target_id, "question_responses": answers}
+            return target_id, [dataset.headers(member) for member in members], payload
+
+    def submit(state):
+        assessment_id, member_headers, payload = state
+        for headers in member_headers:
+            client.post(f"/api/assessments/{assessment_id}/responses", headers=headers, json=payload).raise_for_status()
+
+    bench(submit, setup=setup)
+
+
+def bench_assessment_grade(dataset, bench, client):
+    with dataset.session() as db:
+        if db.scalars(select(AssessmentResponse.id).where(
+            AssessmentResponse.status == AssessmentStatus.pending_review
+        )).first() is None:
+            pytest.skip(f"no responses are waiting for review at scale {dataset.scale:g}")
+
+    def setup():
+        dataset.fresh()
+        with dataset.session() as db:
+            pending = db.scalars(
+                select(AssessmentResponse).where(AssessmentResponse.status == AssessmentStatus.pending_review)
+                .order_by(AssessmentResponse.id).limit(20)
+            ).all()
+            grades = [
+                (response.assessment_id, response.id,
+                 [{"question_id": qr.question_id, "points_awarded": 1, "feedback": "Benchmark"}
+                  for qr in response.question_responses])
+                for response in pending
+            ]
+            return dataset.headers(dataset.admin(db)), grades
+
+    def grade(state):
+        headers, grades = state
+        for assessment_id, response_id, body in grades:
+            client.put(f"/api/assessments/{assessment_id}/responses/{response_id}/grade", headers=headers,
+                       json=body).raise_for_status()
+
+    bench(grade, setup=setup)
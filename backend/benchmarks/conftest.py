@@ -0,0 +1,257 @@
+"""
+Benchmarks for the backend's hot paths, run against generated datasets.
+
+Each benchmark runs its operation several times on every dataset scale and
+records its wall time, the SQL statements executed and the peak
+Python memory allocated. Results are compared with the committed
+baseline.json; a benchmark fails when it is slower, allocates more or runs
+more statements than the baseline allows, or has no baseline entry.
+
+Environment:
+  RT3_BENCH_SCALES          dataset scales, comma-separated (default "1,5")
+  RT3_BENCH_SEED            dataset seed (default 1)
+  RT3_BENCH_ROUNDS          timed rounds per benchmark (default 5)
+  RT3_BENCH_DATA_DIR        keep generated datasets here between runs
+  RT3_BENCH_BASELINE        baseline file (default benchmarks/baseline.json)
+  RT3_BENCH_UPDATE          1 to write this run's results as the new baseline
+  RT3_BENCH_TIME_TOLERANCE  allowed slowdown, as a fraction (default 0.5)
+  RT3_BENCH_TIME_SLACK_MS   allowed slowdown in milliseconds on top of that (default 5)
+  RT3_BENCH_MEMORY_TOLERANCE allowed growth in peak memory (default 0.25)
+  RT3_BENCH_OUTPUT          also write this run's results to this file
+"""
+
+import gc
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import pytest
+
+# The app reads its configuration on import: keep its files in a scratch
+# directory, make password hashing cheap enough not to drown everything
+# else, and leave logging and the slow query log quiet
+WORK_DIR = Path(tempfile.mkdtemp(prefix="rt3-bench-"))
+os.chdir(WORK_DIR)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORK_DIR / 'bootstrap.db'}")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("SLOW_QUERY_MS", "0")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, select
+
+from app.auth import issue_tokens
+from app.crud import assessment_analytics
+from app.database import SessionLocal
+from app.enums import Role
+from app.main import app
+from app.models import TeamRoster
+from app.principal_cache import Principal, principal_cache
+from utils.generate_dataset import DatasetGenerator, write
+
+SCALES = [float(s) for s in os.getenv("RT3_BENCH_SCALES", "1,5").split(",") if s.strip()]
+SEED = int(os.getenv("RT3_BENCH_SEED", "1"))
+ROUNDS = int(os.getenv("RT3_BENCH_ROUNDS", "5"))
+DATA_DIR = os.getenv("RT3_BENCH_DATA_DIR", "")
+BASELINE = Path(os.getenv("RT3_BENCH_BASELINE", str(Path(__file__).parent / "baseline.json")))
+UPDATE_BASELINE = os.getenv("RT3_BENCH_UPDATE", "") == "1"
+TIME_TOLERANCE = float(os.getenv("RT3_BENCH_TIME_TOLERANCE", "0.5"))
+TIME_SLACK = float(os.getenv("RT3_BENCH_TIME_SLACK_MS", "5")) / 1000
+MEMORY_TOLERANCE = float(os.getenv("RT3_BENCH_MEMORY_TOLERANCE", "0.25"))
+OUTPUT = os.getenv("RT3_BENCH_OUTPUT", "")
+
+# Pinned so the datasets, and the reports over them, do not drift with the calendar
+AS_OF = date(2025, 12, 31)
+PASSWORD = "rt3-synthetic"
+
+results: Dict[str, Dict[str, Any]] = {}
+
+
+def _load_baseline() -> Dict[str, Dict[str, Any]]:
+    if not BASELINE.exists():
+        return {}
+    with open(BASELINE) as f:
+        return json.load(f)
+
+
+baseline = _load_baseline()
+
+
+class Dataset:
+    """
+    A generated dataset and a working copy of it that the app is bound to.
+
+    ``fresh()`` replaces the working copy with the pristine dataset, so
+    benchmarks that write start every round from the same state.
+    """
+
+    def __init__(self, scale: float, template: Path, work: Path):
+        self.scale = scale
+        self.template = template
+        self.work = work
+        self.engine = None
+        self.statements = 0
+        self.password = PASSWORD
+
+    def fresh(self) -> None:
+        if self.engine is not None:
+            self.engine.dispose()
+        shutil.copyfile(self.template, self.work)
+        self.engine = create_engine(f"sqlite:///{self.work}", connect_args={"check_same_thread": False})
+        event.listen(self.engine, "after_cursor_execute", self._count)
+        SessionLocal.configure(bind=self.engine)
+        # Nothing cached from another dataset or an earlier round may leak in
+        principal_cache.clear()
+        assessment_analytics.invalidate()
+
+    def _count(self, *args) -> None:
+        self.statements += 1
+
+    def session(self):
+        return SessionLocal()
+
+    def headers(self, user: TeamRoster) -> Dict[str, str]:
+        token = issue_tokens(Principal.from_user(user))["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    def admin(self, db) -> TeamRoster:
+        return db.scalars(
+            select(TeamRoster).where(TeamRoster.role_flags.op("&")(int(Role.ADMIN)) != 0).order_by(TeamRoster.id)
+        ).first()
+
+    def admin_headers(self) -> Dict[str, str]:
+        with self.session() as db:
+            return self.headers(self.admin(db))
+
+
+@pytest.fixture(scope="session")
+def client() -> TestClient:
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session", params=SCALES, ids=lambda scale: f"scale={scale:g}")
+def dataset(request, tmp_path_factory) -> Dataset:
+    scale = request.param
+    directory = Path(DATA_DIR) if DATA_DIR else tmp_path_factory.mktemp("datasets")
+    directory.mkdir(parents=True, exist_ok=True)
+    template = directory / f"rt3-scale{scale:g}-seed{SEED}-{AS_OF.isoformat()}.db"
+    if not template.exists():
+        partial = template.with_suffix(".partial")
+        partial.unlink(missing_ok=True)
+        engine = create_engine(f"sqlite:///{partial}")
+        write(engine, DatasetGenerator(scale=scale, seed=SEED, as_of=AS_OF, password=PASSWORD))
+        engine.dispose()
+        partial.rename(template)
+    data = Dataset(scale, template, WORK_DIR / f"work-scale{scale:g}.db")
+    data.fresh()
+    yield data
+    data.engine.dispose()
+
+
+def _regressions(result: Dict[str, Any], expected: Optional[Dict[str, Any]]) -> list:
+    if expected is None:
+        # A benchmark without a baseline could regress without anyone noticing
+        return ["no baseline entry; record one with RT3_BENCH_UPDATE=1"]
+    problems = []
+    if result["queries"] > expected["queries"]:
+        problems.append(f"SQL statements {expected['queries']} -> {result['queries']}")
+    # The fastest round is the one least disturbed by whatever else the machine is doing
+    if result["min_seconds"] > expected["min_seconds"] * (1 + TIME_TOLERANCE) + TIME_SLACK:
+        problems.append(f"fastest round {expected['min_seconds'] * 1000:.1f}ms -> {result['min_seconds'] * 1000:.1f}ms "
+                        f"(tolerance {TIME_TOLERANCE:.0%} + {TIME_SLACK * 1000:g}ms)")
+    if result["peak_kb"] > expected["peak_kb"] * (1 + MEMORY_TOLERANCE):
+        problems.append(f"peak memory {expected['peak_kb']:.0f}KB -> {result['peak_kb']:.0f}KB "
+                        f"(tolerance {MEMORY_TOLERANCE:.0%})")
+    return problems
+
+
+@pytest.fixture
+def bench(request, dataset):
+    """
+    ``bench(operation, setup=None)`` measures ``operation()`` on the current
+    dataset. ``setup()`` runs untimed before every round, including the
+    memory round, and its return value is passed to ``operation``. Every
+    benchmark starts on a pristine copy of the dataset.
+    """
+    dataset.fresh()
+
+    def run(operation: Callable, setup: Optional[Callable] = None, rounds: int = ROUNDS) -> Dict[str, Any]:
+        key = f"{request.node.originalname}[scale={dataset.scale:g}]"
+        timings, statements = [], []
+        # A warm-up round fills import, compile and connection caches
+        for round_number in range(rounds + 1):
+            state = setup() if setup else None
+            # Collect the previous round's garbage now rather than inside this one
+            gc.collect()
+            dataset.statements = 0
+            started = time.perf_counter()
+            operation(state) if setup else operation()
+            elapsed = time.perf_counter() - started
+            if round_number:
+                timings.append(elapsed)
+                statements.append(dataset.statements)
+
+        state = setup() if setup else None
+        gc.collect()
+        tracemalloc.start()
+        try:
+            operation(state) if setup else operation()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        result = {
+            "seconds": round(statistics.median(timings), 6),
+            "min_seconds": round(min(timings), 6),
+            "queries": max(statements),
+            "peak_kb": round(peak / 1024, 1),
+            "rounds": rounds,
+        }
+        results[key] = result
+        problems = _regressions(result, baseline.get(key))
+        if problems and not UPDATE_BASELINE:
+            pytest.fail(f"{key} does not match {BASELINE.name}: " + "; ".join(problems), pytrace=False)
+        return result
+
+    return run
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    if not results:
+        return
+    if OUTPUT:
+        with open(OUTPUT, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if UPDATE_BASELINE:
+        merged = {**baseline, **results}
+        with open(BASELINE, "w") as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not results:
+        return
+    terminalreporter.section("benchmarks")
+    width = max(len(key) for key in results)
+    terminalreporter.write_line(
+        f"{'benchmark':<{width}}  {'median':>10}  {'fastest':>10}  {'baseline':>10}  {'SQL':>6}  {'peak KB':>9}"
+    )
+    for key, result in sorted(results.items()):
+        base = baseline.get(key)
+        base_ms = f"{base['min_seconds'] * 1000:.1f}ms" if base else "-"
+        terminalreporter.write_line(
+            f"{key:<{width}}  {result['seconds'] * 1000:>8.1f}ms  {result['min_seconds'] * 1000:>8.1f}ms  "
+            f"{base_ms:>10}  {result['queries']:>6}  {result['peak_kb']:>9.0f}"
+        )
+    if UPDATE_BASELINE:
+        terminalreporter.write_line(f"Baseline written to {BASELINE}")
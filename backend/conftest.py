@@ -0,0 +1,3 @@
+# The benchmarks set up their own environment and datasets, and only run when
+# asked for: python -m pytest benchmarks
+collect_ignore = ["benchmarks"]
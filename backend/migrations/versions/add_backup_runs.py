@@ -0,0 +1,45 @@
+"""Add backup_runs table recording database and uploads backups
+
+Revision ID: add_backup_runs
+Revises: add_realtime_events
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_backup_runs'
+down_revision = 'add_realtime_events'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Check if table already exists before creating it
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+
+    if 'backup_runs' not in inspector.get_table_names():
+        op.create_table(
+            'backup_runs',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('kind', sa.String(), nullable=False),
+            sa.Column('status', sa.String(), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('duration_seconds', sa.Float(), nullable=True),
+            sa.Column('size_bytes', sa.BigInteger(), nullable=True),
+            sa.Column('path', sa.String(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+        )
+        op.create_index('ix_backup_runs_id', 'backup_runs', ['id'])
+        op.create_index('ix_backup_runs_started_at', 'backup_runs', ['started_at'])
+
+def downgrade():
+    # Check if table exists before dropping it
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+
+    if 'backup_runs' in inspector.get_table_names():
+        op.drop_index('ix_backup_runs_started_at', table_name='backup_runs')
+        op.drop_index('ix_backup_runs_id', table_name='backup_runs')
+        op.drop_table('backup_runs')
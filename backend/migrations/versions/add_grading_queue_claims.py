@@ -0,0 +1,48 @@
+"""Add grading queue claim columns and status index to assessment responses
+
+Revision ID: add_grading_queue_claims
+Revises: add_on_keyboard_fields
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_grading_queue_claims'
+down_revision = 'add_on_keyboard_fields'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'ix_assessment_responses_status_completed_at'
+
+def upgrade():
+    # Check if columns already exist before adding them
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = [col['name'] for col in inspector.get_columns('assessment_responses')]
+    indexes = [idx['name'] for idx in inspector.get_indexes('assessment_responses')]
+
+    # Lease columns for graders claiming pending responses
+    if 'claimed_by' not in columns:
+        op.add_column('assessment_responses', sa.Column('claimed_by', sa.Integer(), nullable=True))
+    if 'claim_expires_at' not in columns:
+        op.add_column('assessment_responses', sa.Column('claim_expires_at', sa.DateTime(), nullable=True))
+
+    # Index used to list pending responses by age
+    if INDEX_NAME not in indexes:
+        op.create_index(INDEX_NAME, 'assessment_responses', ['status', 'completed_at'])
+
+def downgrade():
+    # Check if columns exist before dropping them
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = [col['name'] for col in inspector.get_columns('assessment_responses')]
+    indexes = [idx['name'] for idx in inspector.get_indexes('assessment_responses')]
+
+    if INDEX_NAME in indexes:
+        op.drop_index(INDEX_NAME, table_name='assessment_responses')
+    if 'claim_expires_at' in columns:
+        op.drop_column('assessment_responses', 'claim_expires_at')
+    if 'claimed_by' in columns:
+        op.drop_column('assessment_responses', 'claimed_by')
@@ -0,0 +1,43 @@
+"""Add realtime_events table relaying WebSocket change events between workers
+
+Revision ID: add_realtime_events
+Revises: add_team_roster_role_flags
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_realtime_events'
+down_revision = 'add_team_roster_role_flags'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Check if table already exists before creating it
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+
+    if 'realtime_events' not in inspector.get_table_names():
+        op.create_table(
+            'realtime_events',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('origin', sa.String(), nullable=False),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            # Workers tail the table by id, so ids must not be reused after a prune
+            sqlite_autoincrement=True,
+        )
+        op.create_index('ix_realtime_events_id', 'realtime_events', ['id'])
+        op.create_index('ix_realtime_events_created_at', 'realtime_events', ['created_at'])
+
+def downgrade():
+    # Check if table exists before dropping it
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+
+    if 'realtime_events' in inspector.get_table_names():
+        op.drop_index('ix_realtime_events_created_at', table_name='realtime_events')
+        op.drop_index('ix_realtime_events_id', table_name='realtime_events')
+        op.drop_table('realtime_events')
@@ -0,0 +1,55 @@
+"""Add auth_source to team roster and replace placeholder hashes of directory accounts
+
+Revision ID: add_team_roster_auth_source
+Revises: add_grading_queue_claims
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from passlib.context import CryptContext
+
+# revision identifiers, used by Alembic
+revision = 'add_team_roster_auth_source'
+down_revision = 'add_grading_queue_claims'
+branch_labels = None
+depends_on = None
+
+# Must match app.auth.UNUSABLE_PASSWORD
+UNUSABLE_PASSWORD = '!'
+
+def upgrade():
+    # Check if column already exists before adding it
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = [col['name'] for col in inspector.get_columns('team_roster')]
+
+    if 'auth_source' not in columns:
+        op.add_column('team_roster', sa.Column('auth_source', sa.String(), nullable=False, server_default='local'))
+
+    # LDAP-provisioned accounts were given a bcrypt hash of "ldap_user_<handle>".
+    # Identify them by that hash and swap it for the unusable marker.
+    pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+    rows = connection.execute(sa.text(
+        "SELECT id, operator_handle, hashed_password FROM team_roster "
+        "WHERE auth_source = 'local' AND hashed_password IS NOT NULL AND operator_handle IS NOT NULL"
+    )).fetchall()
+    for row_id, handle, hashed_password in rows:
+        try:
+            is_directory_account = pwd_context.verify('ldap_user_' + handle, hashed_password)
+        except (ValueError, TypeError):
+            continue
+        if is_directory_account:
+            connection.execute(
+                sa.text("UPDATE team_roster SET auth_source = 'ldap', hashed_password = :marker WHERE id = :id"),
+                {'marker': UNUSABLE_PASSWORD, 'id': row_id}
+            )
+
+def downgrade():
+    # Check if column exists before dropping it
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = [col['name'] for col in inspector.get_columns('team_roster')]
+
+    if 'auth_source' in columns:
+        op.drop_column('team_roster', 'auth_source')
@@ -0,0 +1,59 @@
+"""Add indexed role_flags bitmask to team roster, parsed from team_role
+
+Revision ID: add_team_roster_role_flags
+Revises: add_team_roster_token_version
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_team_roster_role_flags'
+down_revision = 'add_team_roster_token_version'
+branch_labels = None
+depends_on = None
+
+# Must match app.enums.Role and app.roles.ROLE_ALIASES
+ROLE_BITS = {
+    'admin': 1, 'admins': 1, 'administrator': 1,
+    'operator': 2, 'operators': 2,
+    'planner': 4, 'planners': 4,
+    'developer': 8, 'developers': 8,
+    'infrastructure': 16,
+    'branch chief': 32,
+    'team member': 64, 'team members': 64, 'team': 64,
+}
+
+def parse_roles(team_role):
+    flags = 0
+    for role in (team_role or '').split(','):
+        flags |= ROLE_BITS.get(' '.join(role.replace('_', ' ').split()).lower(), 0)
+    return flags
+
+def upgrade():
+    # Check if column already exists before adding it
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = [col['name'] for col in inspector.get_columns('team_roster')]
+
+    if 'role_flags' not in columns:
+        op.add_column('team_roster', sa.Column('role_flags', sa.Integer(), nullable=False, server_default='0'))
+        op.create_index('ix_team_roster_role_flags', 'team_roster', ['role_flags'])
+
+    rows = connection.execute(sa.text("SELECT id, team_role FROM team_roster")).fetchall()
+    for row_id, team_role in rows:
+        connection.execute(
+            sa.text("UPDATE team_roster SET role_flags = :flags WHERE id = :id"),
+            {'flags': parse_roles(team_role), 'id': row_id}
+        )
+
+def downgrade():
+    # Check if column exists before dropping it
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = [col['name'] for col in inspector.get_columns('team_roster')]
+
+    if 'role_flags' in columns:
+        op.drop_index('ix_team_roster_role_flags', table_name='team_roster')
+        op.drop_column('team_roster', 'role_flags')
@@ -0,0 +1,33 @@
+"""Add token_version to team roster for access token revocation
+
+Revision ID: add_team_roster_token_version
+Revises: add_team_roster_auth_source
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_team_roster_token_version'
+down_revision = 'add_team_roster_auth_source'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Check if column already exists before adding it
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = [col['name'] for col in inspector.get_columns('team_roster')]
+
+    if 'token_version' not in columns:
+        op.add_column('team_roster', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+def downgrade():
+    # Check if column exists before dropping it
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = [col['name'] for col in inspector.get_columns('team_roster')]
+
+    if 'token_version' in columns:
+        op.drop_column('team_roster', 'token_version')
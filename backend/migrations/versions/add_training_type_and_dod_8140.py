@@ -1,7 +1,7 @@
 """Add training_type and dod_8140 fields
 
 Revision ID: add_training_type_and_dod_8140
-Revises: 
+Revises: create_base_schema
 Create Date: 2024-03-19
 
 """
@@ -10,7 +10,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic
 revision = 'add_training_type_and_dod_8140'
-down_revision = None
+down_revision = 'create_base_schema'
 branch_labels = None
 depends_on = None
 
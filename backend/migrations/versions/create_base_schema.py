@@ -0,0 +1,26 @@
+"""Create the base schema on an empty database
+
+Revision ID: create_base_schema
+Revises:
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+from app.models import Base
+
+# revision identifiers, used by Alembic
+revision = 'create_base_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # The schema predates the migrations, which only alter it, so the tables
+    # come from the models. Only missing tables are created; every later
+    # migration checks for its column or table first and skips what is here.
+    Base.metadata.create_all(bind=op.get_bind(), checkfirst=True)
+
+def downgrade():
+    # Downgrading to base keeps the data: drop the tables by hand if that is meant
+    pass
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk question reordering and question analytics against a SQLite
+session.
+"""
+
+import math
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import assessment, assessment_analytics
+from app.models import (
+    Assessment, AssessmentQuestion, AssessmentResponse, AssessmentStatus, Base, QuestionResponse, QuestionType
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    assessment_analytics.invalidate()
+    yield session
+    assessment_analytics.invalidate()
+    session.close()
+    engine.dispose()
+
+
+def add_assessment(db, questions=3):
+    quiz = Assessment(title="Quiz")
+    quiz.questions = [
+        AssessmentQuestion(question_text=f"Q{n}", question_type=QuestionType.free_form, order=n * 100)
+        for n in range(1, questions + 1)
+    ]
+    db.add(quiz)
+    db.commit()
+    return quiz
+
+
+def orders(db, quiz):
+    rows = db.query(AssessmentQuestion.question_text, AssessmentQuestion.order).filter(
+        AssessmentQuestion.assessment_id == quiz.id
+    ).order_by(AssessmentQuestion.order).all()
+    return [tuple(row) for row in rows]
+
+
+def test_reorder_updates_only_changed_rows_in_one_statement(db):
+    quiz = add_assessment(db)
+    q1, q2, q3 = quiz.questions
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE"):
+            updates.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    # Moving the third question between the first two; the first keeps its order
+    assert assessment.reorder_questions(db, quiz.id, {q1.id: 100, q2.id: 300, q3.id: 200}) == 2
+    event.remove(db.get_bind(), "before_cursor_execute", record)
+
+    assert len(updates) == 1 and "CASE" in updates[0]
+    assert orders(db, quiz) == [("Q1", 100), ("Q3", 200), ("Q2", 300)]
+    # Nothing changes, nothing is written
+    assert assessment.reorder_questions(db, quiz.id, {q1.id: 100}) == 0
+    assert assessment.reorder_questions(db, quiz.id, {}) == 0
+
+
+def test_reorder_refuses_questions_of_another_assessment(db):
+    quiz = add_assessment(db)
+    other = add_assessment(db, questions=1)
+    [foreign] = other.questions
+    q1 = quiz.questions[0]
+
+    with pytest.raises(ValueError, match=str(foreign.id)):
+        assessment.reorder_questions(db, quiz.id, {q1.id: 999, foreign.id: 1})
+    with pytest.raises(ValueError):
+        assessment.reorder_questions(db, quiz.id, {12345: 1})
+    # Nothing was applied, not even the valid part
+    assert orders(db, quiz)[0] == ("Q1", 100)
+    assert orders(db, other) == [("Q1", 100)]
+
+
+def pearson(xs, ys):
+    n = len(xs)
+    mx, my = sum(xs) / n, sum(ys) / n
+    cov = sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+    return cov / math.sqrt(sum((x - mx) ** 2 for x in xs) * sum((y - my) ** 2 for y in ys))
+
+
+def add_graded_quiz(db):
+    """Two one-point multiple choice questions and a two-point free-form one"""
+    quiz = Assessment(title="Analytics")
+    q1 = AssessmentQuestion(question_text="Q1", question_type=QuestionType.multiple_choice, points=1, order=1,
+                            options=["a", "b"], correct_answer="a")
+    q2 = AssessmentQuestion(question_text="Q2", question_type=QuestionType.multiple_choice, points=1, order=2,
+                            options=["a", "b"], correct_answer="a")
+    q3 = AssessmentQuestion(question_text="Q3", question_type=QuestionType.free_form, points=2, order=3)
+    quiz.questions = [q1, q2, q3]
+    db.add(quiz)
+    db.flush()
+    # (Q1 correct, Q2 correct, Q3 points awarded or None while ungraded)
+    for first, second, essay in [(1, 1, 2), (1, 0, 1), (0, 0, 0), (1, 1, 0), (None, None, None)]:
+        response = AssessmentResponse(assessment_id=quiz.id, status=AssessmentStatus.graded)
+        if first is not None:
+            response.question_responses += [
+                QuestionResponse(question_id=q1.id, answer="a" if first else "b", is_correct=bool(first)),
+                QuestionResponse(question_id=q2.id, answer="a" if second else "b", is_correct=bool(second)),
+            ]
+        response.question_responses.append(QuestionResponse(question_id=q3.id, answer="essay", points_awarded=essay))
+        db.add(response)
+    db.commit()
+    return quiz
+
+
+def test_difficulty_and_discrimination(db):
+    quiz = add_graded_quiz(db)
+    stats = assessment_analytics.get_for_assessment(db, quiz.id)
+    q1, q2, q3 = stats["questions"]
+    assert stats["response_count"] == 5 and stats["question_count"] == 3
+
+    assert (q1["p_value"], q2["p_value"], q3["p_value"]) == (0.75, 0.5, 0.375)
+    assert q1["option_distribution"] == {"a": 3, "b": 1} and q3["option_distribution"] is None
+    # The ungraded essay is answered but not scored
+    assert (q3["response_count"], q3["scored_count"], q3["average_points"]) == (5, 4, 0.75)
+
+    # Each item against the rest of the score, without its own points
+    items = {"Q1": [1, 1, 0, 1], "Q2": [1, 0, 0, 1], "Q3": [2, 1, 0, 0]}
+    totals = [sum(points) for points in zip(*items.values())]
+    for question in (q1, q2, q3):
+        own = items[question["question_text"]]
+        expected = pearson(own, [total - points for total, points in zip(totals, own)])
+        assert question["discrimination"] == pytest.approx(expected, abs=1e-4)
+    assert [q["flags"] for q in (q1, q2, q3)] == [[], [], []]
+
+
+def test_point_biserial_needs_variance():
+    assert assessment_analytics._point_biserial(1, 1, 1, 2, 4, 2) is None
+    # Everyone got the item right: no variance, no correlation
+    assert assessment_analytics._point_biserial(3, 3, 3, 6, 14, 6) is None
+
+
+def test_cached_analytics_are_invalidated_and_expire(db, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(assessment_analytics, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    quiz = add_graded_quiz(db)
+    first = assessment_analytics.get_for_assessment(db, quiz.id)
+    assert [q["question_text"] for q in first["questions"]] == ["Q1", "Q2", "Q3"]
+
+    # A write this worker did not see is served from the cache until the entry expires
+    db.add(AssessmentResponse(assessment_id=quiz.id))
+    db.commit()
+    assert assessment_analytics.get_for_assessment(db, quiz.id) is first
+    now[0] += assessment_analytics.ANALYTICS_CACHE_TTL_SECONDS + 1
+    second = assessment_analytics.get_for_assessment(db, quiz.id)
+    assert second["response_count"] == 6
+
+    # Reordering clears the cache at once
+    q1, q2, q3 = quiz.questions
+    assessment.reorder_questions(db, quiz.id, {q3.id: 0})
+    reordered = assessment_analytics.get_for_assessment(db, quiz.id)
+    assert [q["question_text"] for q in reordered["questions"]] == ["Q3", "Q1", "Q2"]
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for claims-bearing access tokens, token_version revocation and the
+principal cache.
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import authenticate_token, get_principal, issue_tokens
+from app.enums import Role
+from app.models import Base, TeamRoster
+from app.principal_cache import Principal, principal_cache
+from app.roles import has_role, normalize_roles, role_filter
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(TeamRoster(name="Operator", operator_handle="operator", email="operator@rt3.test",
+                      team_role="OPERATOR", operator_level="Journeyman", hashed_password="hash"))
+    db.commit()
+    principal_cache.clear()
+    return db
+
+
+def test_access_token_carries_claims():
+    db = make_session()
+    user = db.query(TeamRoster).one()
+    tokens = issue_tokens(Principal.from_user(user))
+
+    principal = authenticate_token(db, tokens["access_token"])
+    assert principal == Principal.from_user(user)
+    assert not has_role(principal, Role.ADMIN)
+    # Each token type is only accepted where it belongs
+    assert authenticate_token(db, tokens["refresh_token"]) is None
+    assert authenticate_token(db, tokens["access_token"], token_type="refresh") is None
+    assert authenticate_token(db, tokens["refresh_token"], token_type="refresh") == principal
+
+
+def test_role_change_revokes_tokens():
+    db = make_session()
+    user = db.query(TeamRoster).one()
+    tokens = issue_tokens(Principal.from_user(user))
+
+    # Fields that are not claims leave outstanding tokens valid
+    user.email = "new@rt3.test"
+    db.commit()
+    assert user.token_version == 0
+    assert authenticate_token(db, tokens["access_token"]) is not None
+
+    user.team_role = "ADMIN"
+    db.commit()
+    assert user.token_version == 1
+    assert authenticate_token(db, tokens["access_token"]) is None
+    assert authenticate_token(db, tokens["refresh_token"], token_type="refresh") is None
+
+    principal = authenticate_token(db, issue_tokens(Principal.from_user(user))["access_token"])
+    assert has_role(principal, Role.ADMIN)
+
+
+def test_principal_cache_is_invalidated_after_commit():
+    db = make_session()
+    user = db.query(TeamRoster).one()
+    cached = get_principal(db, "operator")
+    assert principal_cache.get("operator") is cached
+
+    # The change is not visible to other sessions until it commits, so neither is the eviction
+    user.operator_level = "Master"
+    db.flush()
+    assert principal_cache.get("operator") is cached
+    db.rollback()
+    assert principal_cache.get("operator") is cached
+
+    user.operator_level = "Master"
+    db.commit()
+    assert principal_cache.get("operator") is None
+    assert get_principal(db, "operator").operator_level == "Master"
+
+    # A rename evicts the entry under the old handle too
+    user.operator_handle = "renamed"
+    db.commit()
+    assert principal_cache.get("operator") is None
+    assert get_principal(db, "operator") is None
+    assert get_principal(db, "renamed").operator_handle == "renamed"
+
+
+def test_principal_cache_skips_rows_read_before_an_invalidation():
+    db = make_session()
+    user = db.query(TeamRoster).one()
+    generation = principal_cache.generation
+    principal_cache.invalidate("operator")
+    # Read before the invalidation: returned, but not cached
+    assert principal_cache.put(user, generation).operator_handle == "operator"
+    assert principal_cache.get("operator") is None
+    principal_cache.put(user, principal_cache.generation)
+    assert principal_cache.get("operator") is not None
+
+
+def test_roles_are_parsed_into_flags():
+    db = make_session()
+    db.add_all([
+        TeamRoster(name="Mixed", operator_handle="mixed", team_role="ADMIN, Operator", hashed_password="hash"),
+        TeamRoster(name="Planner", operator_handle="planner", team_role="planners", hashed_password="hash"),
+        TeamRoster(name="Sysadmin", operator_handle="sysadmin", team_role="SYSADMIN", hashed_password="hash"),
+    ])
+    db.commit()
+
+    by_handle = {member.operator_handle: member for member in db.query(TeamRoster)}
+    assert by_handle["mixed"].role_flags == Role.ADMIN | Role.OPERATOR
+    assert has_role(by_handle["mixed"], Role.ADMIN)
+    # Roles are matched whole, not by substring
+    assert by_handle["sysadmin"].role_flags == 0
+
+    operators = db.query(TeamRoster.operator_handle).filter(role_filter(TeamRoster.role_flags, Role.OPERATOR))
+    assert sorted(handle for handle, in operators) == ["mixed", "operator"]
+    planners = db.query(TeamRoster.operator_handle).filter(role_filter(TeamRoster.role_flags, Role.PLANNER))
+    assert [handle for handle, in planners] == ["planner"]
+
+    assert normalize_roles("admins, operator,Branch_Chief, foo") == "ADMIN, Branch Chief, FOO, Operator"
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Tests for online database snapshots, incremental uploads snapshots, their
+verification and the backup_runs record.
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.backup import (
+    BackupError, backup_database, backup_status, backup_uploads, prune, snapshot_sqlite, verify_sqlite_snapshot
+)
+from app.models import Base
+from app.upload_store import SnapshotError, UploadStore
+
+
+def fill(path, rows):
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY, body TEXT)")
+    db.executemany("INSERT INTO events (body) VALUES (?)", [("x" * 500,)] * rows)
+    db.commit()
+    db.close()
+
+
+@pytest.mark.parametrize("journal_mode", ["delete", "wal"])
+def test_snapshot_is_consistent_while_writers_commit(tmp_path, journal_mode):
+    source = str(tmp_path / "live.db")
+    fill(source, 2000)
+    db = sqlite3.connect(source)
+    db.execute(f"PRAGMA journal_mode={journal_mode}").fetchall()
+    db.close()
+    stop = threading.Event()
+    committed = []
+
+    def writer():
+        db = sqlite3.connect(source, timeout=30)
+        while not stop.is_set():
+            db.execute("INSERT INTO events (body) VALUES ('written during the backup')")
+            db.commit()
+            committed.append(1)
+        db.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        # Constant commits keep restarting a stepped copy, until it falls back to one step
+        snapshot_sqlite(source, str(tmp_path / "copy.db"), pages=16, online_seconds=0.5)
+    finally:
+        stop.set()
+        thread.join()
+
+    copy = sqlite3.connect(tmp_path / "copy.db")
+    assert copy.execute("PRAGMA integrity_check").fetchall() == [("ok",)]
+    assert 2000 <= copy.execute("SELECT COUNT(*) FROM events").fetchone()[0] <= 2000 + len(committed)
+    copy.close()
+    # Writers were not shut out while the copy ran
+    assert committed
+
+
+def test_backups_are_verified_recorded_and_pruned(tmp_path):
+    database = tmp_path / "rt3.db"
+    engine = create_engine(f"sqlite:///{database}")
+    Base.metadata.create_all(bind=engine)
+    fill(str(database), 100)
+    uploads = tmp_path / "uploads"
+    (uploads / "avatars").mkdir(parents=True)
+    (uploads / "avatars" / "jdoe.png").write_bytes(b"\x89PNG" * 100)
+    backups = tmp_path / "backup"
+    backups.mkdir()
+    db = sessionmaker(bind=engine)()
+    try:
+        for stamp in ("2026-10-19_000000", "2026-10-19_060000", "2026-10-19_120000"):
+            run = backup_database(db, str(backups), f"sqlite:///{database}", stamp=stamp)
+            assert run.status == "ok" and run.size_bytes > 0
+            assert backup_uploads(db, str(backups), str(uploads), stamp=stamp).status == "ok"
+        verify_sqlite_snapshot(str(backups / "db_2026-10-19_120000.sqlite3.gz"))
+
+        missing = backup_database(db, str(backups), f"sqlite:///{tmp_path / 'gone.db'}", stamp="2026-10-19_180000")
+        assert missing.status == "failed" and "not found" in missing.error
+        assert not list(backups.glob("*.part"))
+
+        assert prune(str(backups), "db", keep=2) == ["db_2026-10-19_000000.sqlite3.gz"]
+        assert len(list(backups.glob("uploads_*"))) == 3
+
+        status = backup_status(db)
+        assert [run["status"] for run in status["runs"]][:2] == ["failed", "ok"]
+        assert status["last_success"]["database"] is not None
+        assert status["last_success"]["uploads"] is not None
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_corrupt_snapshots_fail_verification(tmp_path):
+    snapshot = tmp_path / "db.sqlite3.gz"
+    with gzip.open(snapshot, "wb") as packed:
+        packed.write(b"SQLite format 3\x00" + b"\xff" * 4096)
+    with pytest.raises((BackupError, sqlite3.DatabaseError)):
+        verify_sqlite_snapshot(str(snapshot))
+
+
+def test_uploads_snapshots_store_each_file_once(tmp_path):
+    uploads = tmp_path / "uploads"
+    (uploads / "dashboard").mkdir(parents=True)
+    (uploads / "training").mkdir()
+    (uploads / "dashboard" / "banner.png").write_bytes(b"banner" * 1000)
+    (uploads / "training" / "guide.pdf").write_bytes(b"%PDF" * 5000)
+    (uploads / "training" / "guide-copy.pdf").write_bytes(b"%PDF" * 5000)
+    store = UploadStore(str(tmp_path / "backup"))
+
+    first = store.snapshot(str(uploads), str(tmp_path / "backup" / "uploads_2026-10-19_000000.json.gz"))
+    # The copy of the guide shares its object
+    assert first == 6000 + 20000
+    assert store.verify(str(store.find("latest")), deep=True) == 3
+
+    # Nothing changed: only a manifest is written
+    assert store.snapshot(str(uploads), str(tmp_path / "backup" / "uploads_2026-10-19_060000.json.gz")) == 0
+
+    (uploads / "dashboard" / "banner.png").write_bytes(b"new banner" * 1000)
+    os.remove(uploads / "training" / "guide-copy.pdf")
+    assert store.snapshot(str(uploads), str(tmp_path / "backup" / "uploads_2026-10-19_120000.json.gz")) == 10000
+    assert [entry["path"] for entry in store.load(store.find("latest"))["files"]] == [
+        "dashboard/banner.png", "training/guide.pdf"
+    ]
+
+    # Any snapshot can be restored, with the files' mtimes
+    restored = tmp_path / "restored"
+    assert store.restore(str(store.find("uploads_2026-10-19_000000.json.gz")), str(restored)) == 3
+    assert (restored / "dashboard" / "banner.png").read_bytes() == b"banner" * 1000
+    assert (restored / "training" / "guide-copy.pdf").read_bytes() == b"%PDF" * 5000
+    assert os.stat(restored / "training" / "guide.pdf").st_mtime_ns == os.stat(uploads / "training" / "guide.pdf").st_mtime_ns
+    with pytest.raises(SnapshotError):
+        store.restore(str(store.find("latest")), str(restored))
+
+    # Once the snapshots before the change are pruned, the old banner is the only unreferenced object
+    assert prune(str(tmp_path / "backup"), "uploads", keep=1) == [
+        "uploads_2026-10-19_000000.json.gz", "uploads_2026-10-19_060000.json.gz"
+    ]
+    assert store.collect_garbage(grace_seconds=0) == (1, 6000)
+    assert store.verify(str(store.find("latest")), deep=True) == 2
+
+
+def test_damaged_or_escaping_snapshots_are_refused(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    (uploads / "avatar.png").write_bytes(b"avatar")
+    store = UploadStore(str(tmp_path / "backup"))
+    manifest = tmp_path / "backup" / "uploads_2026-10-19_000000.json.gz"
+    store.snapshot(str(uploads), str(manifest))
+
+    [entry] = store.load(manifest)["files"]
+    store.object_path(entry["sha256"]).write_bytes(b"avatar!")
+    with pytest.raises(SnapshotError):
+        store.verify(str(manifest))
+    store.object_path(entry["sha256"]).write_bytes(b"avatxr")
+    with pytest.raises(SnapshotError, match="damaged"):
+        store.restore(str(manifest), str(tmp_path / "restored"))
+
+    escaping = tmp_path / "backup" / "uploads_2026-10-19_060000.json.gz"
+    with gzip.open(escaping, "wt") as f:
+        json.dump({"files": [dict(entry, path="../outside.png")]}, f)
+    with pytest.raises(SnapshotError, match="outside"):
+        store.restore(str(escaping), str(tmp_path / "elsewhere"))
+    assert not (tmp_path / "outside.png").exists()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for side-effect-free imports, the bootstrap step and the boot report.
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+from app.boot import BootReport, import_report, parse_importtime
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+
+def run(code_or_module, cwd, database, module=False):
+    env = {**os.environ, "PYTHONPATH": str(BACKEND_DIR), "DATABASE_URL": f"sqlite:///{database}",
+           "BCRYPT_ROUNDS": "4", "LDAP_ENABLED": "false"}
+    for name in ("LOG_FILE", "SLOW_QUERY_LOG_FILE", "PROFILE_DIR"):
+        env.pop(name, None)
+    args = [sys.executable, "-W", "ignore"] + (["-m", code_or_module] if module else ["-c", code_or_module])
+    result = subprocess.run(args, cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_importing_the_app_has_no_side_effects(tmp_path):
+    database = tmp_path / "data" / "rt3.db"
+    out = run("import sys, app.main; print('ldap3' in sys.modules)", tmp_path, database)
+    assert out.strip() == "False"
+    # No database, data, uploads or log directories
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bootstrap_prepares_a_fresh_database_once(tmp_path):
+    database = tmp_path / "data" / "rt3.db"
+    first = run("app.bootstrap", tmp_path, database, module=True)
+    second = run("app.bootstrap", tmp_path, database, module=True)
+    assert "default admin added" in first and "default admin added" not in second
+    assert (tmp_path / "uploads").is_dir()
+
+    with sqlite3.connect(database) as db:
+        [(version,)] = db.execute("SELECT version_num FROM alembic_version").fetchall()
+        admins = db.execute("SELECT active FROM team_roster WHERE operator_handle = 'admin'").fetchall()
+    heads = run("from alembic.script import ScriptDirectory; "
+                f"print(ScriptDirectory({str(BACKEND_DIR / 'migrations')!r}).get_current_head())", tmp_path, database)
+    assert version == heads.strip()
+    assert admins == [(0,)]
+
+
+def test_migrations_alone_build_the_schema_on_the_given_engine(tmp_path):
+    database = tmp_path / "other.db"
+    out = run("from sqlalchemy import create_engine, inspect\n"
+              "from app.bootstrap import migrate\n"
+              "from app.models import Base\n"
+              f"engine = create_engine('sqlite:///{database}')\n"
+              "migrate(engine)\n"
+              "print(sorted(set(Base.metadata.tables) - set(inspect(engine).get_table_names())))",
+              tmp_path, tmp_path / "data" / "rt3.db")
+    assert out.strip() == "[]"
+    # The configured database was not touched
+    assert not (tmp_path / "data").exists()
+
+
+def test_boot_and_import_reports():
+    report = BootReport()
+    report.mark("import")
+    with report.phase("broadcast"):
+        pass
+    report.finish()
+    stats = report.stats()
+    assert list(stats["phases_ms"]) == ["import", "broadcast"] and stats["finished"]
+
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:      1000 |       1000 |   sqlalchemy.sql",
+        "import time:      3000 |       4000 | sqlalchemy",
+        "import time:       500 |        500 |   app.config",
+        "import time:      2000 |       6500 | app.main",
+    ])
+    rows = parse_importtime(output)
+    assert [row.module for row in rows] == ["sqlalchemy.sql", "sqlalchemy", "app.config", "app.main"]
+    text = import_report(rows, top=5)
+    assert text.startswith("4 modules imported in 6ms")
+    assert "4.0ms   61.5%  sqlalchemy" in text
+    assert text.index("6.5ms       2.0ms  app.main") < text.index("0.5ms       0.5ms  app.config")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthetic dataset generator.
+"""
+
+from datetime import date
+from pathlib import Path
+
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import Session
+
+from app.crud.jqr import jqr_tracker
+from app.models import AssessmentResponse, JQRTracker, QuestionResponse, TeamRoster
+from utils.generate_dataset import DatasetGenerator, write
+
+AS_OF = date(2026, 6, 30)
+
+
+def small(seed=3):
+    return DatasetGenerator(scale=0.25, seed=seed, as_of=AS_OF, years=2, questions_per_assessment=5)
+
+
+def test_same_seed_same_rows():
+    first, second, other = small().build(), small().build(), small(seed=4).build()
+    for row in first[TeamRoster] + second[TeamRoster]:
+        # bcrypt salts each hash
+        del row["hashed_password"]
+    for model in first:
+        assert first[model] == second[model]
+    assert first[TeamRoster] != other[TeamRoster]
+
+
+def test_written_dataset_is_consistent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'scale.db'}")
+    counts = write(engine, small())
+
+    with Session(engine) as db:
+        assert db.scalar(select(func.count()).select_from(TeamRoster)) == counts["team_roster"] == 10
+        assert db.scalar(select(func.count()).select_from(JQRTracker)) == counts["jqr_tracker"] > 0
+        # Every response has an answer per question
+        assert counts["question_responses"] == counts["assessment_responses"] * 5
+        assert db.scalar(select(func.count()).select_from(AssessmentResponse)) == counts["assessment_responses"]
+        assert db.scalar(select(func.count(QuestionResponse.id))) == counts["question_responses"]
+        # The tracker already holds what a roster sync would create
+        assert jqr_tracker.sync_with_roster(db) == {"new_entries_created": 0, "orphaned_entries_deleted": 0}
+
+    # A second run must not silently mix datasets
+    try:
+        write(engine, small())
+    except SystemExit as e:
+        assert "--reset" in str(e)
+    else:
+        raise AssertionError("expected the populated database to be refused")
+    assert write(engine, small(), reset=True) == counts
+
+    # Built by the migrations, so bootstrap has none left to replay
+    head = ScriptDirectory(str(Path(__file__).resolve().parent / "migrations")).get_current_head()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar_one() == head
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the grading queue's claims and leases against a SQLite database.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import assessment_response
+from app.models import Assessment, AssessmentResponse, AssessmentStatus, Base, TeamRoster
+
+GRADERS = 6
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    # A file database, so every grader gets a connection of its own
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}",
+                           connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def add_pending(Session, count):
+    submitted = datetime.utcnow() - timedelta(hours=1)
+    with Session() as db:
+        db.add(TeamRoster(name="Operator", operator_handle="operator", email="operator@rt3.com"))
+        quiz = Assessment(title="Quiz")
+        db.add(quiz)
+        db.flush()
+        db.add_all([
+            AssessmentResponse(assessment_id=quiz.id, operator_id=1, status=AssessmentStatus.pending_review,
+                               completed_at=submitted + timedelta(minutes=n))
+            for n in range(count)
+        ])
+        db.commit()
+
+
+def test_claims_go_oldest_first_and_leases_expire(sessions):
+    add_pending(sessions, 3)
+    with sessions() as db:
+        claimed = assessment_response.claim_next(db, grader_id=10, count=2, lease_minutes=15)
+        assert [item["response_id"] for item in claimed] == [1, 2]
+        assert all(item["claimed_by"] == 10 for item in claimed)
+        assert [item["response_id"] for item in assessment_response.claim_next(db, 11, 5, 15)] == [3]
+        assert assessment_response.claim_next(db, 11, 5, 15) == []
+
+        # Once grader 10's lease runs out, its responses are up for grabs again
+        db.query(AssessmentResponse).filter(AssessmentResponse.claimed_by == 10).update(
+            {"claim_expires_at": datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+        assert [item["claimed_by"] for item in assessment_response.get_pending_queue(db)] == [None, None, 11]
+        assert [item["response_id"] for item in assessment_response.claim_next(db, 11, 5, 15)] == [1, 2]
+
+
+def test_only_the_holder_or_an_admin_releases_a_claim(sessions):
+    add_pending(sessions, 2)
+    with sessions() as db:
+        assessment_response.claim_next(db, grader_id=10, count=2, lease_minutes=15)
+        assert not assessment_response.release_claim(db, 1, grader_id=11)
+        assert assessment_response.release_claim(db, 1, grader_id=10)
+        # Released twice is a no-op
+        assert not assessment_response.release_claim(db, 1, grader_id=10)
+        # Without a grader, as for admins, any claim is released
+        assert assessment_response.release_claim(db, 2)
+        assert len(assessment_response.get_pending_queue(db, unclaimed_only=True)) == 2
+
+
+def test_concurrent_graders_never_share_a_response(sessions):
+    add_pending(sessions, 20)
+    start = threading.Barrier(GRADERS)
+    won = {}
+
+    def grader(grader_id):
+        with sessions() as db:
+            start.wait()
+            won[grader_id] = [item["response_id"] for item in assessment_response.claim_next(db, grader_id, 4, 15)]
+
+    threads = [threading.Thread(target=grader, args=(grader_id,)) for grader_id in range(100, 100 + GRADERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    claimed = [response_id for ids in won.values() for response_id in ids]
+    assert len(claimed) == len(set(claimed))
+    with sessions() as db:
+        holders = dict(db.query(AssessmentResponse.id, AssessmentResponse.claimed_by).all())
+    # Every response a grader was handed is recorded as theirs, and nobody got one they do not hold
+    assert all(holders[response_id] == grader_id for grader_id, ids in won.items() for response_id in ids)
+    assert {response_id for response_id, holder in holders.items() if holder is not None} == set(claimed)
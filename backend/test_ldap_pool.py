@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Tests for pooled LDAP authentication against an in-memory ldap3 mock directory.
+
+Run with pytest, or directly to benchmark login throughput:
+    python test_ldap_pool.py [logins] [threads]
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from ldap3 import Server, Connection, MOCK_SYNC, NONE
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.enums import AuthSource
+from app.ldap_auth import (
+    LDAPAuthenticator, LDAPCircuitBreaker, LDAPCircuitOpen, LDAPConnectionPool,
+    LDAPPoolTimeout, LDAPServerSet, LDAPUnavailable
+)
+from app.ldap_sync import sync_directory
+from app.models import Base, TeamRoster
+
+BASE_DN = "dc=rt3,dc=test"
+BIND_DN = f"cn=svc,{BASE_DN}"
+BIND_PASSWORD = "svc-secret"
+USERS = {f"operator{i}": f"password{i}" for i in range(20)}
+
+
+def make_authenticator() -> LDAPAuthenticator:
+    """Build an authenticator backed by a mock server seeded with test users"""
+    server = Server("mock-ldap", get_info=NONE)
+    seed = Connection(server, user=BIND_DN, password=BIND_PASSWORD, client_strategy=MOCK_SYNC)
+    seed.strategy.add_entry(BIND_DN, {"objectClass": "person", "userPassword": BIND_PASSWORD})
+    for handle, password in USERS.items():
+        seed.strategy.add_entry(f"cn={handle},ou=users,{BASE_DN}", {
+            "objectClass": "person",
+            "sAMAccountName": handle,
+            "mail": f"{handle}@rt3.test",
+            "displayName": handle.title(),
+            "userPassword": password
+        })
+
+    authenticator = LDAPAuthenticator(server=server, client_strategy=MOCK_SYNC)
+    authenticator.enabled = True
+    authenticator.bind_dn = BIND_DN
+    authenticator.bind_password = BIND_PASSWORD
+    authenticator.base_dn = BASE_DN
+    authenticator.user_filter = ""
+    authenticator.encryption = "none"
+    return authenticator
+
+
+def test_authenticate_reuses_pooled_connection():
+    authenticator = make_authenticator()
+    for _ in range(5):
+        info = authenticator.authenticate_user("operator1", "password1")
+        assert info["username"] == "operator1"
+        assert info["email"] == "operator1@rt3.test"
+        assert info["display_name"] == "Operator1"
+
+    stats = authenticator.pool.stats()
+    assert stats["created"] == 1
+    assert stats["reused"] == 4
+
+
+def test_rejects_bad_credentials():
+    authenticator = make_authenticator()
+    assert authenticator.authenticate_user("operator1", "wrong") is None
+    assert authenticator.authenticate_user("operator1", "") is None
+    assert authenticator.authenticate_user("nobody", "password1") is None
+    # Filter metacharacters in the username must not widen the search
+    assert authenticator.authenticate_user("operator*", "password1") is None
+
+
+def test_stale_connection_is_replaced():
+    authenticator = make_authenticator()
+    assert authenticator.authenticate_user("operator2", "password2")
+    with authenticator.pool.connection() as conn:
+        conn.unbind()
+
+    assert authenticator.authenticate_user("operator2", "password2")
+    stats = authenticator.pool.stats()
+    assert stats["discarded"] == 1
+    assert stats["created"] == 2
+
+
+def test_pool_is_bounded():
+    authenticator = make_authenticator()
+    pool = LDAPConnectionPool(authenticator._open_bind_connection, size=1, timeout=0.05, keepalive=60)
+    with pool.connection():
+        try:
+            with pool.connection():
+                raise AssertionError("second checkout should have timed out")
+        except LDAPPoolTimeout:
+            pass
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_failed_server_moves_to_back_of_order():
+    servers = LDAPServerSet(lambda host, port: Server(host, port=port, get_info=NONE),
+                            [("dc1", 389), ("dc2", 389), ("dc3", 389)], retry_seconds=60)
+    assert [s.host for s in servers.candidates()] == ["dc1", "dc2", "dc3"]
+
+    servers.record_failure(servers.candidates()[0], OSError("connection refused"))
+    assert [s.host for s in servers.candidates()] == ["dc2", "dc3", "dc1"]
+    assert servers.stats()["dc1:389"]["available"] is False
+
+    servers.strategy = "round_robin"
+    firsts = [servers.candidates()[0].host for _ in range(4)]
+    assert firsts == ["dc2", "dc3", "dc2", "dc3"]
+
+
+def test_unreachable_directory_trips_circuit_breaker():
+    # Nothing listens on these ports, so connects are refused immediately
+    authenticator = LDAPAuthenticator()
+    authenticator.enabled = True
+    authenticator.host = "127.0.0.1:9,127.0.0.1:10"
+    authenticator.bind_dn = BIND_DN
+    authenticator.bind_password = BIND_PASSWORD
+    authenticator.base_dn = BASE_DN
+    authenticator.encryption = "none"
+    authenticator.breaker = LDAPCircuitBreaker(failure_threshold=2, reset_seconds=60)
+
+    for _ in range(2):
+        with pytest.raises(LDAPUnavailable):
+            authenticator.authenticate_user("operator1", "password1")
+    with pytest.raises(LDAPCircuitOpen):
+        authenticator.authenticate_user("operator1", "password1")
+
+    stats = authenticator.stats()
+    assert stats["circuit"]["state"] == "open"
+    assert stats["circuit"]["rejected"] == 1
+    assert set(stats["servers"]) == {"127.0.0.1:9", "127.0.0.1:10"}
+    assert all(server["failures"] >= 1 for server in stats["servers"].values())
+
+
+def test_circuit_breaker_half_open_trial():
+    breaker = LDAPCircuitBreaker(failure_threshold=1, reset_seconds=0)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    # Reset period elapsed: one trial call is allowed, concurrent ones are not
+    breaker.allow()
+    with pytest.raises(LDAPCircuitOpen):
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_directory_sync_applies_only_changes():
+    authenticator = make_authenticator()
+    seed = Connection(authenticator._get_server(), client_strategy=MOCK_SYNC)
+    seed.strategy.add_entry(f"cn=retired,ou=users,{BASE_DN}", {
+        "objectClass": "person",
+        "sAMAccountName": "retired",
+        "userAccountControl": "514",  # NORMAL_ACCOUNT | ACCOUNTDISABLE
+        "userPassword": "x"
+    })
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        TeamRoster(name="Operator1", operator_handle="operator1", email="old@rt3.test",
+                   team_role="OPERATOR", auth_source=AuthSource.ldap, hashed_password="!"),
+        TeamRoster(name="Gone", operator_handle="gone", team_role="OPERATOR",
+                   auth_source=AuthSource.ldap, hashed_password="!"),
+        TeamRoster(name="Local", operator_handle="operator2", email="local@rt3.test",
+                   team_role="ADMIN", hashed_password="hash")
+    ])
+    db.commit()
+
+    result = sync_directory(db, authenticator, page_size=7)
+    assert result["directory_users"] == len(USERS) + 1
+    assert result["created"] == len(USERS) - 2
+    assert result["updated"] == 1
+    assert result["deactivated"] == 1
+
+    by_handle = {member.operator_handle: member for member in db.query(TeamRoster)}
+    assert by_handle["operator1"].email == "operator1@rt3.test"
+    assert by_handle["operator1"].name == "Operator1"
+    assert by_handle["gone"].active is False
+    assert by_handle["operator2"].email == "local@rt3.test"
+    assert by_handle["operator2"].auth_source == AuthSource.local
+    assert "retired" not in by_handle
+    assert by_handle["operator5"].auth_source == AuthSource.ldap
+
+    # A second run finds nothing to change
+    result = sync_directory(db, authenticator, page_size=7)
+    assert (result["created"], result["updated"], result["deactivated"]) == (0, 0, 0)
+
+
+def test_directory_login_only_claims_the_account_with_its_handle():
+    authenticator = make_authenticator()
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        # A different person who happens to have operator3's directory email
+        TeamRoster(name="J Doe", operator_handle="jdoe", email="operator3@rt3.test",
+                   team_role="ADMIN", hashed_password="local-hash"),
+        TeamRoster(name="Operator4", operator_handle="operator4", team_role="OPERATOR",
+                   hashed_password="hash4")
+    ])
+    db.commit()
+
+    info = authenticator.authenticate_user("operator3", "password3")
+    assert authenticator.get_or_create_user(db, info) is None
+    jdoe = db.query(TeamRoster).filter_by(operator_handle="jdoe").one()
+    assert (jdoe.auth_source, jdoe.hashed_password) == (AuthSource.local, "local-hash")
+    assert db.query(TeamRoster).filter_by(operator_handle="operator3").first() is None
+
+    # The account with the directory user's own handle moves to LDAP
+    user = authenticator.get_or_create_user(db, authenticator.authenticate_user("operator4", "password4"))
+    assert (user.operator_handle, user.auth_source) == ("operator4", AuthSource.ldap)
+    engine.dispose()
+
+
+def benchmark_login_throughput(logins: int = 1000, threads: int = 4, handshake_ms: float = 5.0) -> None:
+    """
+    Compare pooled logins with the previous connect-and-bind-per-login behaviour.
+
+    The mock directory has no network, so each newly opened connection sleeps
+    ``handshake_ms`` to stand in for the TCP/TLS handshake a real server costs.
+    """
+    authenticator = make_authenticator()
+    handles = list(USERS)
+    opened = [0]
+    original_bind = Connection.bind
+
+    def bind_with_handshake(conn, *args, **kwargs):
+        if conn.closed:
+            opened[0] += 1
+            time.sleep(handshake_ms / 1000)
+        return original_bind(conn, *args, **kwargs)
+
+    def pooled(i):
+        handle = handles[i % len(handles)]
+        return authenticator.authenticate_user(handle, USERS[handle])
+
+    def unpooled(i):
+        # Fresh service bind for every login, as before pooling
+        conn = authenticator._open_bind_connection()
+        try:
+            return pooled(i)
+        finally:
+            conn.unbind()
+
+    Connection.bind = bind_with_handshake
+    try:
+        for label, func in (("unpooled", unpooled), ("pooled", pooled)):
+            opened[0] = 0
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                started = time.perf_counter()
+                results = list(executor.map(func, range(logins)))
+                elapsed = time.perf_counter() - started
+            assert all(results)
+            print(f"{label:>9}: {logins / elapsed:8.0f} logins/s, "
+                  f"{opened[0] / logins:.2f} connections opened per login")
+    finally:
+        Connection.bind = original_bind
+    print(f"pool stats: {authenticator.pool.stats()}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    benchmark_login_throughput(*args)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the load test harness, against a small stand-in for the API.
+"""
+
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Form, HTTPException, Request
+
+from utils.load_test import Stats, anonymize, percentile, replay, route_of, run_scenarios
+
+ROSTER = [
+    {"name": "Admin User", "operator_handle": "admin", "team_role": "ADMIN, Operator", "active": True},
+    {"name": "Jane Doe", "operator_handle": "jdoe", "team_role": "Operator", "active": True},
+    {"name": "Ex Member", "operator_handle": "xmember", "team_role": "Operator", "active": False},
+]
+
+LOG = [
+    '10.0.0.5 - - [19/Oct/2026:10:00:00 +0000] "GET /api/team-roster/me HTTP/1.1" 200 312 "-" "Mozilla (X11)" "-"',
+    '10.0.0.5 - - [19/Oct/2026:10:00:00 +0000] "GET /static/js/main.js HTTP/1.1" 200 999 "-" "Mozilla (X11)" "-"',
+    '10.0.0.7 - - [19/Oct/2026:10:00:01 +0000] "GET /api/jqr/tracker?operator_name=Jane%20Doe&token=abc HTTP/1.1" '
+    '200 400 "-" "Mozilla (Mac)" "-"',
+    '10.0.0.5 - - [19/Oct/2026:10:00:02 +0000] "GET /api/missions/7 HTTP/1.1" 404 12 "-" "Mozilla (X11)" "-"',
+    '10.0.0.7 - - [19/Oct/2026:10:00:02 +0000] "POST /api/assessments/3/responses HTTP/1.1" 200 30 "-" "Mozilla (Mac)" "-"',
+    "not an access log line",
+]
+
+
+def make_api():
+    app = FastAPI()
+    seen = []
+
+    def caller(request: Request):
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        member = next((m for m in ROSTER if m["operator_handle"] == token), None)
+        if member is None:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        return member
+
+    @app.post("/api/team-roster/login")
+    def login(username: str = Form(...), password: str = Form(...)):
+        if password != "secret":
+            raise HTTPException(status_code=401, detail="Incorrect username or password")
+        return {"access_token": username, "token_type": "bearer"}
+
+    @app.get("/api/team-roster/me")
+    def me(request: Request):
+        return caller(request)
+
+    @app.get("/api/team-roster")
+    def roster(request: Request):
+        caller(request)
+        return ROSTER
+
+    @app.api_route("/api/{path:path}", methods=["GET", "POST"])
+    def anything(path: str, request: Request):
+        member = caller(request)
+        seen.append((member["operator_handle"], request.method, request.url.path, request.url.query))
+        return []
+
+    return app, seen
+
+
+def client_for(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://rt3")
+
+
+def test_routes_and_percentiles():
+    assert route_of("GET", "/api/assessments/12/responses/3?x=1") == "GET /api/assessments/{id}/responses/{id}"
+    assert route_of("GET", "/api/team-roster/") == "GET /api/team-roster"
+    assert percentile([], 50) == 0.0
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([1.0], 99) == 1.0
+
+    stats = Stats()
+    for ms in range(1, 101):
+        stats.record("GET /api/x", 200 if ms <= 98 else 500, ms / 1000)
+    stats.stop()
+    summary = stats.summary()["GET /api/x"]
+    assert (summary["count"], summary["errors"], summary["p50_ms"], summary["p99_ms"]) == (100, 2, 50.0, 99.0)
+
+
+def test_anonymize_drops_identities():
+    records = list(anonymize(LOG))
+    assert [r["user"] for r in records] == ["u1", "u2", "u1", "u2"]
+    assert [r["offset"] for r in records] == [0.0, 1.0, 2.0, 2.0]
+    assert records[1]["path"] == "/api/jqr/tracker?operator_name={operator}"
+    assert records[2] == {"offset": 2.0, "user": "u1", "method": "GET", "path": "/api/missions/7", "status": 404}
+    assert all("10.0.0" not in str(r) and "Jane" not in str(r) for r in records)
+    assert len(list(anonymize(LOG, include_all=True))) == 5
+
+
+def test_replay_plays_users_as_roster_members():
+    app, seen = make_api()
+
+    async def go():
+        async with client_for(app) as client:
+            return await replay(client, anonymize(LOG), "admin", "secret", speed=100)
+
+    stats = asyncio.run(go())
+    # Logged users are played by active members; writes are not replayed by default
+    assert ("jdoe", "GET", "/api/jqr/tracker", "operator_name=Jane%20Doe") in seen
+    assert not any(method == "POST" for _, method, _, _ in seen)
+    assert set(stats.summary()) == {"GET /api/team-roster/me", "GET /api/jqr/tracker", "GET /api/missions/{id}"}
+
+
+def test_scenarios_follow_client_call_sequences():
+    app, seen = make_api()
+
+    async def go():
+        async with client_for(app) as client:
+            return await run_scenarios(client, "admin", "secret", users=3, admins=1, duration=0.3, ramp_up=0.05,
+                                       think=0.01)
+
+    summary = asyncio.run(go()).summary()
+    assert sum(route["errors"] for route in summary.values()) == 0
+    assert {"GET /api/images/dashboard", "GET /api/missions/count", "GET /api/team-roster/active-count"} <= set(summary)
+    # Logins happen before the measured run
+    assert "POST /api/team-roster/login" not in summary
+    # Operators only look at their own tracker; admin-only calls come from the admin
+    assert all(query == "operator_name=Jane%20Doe" for who, _, path, query in seen
+               if who == "jdoe" and path == "/api/jqr/tracker")
+    assert {who for who, method, path, _ in seen if path == "/api/jqr/sync-tracker"} <= {"admin"}
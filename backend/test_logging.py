@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for the queued, structured logging pipeline.
+"""
+
+import json
+import logging
+import queue
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.logging_setup import LogPipeline, NonBlockingQueueHandler, parse_levels
+from app.middleware import RequestIdMiddleware
+
+logger = logging.getLogger("app.test_logging")
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.get("/sync")
+    def sync_route():
+        logger.info("served %s", "sync", extra={"rows": 3})
+        return {"ok": True}
+
+    @app.get("/fails")
+    def failing_route():
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("could not divide")
+        return {"ok": False}
+
+    return TestClient(app)
+
+
+def test_records_are_json_lines_with_request_ids(tmp_path):
+    log_file = tmp_path / "logs" / "app.log"
+    pipeline = LogPipeline()
+    pipeline.configure(level="INFO", fmt="json", log_file=str(log_file), console=False)
+    try:
+        client = make_app()
+        response = client.get("/sync", headers={"X-Request-ID": "abc-123"})
+        generated = client.get("/sync").headers["x-request-id"]
+        client.get("/sync", headers={"X-Request-ID": "bad id\\"})
+        client.get("/fails")
+    finally:
+        pipeline.stop()
+
+    assert response.headers["x-request-id"] == "abc-123"
+    records = [json.loads(line) for line in log_file.read_text().splitlines()]
+    served = [r for r in records if r["message"] == "served sync"]
+    assert [r["request_id"] for r in served[:2]] == ["abc-123", generated]
+    assert served[2]["request_id"] not in ("-", "bad id\\")
+    assert served[0]["rows"] == 3 and served[0]["name"] == "app.test_logging"
+    [failure] = [r for r in records if r["message"] == "could not divide"]
+    assert "ZeroDivisionError" in failure["exc_info"]
+
+
+def test_module_levels_and_full_queue_never_blocks(tmp_path):
+    assert parse_levels("app.crud=debug, sqlalchemy.engine=WARNING") == {
+        "app.crud": logging.DEBUG, "sqlalchemy.engine": logging.WARNING
+    }
+
+    handler = NonBlockingQueueHandler(queue.Queue(2))
+    noisy = logging.getLogger("app.test_logging.noisy")
+    noisy.addHandler(handler)
+    try:
+        for i in range(5):
+            noisy.warning("row %d", i)
+    finally:
+        noisy.removeHandler(handler)
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+    log_file = tmp_path / "app.log"
+    pipeline = LogPipeline()
+    pipeline.configure(level="INFO", fmt="text", log_file=str(log_file), console=False,
+                       module_levels="app.test_logging.quiet=ERROR")
+    try:
+        logging.getLogger("app.test_logging.quiet").warning("hidden")
+        logging.getLogger("app.test_logging.quiet").error("shown")
+        logger.debug("below the root level")
+    finally:
+        pipeline.stop()
+    assert log_file.read_text().splitlines()[-1].endswith("[-] shown")
+    assert "hidden" not in log_file.read_text() and "below the root level" not in log_file.read_text()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus metrics registry and its multi-worker merging.
+"""
+
+import json
+import os
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.metrics import MetricsRegistry, RequestQueries, current_queries, instrument_engine
+
+
+def make_registry(directory=""):
+    registry = MetricsRegistry(directory, stale_seconds=30)
+    requests = registry.counter("requests_total", "Requests", ("route", "status"))
+    duration = registry.histogram("duration_seconds", "Duration", ("route",), buckets=(0.1, 1))
+    in_flight = registry.gauge("in_flight", "In flight")
+    return registry, requests, duration, in_flight
+
+
+def test_render_text_format():
+    registry, requests, duration, in_flight = make_registry()
+    requests.inc("/api/items/{id}", "200")
+    requests.inc("/api/items/{id}", "200")
+    duration.observe(0.05, "/api/items/{id}")
+    duration.observe(0.1, "/api/items/{id}")
+    duration.observe(3, "/api/items/{id}")
+    in_flight.inc()
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/api/items/{id}",status="200"} 2' in lines
+    # Buckets are cumulative and a value equal to a bound falls in that bucket
+    assert 'duration_seconds_bucket{route="/api/items/{id}",le="0.1"} 2' in lines
+    assert 'duration_seconds_bucket{route="/api/items/{id}",le="1"} 2' in lines
+    assert 'duration_seconds_bucket{route="/api/items/{id}",le="+Inf"} 3' in lines
+    assert 'duration_seconds_count{route="/api/items/{id}"} 3' in lines
+    assert "in_flight 1" in lines
+
+
+def test_workers_are_merged_and_stale_gauges_dropped(tmp_path):
+    registry, requests, duration, in_flight = make_registry(str(tmp_path))
+    requests.inc("/a", "200")
+    duration.observe(0.5, "/a")
+    in_flight.inc()
+
+    # Two other workers' snapshots: one current, one from a worker that exited
+    for pid, written_at in ((101, time.time()), (102, time.time() - 300)):
+        other, other_requests, other_duration, other_in_flight = make_registry()
+        other_requests.inc("/a", "200", amount=5)
+        other_duration.observe(2, "/a")
+        other_in_flight.inc(amount=4)
+        with open(os.path.join(tmp_path, f"metrics-{pid}.json"), "w") as f:
+            json.dump({"pid": pid, "written_at": written_at, "metrics": other.snapshot()}, f)
+
+    lines = registry.render().splitlines()
+    assert 'requests_total{route="/a",status="200"} 11' in lines
+    assert 'duration_seconds_bucket{route="/a",le="1"} 1' in lines
+    assert 'duration_seconds_count{route="/a"} 3' in lines
+    assert "in_flight 5" in lines
+
+
+def test_engine_statements_are_counted_per_request():
+    registry = MetricsRegistry()
+    engine = create_engine("sqlite://")
+    instrument_engine(engine, registry)
+
+    queries = RequestQueries()
+    token = current_queries.set(queries)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+    finally:
+        current_queries.reset(token)
+
+    assert queries.statements == 3
+    assert queries.seconds > 0
+    assert "rt3_db_statement_duration_seconds_count 3" in registry.render().splitlines()
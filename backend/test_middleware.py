@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the pure ASGI trailing-slash and timing middleware.
+
+Run with pytest, or directly to benchmark them against the previous
+BaseHTTPMiddleware implementation:
+    python test_middleware.py [requests] [file_mb]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+from fastapi.testclient import TestClient
+
+from app.middleware import RequestTimer, TimingMiddleware, TrailingSlashMiddleware
+
+
+def make_app(timer=None, legacy=False, file_path=None):
+    """A small app with the same route shapes as the API: plain, with an id, and trailing-slash"""
+    app = FastAPI()
+    calls = []
+
+    @app.get("/api/items")
+    def list_items():
+        calls.append("list")
+        return {"items": [1, 2, 3]}
+
+    @app.get("/api/items/{item_id}")
+    def get_item(item_id: int):
+        calls.append(item_id)
+        return {"id": item_id}
+
+    @app.post("/api/images/upload/")
+    def upload():
+        calls.append("upload")
+        return {"uploaded": True}
+
+    @app.put("/api/images/{image_id}")
+    def update_image(image_id: int):
+        calls.append(("image", image_id))
+        return {"id": image_id}
+
+    if file_path:
+        @app.get("/uploads/big.bin")
+        def big_file():
+            return FileResponse(file_path)
+
+    if legacy:
+        @app.middleware("http")
+        async def trailing_slash_middleware(request: Request, call_next):
+            # The BaseHTTPMiddleware this replaced, minus its unreachable 404 retry
+            path = request.url.path
+            if path == "/" or path.startswith("/uploads/"):
+                return await call_next(request)
+            if path.endswith("/") and len(path) > 1:
+                request.scope["path"] = path.rstrip("/")
+            return await call_next(request)
+    else:
+        app.add_middleware(TrailingSlashMiddleware, router=app.router)
+        app.add_middleware(TimingMiddleware, timer=timer or RequestTimer())
+    return app, calls
+
+
+def test_trailing_slash_resolves_to_existing_route_once():
+    app, calls = make_app()
+    client = TestClient(app)
+
+    assert client.get("/api/items/").json() == {"items": [1, 2, 3]}
+    assert client.get("/api/items/7/").json() == {"id": 7}
+    # Only the slashed form accepts POST; /api/images/{image_id} must not claim it
+    response = client.post("/api/images/upload", follow_redirects=False)
+    assert response.status_code == 200
+    assert client.put("/api/images/3/").json() == {"id": 3}
+    assert client.get("/api/missing/").status_code == 404
+    assert calls == ["list", 7, "upload", ("image", 3)]
+
+
+def test_route_table_is_built_once_and_paths_cached():
+    app, _ = make_app()
+    with TestClient(app) as client:
+        middleware = app.middleware_stack
+        while not isinstance(middleware, TrailingSlashMiddleware):
+            middleware = middleware.app
+        table = middleware.table
+        assert table.static["/api/items"] == {"GET"}
+        for _ in range(3):
+            client.get("/api/items/")
+        assert middleware.table is table
+        assert middleware.normalize("/api/items/") == "/api/items"
+        assert middleware.normalize("/uploads/a/") == "/uploads/a/"
+
+
+def test_timing_groups_by_route_template():
+    timer = RequestTimer()
+    app, _ = make_app(timer=timer)
+    client = TestClient(app)
+
+    response = client.get("/api/items/1")
+    assert response.headers["server-timing"].startswith("app;dur=")
+    client.get("/api/items/2/")
+    client.get("/nowhere")
+
+    stats = timer.stats()
+    assert stats["routes"]["GET /api/items/{item_id}"]["count"] == 2
+    assert stats["routes"]["GET unmatched"]["count"] == 1
+    assert stats["status"] == {"2xx": 2, "4xx": 1}
+
+
+def benchmark_middleware(requests: int = 2000, file_mb: int = 8) -> None:
+    """
+    Compare requests/sec for the BaseHTTPMiddleware stack and the pure ASGI
+    one, in process over httpx's ASGI transport, for a small JSON endpoint
+    and a large file response.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as f:
+        f.write(os.urandom(file_mb * 1024 * 1024))
+        file_path = f.name
+
+    async def run(app, path, count, concurrency=16):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            queue = list(range(count))
+
+            async def worker():
+                while queue:
+                    queue.pop()
+                    response = await client.get(path)
+                    assert response.status_code == 200
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return count / (time.perf_counter() - started)
+
+    try:
+        for label, path, count in (("small JSON", "/api/items/", requests),
+                                   (f"{file_mb} MB file", "/uploads/big.bin", max(20, requests // 50))):
+            results = {}
+            for stack, legacy in (("BaseHTTPMiddleware", True), ("pure ASGI", False)):
+                app, _ = make_app(legacy=legacy, file_path=file_path)
+                asyncio.run(run(app, path, 20))  # warm up
+                results[stack] = asyncio.run(run(app, path, count))
+            print(f"{label:>12}: " + ", ".join(f"{stack} {rate:8.0f} req/s" for stack, rate in results.items())
+                  + f" ({results['pure ASGI'] / results['BaseHTTPMiddleware']:.2f}x)")
+    finally:
+        os.unlink(file_path)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    benchmark_middleware(*args)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded password hashing pool: admission limit, the 503 it
+turns into at login, upgrading outdated hashes, and which logins run
+bcrypt at all.
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import auth
+from app.enums import AuthSource
+from app.main import app
+from app.models import Base, TeamRoster
+from app.password_hashing import PasswordHasher, PasswordHasherBusy
+
+
+def bcrypt_context(rounds):
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=rounds,
+                        bcrypt__min_rounds=rounds)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(TeamRoster(name="Operator", operator_handle="operator", email="operator@rt3.test",
+                           team_role="OPERATOR", hashed_password=bcrypt_context(4).hash("secret")))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_hashing_beyond_the_pending_limit_is_refused():
+    gate = threading.Event()
+
+    def slow_hash(password):
+        gate.wait(5)
+        return f"hashed:{password}"
+
+    hasher = PasswordHasher(SimpleNamespace(hash=slow_hash), workers=1, max_pending=2)
+
+    async def scenario():
+        running = [asyncio.ensure_future(hasher.hash(password)) for password in ("a", "b")]
+        while hasher.stats()["pending"] < 2:
+            await asyncio.sleep(0.01)
+        # One running, one queued: a third does not wait behind them
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.hash("c")
+        gate.set()
+        assert await asyncio.gather(*running) == ["hashed:a", "hashed:b"]
+        # Room again once they finish
+        assert await hasher.hash("d") == "hashed:d"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
+    stats = hasher.stats()
+    assert (stats["rejected"], stats["pending"]) == (1, 0)
+    assert stats["queue_wait"]["count"] == 3
+
+
+def test_login_answers_503_while_the_pool_is_full(db, monkeypatch):
+    app.dependency_overrides[auth.get_db] = lambda: db
+    monkeypatch.setattr(auth.password_hasher, "_pending", auth.password_hasher.max_pending)
+    rejected = auth.password_hasher.rejected
+    try:
+        response = TestClient(app).post("/api/team-roster/login", data={"username": "operator", "password": "secret"})
+    finally:
+        app.dependency_overrides.pop(auth.get_db)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert auth.password_hasher.rejected == rejected + 1
+
+
+def test_outdated_hashes_are_upgraded_without_revoking_tokens(db, monkeypatch):
+    hasher = PasswordHasher(bcrypt_context(5), workers=1, max_pending=4)
+    monkeypatch.setattr(auth, "password_hasher", hasher)
+    try:
+        user = asyncio.run(auth.authenticate_user(db, "operator", "secret"))
+        assert user and user.operator_handle == "operator"
+        db.refresh(user)
+        assert user.hashed_password.startswith("$2b$05$")
+        assert user.token_version == 0
+        assert hasher.stats()["rehashed"] == 1
+
+        # The upgraded hash is current: nothing more to do on the next login
+        assert asyncio.run(auth.authenticate_user(db, "operator", "secret"))
+        assert hasher.stats()["rehashed"] == 1
+        assert not asyncio.run(auth.authenticate_user(db, "operator", "wrong"))
+    finally:
+        hasher.shutdown()
+
+
+@pytest.fixture
+def logins(db, monkeypatch):
+    """Records the bcrypt operations and directory lookups each login makes"""
+    hashed, verified, directory = [], [], []
+    context = bcrypt_context(4)
+    recording = SimpleNamespace(
+        hash=lambda password: hashed.append(password) or context.hash(password),
+        verify=lambda password, stored: verified.append(stored) or context.verify(password, stored),
+        verify_and_update=lambda password, stored: (
+            verified.append(stored) or context.verify_and_update(password, stored)
+        ),
+    )
+    hasher = PasswordHasher(recording, workers=1, max_pending=4)
+    monkeypatch.setattr(auth, "password_hasher", hasher)
+    monkeypatch.setattr(auth, "_dummy_hash", None)
+
+    async def fake_directory(db, username, password):
+        directory.append(username)
+        return False
+
+    monkeypatch.setattr(auth, "_authenticate_ldap", fake_directory)
+    db.add(TeamRoster(name="Directory", operator_handle="directory", email="directory@rt3.test",
+                      auth_source=AuthSource.ldap, hashed_password=auth.UNUSABLE_PASSWORD))
+    db.commit()
+
+    def login(username, password):
+        del hashed[:], verified[:], directory[:]
+        result = asyncio.run(auth.authenticate_user(db, username, password))
+        return result, list(hashed), list(verified), list(directory)
+
+    yield login
+    hasher.shutdown()
+
+
+def test_directory_accounts_skip_bcrypt(logins):
+    assert logins("directory", "secret") == (False, [], [], ["directory"])
+
+
+def test_local_accounts_verify_their_hash_then_try_the_directory(logins):
+    user, hashed, verified, directory = logins("operator", "secret")
+    assert user.operator_handle == "operator" and hashed == [] and len(verified) == 1 and directory == []
+    # A wrong local password may still be the account's directory password
+    user, hashed, verified, directory = logins("operator", "wrong")
+    assert user is False and hashed == [] and len(verified) == 1 and directory == ["operator"]
+
+
+def test_unknown_users_cost_a_dummy_hash_check(logins):
+    user, hashed, verified, directory = logins("nobody", "secret")
+    # The throwaway hash is made once and verified against like a real one
+    assert user is False and hashed == ["rt3-unknown-user"] and verified == [auth._dummy_hash]
+    assert directory == ["nobody"]
+    assert logins("nobody", "secret")[1:3] == ([], [auth._dummy_hash])
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for on-demand request profiling.
+"""
+
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import RequestTimer, TimingMiddleware
+from app.profiling import ProfileStore, ProfilingMiddleware, folded
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def make_app(tmp_path, max_files=10):
+    store = ProfileStore(str(tmp_path), max_files)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, store=store, interval_ms=1,
+                       authorize=lambda token: "admin" if token == "admin-token" else None)
+    app.add_middleware(TimingMiddleware, timer=RequestTimer())
+
+    @app.get("/report")
+    def annual_report():
+        busy(0.1)
+        return {"ok": True}
+
+    @app.get("/tracker")
+    async def tracker():
+        busy(0.1)
+        return {"ok": True}
+
+    @app.get("/other")
+    def unrelated_work():
+        busy(0.3)
+        return {"ok": True}
+
+    return TestClient(app), store
+
+
+def test_only_flagged_admin_requests_are_profiled(tmp_path):
+    client, store = make_app(tmp_path)
+    assert "x-profile-id" not in client.get("/report", headers=ADMIN).headers
+    assert "x-profile-id" not in client.get("/report?profile=1", headers={"Authorization": "Bearer x"}).headers
+    assert "x-profile-id" not in client.get("/report?myprofile=1", headers=ADMIN).headers
+    assert store.list() == []
+
+    profile_id = client.get("/report", headers={**ADMIN, "X-Profile": "1"}).headers["x-profile-id"]
+    [summary] = store.list()
+    assert summary["id"] == profile_id
+    assert summary["route"] == "/report"
+    assert summary["user"] == "admin"
+
+
+def test_samples_come_from_this_request_only(tmp_path):
+    client, store = make_app(tmp_path)
+    # A concurrent unprofiled request must not show up in the profile
+    other = threading.Thread(target=client.get, args=("/other",))
+    other.start()
+    time.sleep(0.02)
+    sync_id = client.get("/report?profile=1", headers=ADMIN).headers["x-profile-id"]
+    async_id = client.get("/tracker?profile=1", headers=ADMIN).headers["x-profile-id"]
+    other.join()
+
+    sync_profile = store.get(sync_id)
+    assert sync_profile["samples"] >= 5
+    assert any("annual_report" in stack for stack in sync_profile["stacks"])
+    assert "unrelated_work" not in folded(sync_profile)
+    assert any(stack.endswith(f"busy (test_profiling.py:{busy.__code__.co_firstlineno})")
+               for stack in sync_profile["stacks"])
+
+    async_profile = store.get(async_id)
+    assert async_profile["samples"] >= 5
+    assert any("tracker" in stack for stack in async_profile["stacks"])
+
+
+def test_store_keeps_newest_profiles(tmp_path):
+    client, store = make_app(tmp_path, max_files=2)
+    ids = [client.get("/tracker?profile=1", headers=ADMIN).headers["x-profile-id"] for _ in range(3)]
+    assert [summary["id"] for summary in store.list()] == ids[:0:-1]
+    assert store.get(ids[0]) is None
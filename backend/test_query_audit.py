@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for per-request SQL recording, N+1 detection and query budgets.
+"""
+
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine, select
+from sqlalchemy.orm import declarative_base, relationship, selectinload, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.metrics import MetricsRegistry, instrument_engine
+from app.middleware import RequestTimer, TimingMiddleware
+from app.query_audit import QueryBudgetExceeded, normalize_sql, query_auditor, query_budget
+from app.slow_queries import configure_slow_query_log, slow_query_file
+
+Base = declarative_base()
+
+
+class Task(Base):
+    __tablename__ = "tasks"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    signoffs = relationship("Signoff")
+
+
+class Signoff(Base):
+    __tablename__ = "signoffs"
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"))
+    trainer = Column(String)
+
+
+def make_app():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    instrument_engine(engine, MetricsRegistry())
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all(Task(name=f"Task {i}", signoffs=[Signoff(trainer="T")]) for i in range(6))
+        db.commit()
+
+    app = FastAPI()
+    app.add_middleware(TimingMiddleware, timer=RequestTimer())
+
+    @app.get("/tasks/lazy")
+    def lazy_tasks():
+        with Session() as db:
+            # Each access to task.signoffs lazy-loads with its own SELECT
+            return [len(task.signoffs) for task in db.query(Task)]
+
+    @app.get("/tasks/eager")
+    def eager_tasks():
+        with Session() as db:
+            tasks = db.scalars(select(Task).options(selectinload(Task.signoffs))).all()
+            return [len(task.signoffs) for task in tasks]
+
+    return TestClient(app)
+
+
+def test_normalize_sql_groups_by_shape():
+    assert normalize_sql("SELECT * FROM t WHERE id = 5 AND name = 'x'") == "SELECT * FROM t WHERE id = ? AND name = ?"
+    assert normalize_sql("SELECT *\n  FROM t WHERE id IN (?, ?, ?)") == "SELECT * FROM t WHERE id IN (?)"
+    assert normalize_sql("SELECT * FROM t WHERE id = %(id_1)s") == "SELECT * FROM t WHERE id = ?"
+    assert normalize_sql("INSERT INTO t (a) VALUES (?), (?), (?)") == "INSERT INTO t (a) VALUES (?)"
+
+
+def test_budget_fails_on_n_plus_one_with_stack():
+    client = make_app()
+    with query_budget(2, route="GET /tasks/eager"):
+        assert client.get("/tasks/eager").json() == [1] * 6
+        # Outside the budget's route
+        client.get("/tasks/lazy")
+
+    with pytest.raises(QueryBudgetExceeded) as excinfo:
+        with query_budget(2):
+            client.get("/tasks/lazy")
+    message = str(excinfo.value)
+    assert "GET /tasks/lazy ran 7 SQL statements (budget 2)" in message
+    assert "6 x SELECT signoffs" in message
+    assert "test_query_audit.py" in message
+
+
+def test_record_mode_logs_repeated_shapes(caplog):
+    client = make_app()
+    mode, query_auditor.mode = query_auditor.mode, "record"
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.query_audit"):
+            client.get("/tasks/eager")
+            assert not caplog.records
+            client.get("/tasks/lazy")
+    finally:
+        query_auditor.mode = mode
+    [record] = caplog.records
+    assert record.getMessage().startswith("Possible N+1 in GET /tasks/lazy: 6 x SELECT signoffs")
+
+
+def test_sample_mode_writes_offenders_to_the_slow_query_log(tmp_path):
+    client = make_app()
+    log_file = tmp_path / "slow.log"
+    mode, rate = query_auditor.mode, query_auditor.sample_rate
+    query_auditor.mode, query_auditor.sample_rate = "sample", 1.0
+    # As at startup in sample mode; no statement here is slow
+    configure_slow_query_log(str(log_file))
+    try:
+        client.get("/tasks/eager")
+        client.get("/tasks/lazy")
+    finally:
+        query_auditor.mode, query_auditor.sample_rate = mode, rate
+        slow_query_file.stop()
+    [entry] = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert entry["message"] == "Repeated query in GET /tasks/lazy"
+    assert entry["query"]["event"] == "n_plus_one" and entry["query"]["count"] == 6
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tests for the /ws change notification hub: coalescing, permissions, backpressure
+and relaying between workers.
+"""
+
+import asyncio
+import threading
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.enums import Role
+from app.broadcast import BroadcastBackend, ChangeLogBroadcast, create_backend
+from app.models import Base, JQRTracker
+from app.principal_cache import Principal
+from app.realtime import ChangeEvent, ClientConnection, NotificationHub
+
+ADMIN = Principal(id=1, name="Admin", operator_handle="admin", team_role="ADMIN", role_flags=int(Role.ADMIN),
+                  operator_level=None, active=True, token_version=0)
+OPERATOR = Principal(id=2, name="Operator", operator_handle="operator", team_role="Operator",
+                     role_flags=int(Role.OPERATOR), operator_level=None, active=True, token_version=0)
+
+
+def tracker_event(action, row_id, owner="Operator", **data):
+    return ChangeEvent(topic="jqr_tracker", entity="jqr_tracker", action=action, id=row_id, data=data, owner_name=owner)
+
+
+def make_connection(principal, queue_size=10):
+    conn = ClientConnection(websocket=None, principal=principal, queue_size=queue_size, send_timeout=1, batch_seconds=0)
+    conn.handle({"action": "subscribe", "topics": ["jqr_tracker"]})
+    conn._take_batch()
+    return conn
+
+
+def test_changes_to_one_row_coalesce():
+    conn = make_connection(OPERATOR)
+    conn.offer(tracker_event("updated", 1, status="started"))
+    conn.offer(tracker_event("updated", 1, trainer_signature="T"))
+    conn.offer(tracker_event("added", 2, status="new"))
+    conn.offer(tracker_event("deleted", 2))
+
+    [message] = conn._take_batch()
+    assert message == {"type": "changes", "events": [{
+        "topic": "jqr_tracker", "entity": "jqr_tracker", "action": "updated", "id": 1,
+        "data": {"status": "started", "trainer_signature": "T"}
+    }]}
+    assert conn.coalesced == 2
+
+
+def test_owned_events_reach_owner_and_admins_only():
+    other = tracker_event("updated", 1, owner="Someone Else")
+    assert make_connection(ADMIN).offer(other)
+    assert not make_connection(OPERATOR).offer(other)
+    assert make_connection(OPERATOR).offer(tracker_event("updated", 1))
+
+
+def test_slow_client_gets_resync_instead_of_backlog():
+    conn = make_connection(ADMIN, queue_size=3)
+    for row_id in range(5):
+        conn.offer(tracker_event("updated", row_id, status="x"))
+
+    # Later deltas for a topic awaiting refetch are dropped too
+    assert conn._take_batch() == [{"type": "resync", "topics": ["jqr_tracker"]}]
+    assert conn.overflows == 1
+
+
+def test_events_publish_only_after_commit():
+    hub = NotificationHub(queue_size=10, send_timeout=1, batch_ms=0)
+    loop = asyncio.new_event_loop()
+    hub.attach(loop)
+    conn = ClientConnection(None, ADMIN, 10, 1, 0)
+    conn.topics.add("jqr_tracker")
+    hub._connections.add(conn)
+
+    import app.realtime as realtime
+    original, realtime.hub = realtime.hub, hub
+    try:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        db.add(JQRTracker(operator_name="Operator", task_id=1))
+        db.flush()
+        db.rollback()
+        db.add(JQRTracker(operator_name="Operator", task_id=2))
+        db.commit()
+        loop.run_until_complete(asyncio.sleep(0))
+    finally:
+        realtime.hub = original
+        loop.close()
+
+    [message] = conn._take_batch()
+    assert [(e["action"], e["data"]["task_id"]) for e in message["events"]] == [("added", 2)]
+
+
+def test_changelog_relays_between_workers(tmp_path):
+    # Two hubs sharing one database stand in for two worker processes
+    engine = create_engine(f"sqlite:///{tmp_path / 'rt3.db'}")
+    Base.metadata.create_all(engine)
+    sender, receiver = (NotificationHub(queue_size=10, send_timeout=1, batch_ms=0) for _ in range(2))
+    conn = ClientConnection(None, ADMIN, 10, 1, 0)
+    conn.topics.add("jqr_tracker")
+    receiver._connections.add(conn)
+
+    async def relay():
+        await sender.start(ChangeLogBroadcast(engine, poll_seconds=0.01))
+        await receiver.start(ChangeLogBroadcast(engine, poll_seconds=0.01))
+        sender.publish([tracker_event("updated", 1, status="signed")])
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if conn._pending:
+                break
+        await sender.stop()
+        await receiver.stop()
+
+    asyncio.run(relay())
+
+    [message] = conn._take_batch()
+    assert [(e["action"], e["id"]) for e in message["events"]] == [("updated", 1)]
+    assert sender.backend.stats()["relayed"] == 1
+    assert receiver.backend.stats()["received"] == 1
+    # The sender skips its own row
+    assert sender.backend.stats()["received"] == 0
+
+
+def test_changelog_ids_are_not_reused_after_a_prune(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rt3.db'}")
+    Base.metadata.create_all(engine)
+    backend = ChangeLogBroadcast(engine, retention_seconds=0)
+    payload = {"topic": "jqr_tracker", "entity": "jqr_tracker", "action": "updated", "id": 1}
+    for _ in range(3):
+        backend.publish([payload])
+    backend.flush()
+    backend._last_id = backend._max_id()
+    backend._prune()
+    backend.publish([payload])
+    backend.flush()
+    [(row_id, _, _)] = backend._read()
+    assert row_id == 4
+
+    # A table created before AUTOINCREMENT hands out ids again from 1;
+    # the reader notices they went backwards and starts over
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM realtime_events"))
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'realtime_events'"))
+    backend._last_id = 4
+    backend.publish([payload])
+    backend.flush()
+    assert [row[0] for row in backend._read()] == [1]
+    asyncio.run(backend.stop())
+    engine.dispose()
+
+
+def test_changelog_publishing_leaves_the_writes_to_a_batching_thread(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rt3.db'}")
+    Base.metadata.create_all(engine)
+    backend = ChangeLogBroadcast(engine)
+    writing, gate, batches = threading.Event(), threading.Event(), []
+    insert = backend._insert
+
+    def held_insert(rows):
+        writing.set()
+        gate.wait(5)
+        batches.append(len(rows))
+        insert(rows)
+
+    backend._insert = held_insert
+    payload = {"topic": "jqr_tracker", "entity": "jqr_tracker", "action": "updated", "id": 1}
+    backend.publish([payload])
+    assert writing.wait(5)
+    # Publishing returns while the writer is still busy with the first insert
+    for _ in range(3):
+        backend.publish([payload, payload])
+    assert backend.stats()["pending"] == 3 and backend.stats()["relayed"] == 0
+
+    gate.set()
+    asyncio.run(backend.stop())
+    # Everything queued meanwhile went in one transaction, and stopping wrote it
+    assert batches == [1, 3]
+    assert backend.stats()["relayed"] == 7 and len(backend._read()) == 4
+    engine.dispose()
+
+
+def test_auto_backend_relays_only_between_several_workers(tmp_path):
+    sqlite = create_engine(f"sqlite:///{tmp_path / 'rt3.db'}")
+    assert type(create_backend("auto", sqlite, 250, 60)) is BroadcastBackend
+    assert type(create_backend("auto", sqlite, 250, 60, workers=4)) is ChangeLogBroadcast
+    assert type(create_backend("changelog", sqlite, 250, 60)) is ChangeLogBroadcast
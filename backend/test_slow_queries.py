@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests for the slow query log and its EXPLAIN capture.
+"""
+
+import json
+
+from sqlalchemy import create_engine, text
+
+from app.logging_setup import NonBlockingQueueHandler
+from app.slow_queries import SlowQueryLog, parameter_shape, slow_logger, slow_query_file
+
+
+def test_parameter_shapes_hide_values():
+    assert parameter_shape((1, 2, 3, "x", None)) == ["int x 3", "str", "NoneType"]
+    assert parameter_shape({"id_1": 5}) == {"id_1": "int"}
+
+
+def test_slow_statements_are_explained_and_grouped(tmp_path):
+    log_file = tmp_path / "slow.log"
+    slow_log = SlowQueryLog(threshold_ms=0.000001, explain_interval=300, log_file=str(log_file))
+    engine = create_engine("sqlite://")
+    slow_log.attach(engine)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE tracker (id INTEGER PRIMARY KEY, operator TEXT, status TEXT)"))
+            conn.execute(text("CREATE INDEX ix_tracker_operator ON tracker (operator)"))
+            for name in ("alice", "bob", "carol"):
+                conn.execute(text("SELECT * FROM tracker WHERE operator = :name"), {"name": name})
+        # The statement's thread only queues the entries; the file is written by the listener
+        assert [type(handler) for handler in slow_logger.handlers] == [NonBlockingQueueHandler]
+    finally:
+        # Writes out what the listener thread has not written yet
+        slow_query_file.stop()
+
+    [entry] = [q for q in slow_log.stats()["queries"] if q["sql"].startswith("SELECT * FROM tracker")]
+    assert entry["sql"] == "SELECT * FROM tracker WHERE operator = ?"
+    assert entry["count"] == 3
+    assert entry["parameters"] == ["str"]
+    assert entry["routes"] == {"background": 3}
+    assert any("USING INDEX ix_tracker_operator" in line for line in entry["plan"])
+
+    records = [json.loads(line)["query"] for line in log_file.read_text().splitlines()]
+    tracker = [r for r in records if r["sql"] == entry["sql"]]
+    assert len(tracker) == 3
+    # Explained once; later entries repeat the stored plan
+    assert all(r["plan"] == entry["plan"] for r in tracker)
+    assert "alice" not in log_file.read_text()
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Synthetic Dataset Generator for RT3
+
+Fills a database with realistic synthetic data for scale and performance
+testing: roster members with levels and roles, a JQR questionnaire per
+level and the tracker rows sync_with_roster would create for it, yearly
+red team agreements and quarterly legal briefs, certifications, vendor
+training, skill level history, missions with operator lists, and
+assessments with their responses and per-question answers.
+
+--scale 1 is roughly today's team; --scale 10 is ten times that. The same
+--seed and --as-of always produce the same rows (but for the password
+hash's salt), so a performance change
+can be measured before and after on identical data. Rows are written with
+bulk executemany inserts in a single transaction. Referenced files
+(file_url) are not created.
+
+Every generated member's password is --password; the first one is an
+admin.
+
+Usage:
+    python utils/generate_dataset.py --database-url sqlite:///./data/scale.db --scale 10 --reset
+    python utils/generate_dataset.py --database-url postgresql://rt3@localhost/rt3_scale --scale 10 --seed 7
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Run from the backend directory or anywhere else
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from passlib.context import CryptContext
+from sqlalchemy import create_engine, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.bootstrap import migrate
+from app.config import BCRYPT_ROUNDS
+from app.enums import AuthSource, ComplianceStatus, OperatorLevel
+from app.models import (
+    Assessment, AssessmentQuestion, AssessmentResponse, AssessmentStatus, Certification, JQRItem, JQRTracker,
+    Mission, QuestionCategory, QuestionResponse, QuestionType, RedTeamTraining, SkillLevelHistory, TeamRoster,
+    VendorTraining
+)
+from app.roles import parse_roles
+
+# Sizes at --scale 1
+BASE_SIZES = {
+    "operators": 40,
+    "jqr_items_per_level": 50,
+    "missions": 80,
+    "assessments": 6,
+}
+
+FIRST_NAMES = [
+    "James", "Maria", "Robert", "Linda", "Michael", "Patricia", "William", "Jennifer", "David", "Elizabeth",
+    "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen", "Christopher", "Nancy",
+    "Daniel", "Lisa", "Matthew", "Betty", "Anthony", "Sandra", "Mark", "Ashley", "Steven", "Kimberly",
+    "Andrew", "Emily", "Joshua", "Donna", "Kevin", "Michelle", "Brian", "Carol", "Nicholas", "Amanda",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+    "Walker", "Young", "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores",
+]
+
+# (team_role, weight); role_flags are derived as the roster model does
+ROLE_MIX = [
+    ("Operator", 55), ("Operator, Developer", 12), ("Operator, Planner", 8), ("Planner", 8),
+    ("Infrastructure", 6), ("Developer", 6), ("Operator, Branch Chief", 2), ("Team Member", 3),
+]
+LEVEL_MIX = [
+    (OperatorLevel.team_member, 15), (OperatorLevel.apprentice, 35),
+    (OperatorLevel.journeyman, 32), (OperatorLevel.master, 18),
+]
+LEVEL_ORDER = [OperatorLevel.team_member, OperatorLevel.apprentice, OperatorLevel.journeyman, OperatorLevel.master]
+
+JQR_SECTIONS = [
+    "Reconnaissance", "Initial Access", "Execution", "Persistence", "Privilege Escalation", "Defense Evasion",
+    "Credential Access", "Discovery", "Lateral Movement", "Collection", "Command and Control", "Exfiltration",
+    "Reporting", "Operational Security",
+]
+JQR_VERBS = ["Demonstrate", "Explain", "Perform", "Document", "Plan and execute", "Identify"]
+JQR_SUBJECTS = [
+    "a phishing pretext against a test domain", "host enumeration on a segmented network",
+    "Kerberoasting in a lab forest", "a custom C2 redirector", "log tampering detection trade-offs",
+    "credential dumping from LSASS", "SMB relay against unsigned hosts", "a persistence mechanism via WMI",
+    "data staging and chunked exfiltration", "rules of engagement for a mission", "an after-action report",
+    "payload obfuscation for a signature-based AV", "pivoting through a dual-homed host",
+]
+
+# Required each year, mirroring the compliance report
+AGREEMENTS_BEFORE_2024 = [
+    "Red Team Member Non-Disclosure Agreement", "Red Team Code of Ethics Agreement",
+    "Red Team Methodology and Mission Risk Agreement", "Red Team Data Handling Agreement",
+    "Red Team Code of Conduct Agreement",
+]
+AGREEMENTS_FROM_2024 = [
+    "Red Team Member Non-Disclosure Agreement", "Red Team Mission Risk Agreement",
+    "Red Team Data Protection Agreement", "Red Team Code of Conduct Agreement",
+]
+LEGAL_BRIEF = "Red Team Legal Brief"
+
+CERTIFICATIONS = [
+    ("OSCP", True, 40), ("OSCE3", False, 120), ("CISSP", True, 40), ("CompTIA Security+", True, 30),
+    ("CompTIA PenTest+", True, 30), ("GPEN", True, 36), ("GXPN", True, 36), ("CRTO", False, 24),
+    ("CEH", True, 40), ("OSEP", False, 60), ("GCIH", True, 36), ("CRTP", False, 20),
+]
+VENDOR_CLASSES = [
+    ("SANS SEC560: Enterprise Penetration Testing", 36), ("SANS SEC660: Advanced Penetration Testing", 36),
+    ("Offensive Security PEN-300", 40), ("SpecterOps Adversary Tactics: Red Team Operations", 32),
+    ("Black Hat Advanced Infrastructure Hacking", 16), ("Zero-Point Security Red Team Ops", 24),
+    ("Antisyphon Malware Development", 16), ("Mandiant Cyber Threat Intelligence", 24),
+]
+VENDOR_LOCATIONS = ["Las Vegas, NV", "Arlington, VA", "San Diego, CA", "Online", "Orlando, FL", "Denver, CO"]
+MISSION_CODENAMES = [
+    "Granite", "Harbor", "Falcon", "Sable", "Juniper", "Copper", "Tundra", "Mariner", "Aspen", "Onyx",
+    "Cobalt", "Summit", "Ember", "Glacier", "Raven", "Cypress",
+]
+MISSION_LOCATIONS = ["Fort Meade, MD", "San Antonio, TX", "Norfolk, VA", "Remote", "Colorado Springs, CO"]
+
+QUESTION_CATEGORIES = [
+    "Networking", "Windows Internals", "Active Directory", "Linux", "Web Applications", "Cryptography",
+    "Malware Analysis", "Scripting", "Cloud", "Rules of Engagement", "Reporting", "OPSEC",
+]
+
+# Tables written by the generator, in insert order
+TABLES = [
+    TeamRoster, SkillLevelHistory, JQRItem, JQRTracker, RedTeamTraining, Certification, VendorTraining, Mission,
+    QuestionCategory, Assessment, AssessmentQuestion, AssessmentResponse, QuestionResponse,
+]
+
+
+def weighted(rng: random.Random, mix):
+    return rng.choices([value for value, _ in mix], weights=[weight for _, weight in mix])[0]
+
+
+def random_date(rng: random.Random, start: date, end: date) -> date:
+    if end <= start:
+        return start
+    return start + timedelta(days=rng.randrange((end - start).days + 1))
+
+
+def quarter_end(year: int, quarter: int) -> date:
+    if quarter == 4:
+        return date(year, 12, 31)
+    return date(year, quarter * 3 + 1, 1) - timedelta(days=1)
+
+
+class DatasetGenerator:
+    """
+    Builds every table's rows in memory from one seeded random generator,
+    then writes them with explicit ids so foreign keys need no round trips.
+    """
+
+    def __init__(self, scale: float = 1.0, seed: int = 1, years: int = 4, as_of: Optional[date] = None,
+                 password: str = "rt3-synthetic", response_rate: float = 0.8,
+                 questions_per_assessment: int = 25, sizes: Optional[Dict[str, int]] = None):
+        self.rng = random.Random(seed)
+        self.years = max(1, years)
+        self.as_of = as_of or date.today()
+        self.password = password
+        self.response_rate = response_rate
+        self.questions_per_assessment = questions_per_assessment
+        self.sizes = {key: max(1, round(value * scale)) for key, value in BASE_SIZES.items()}
+        self.sizes.update({key: value for key, value in (sizes or {}).items() if value is not None})
+        self.rows: Dict[Any, List[Dict[str, Any]]] = {model: [] for model in TABLES}
+        self._next_id: Dict[Any, int] = {}
+
+    def _add(self, model, **row) -> Dict[str, Any]:
+        row["id"] = self._next_id.get(model, 1)
+        self._next_id[model] = row["id"] + 1
+        self.rows[model].append(row)
+        return row
+
+    def build(self, first_ids: Optional[Dict[Any, int]] = None) -> Dict[Any, List[Dict[str, Any]]]:
+        """Generate all rows; ``first_ids`` offsets ids past rows already in a table"""
+        self._next_id = dict(first_ids or {})
+        operators = self._roster()
+        items = self._jqr_items()
+        self._tracker(operators, items)
+        self._red_team_training(operators)
+        self._certifications_and_vendor_training(operators)
+        self._missions(operators)
+        self._assessments(operators)
+        return self.rows
+
+    def _roster(self) -> List[Dict[str, Any]]:
+        rng = self.rng
+        hashed = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=BCRYPT_ROUNDS).hash(self.password)
+        first_year = self.as_of.year - self.years + 1
+        names = set()
+        operators = []
+        for i in range(self.sizes["operators"]):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            name = f"{first} {last}"
+            suffix = 2
+            while name in names:
+                name = f"{first} {last} {suffix}"
+                suffix += 1
+            names.add(name)
+            handle = f"{first[0]}{last}{i + 1}".lower()
+            team_role = "ADMIN, Operator" if i == 0 else weighted(rng, ROLE_MIX)
+            level = OperatorLevel.master if i == 0 else weighted(rng, LEVEL_MIX)
+            # A few members joined before the generated history starts
+            onboarding = random_date(rng, date(first_year - 2, 1, 1), self.as_of - timedelta(days=30))
+            created = datetime.combine(onboarding, datetime.min.time())
+            operator = self._add(
+                TeamRoster,
+                name=name,
+                operator_handle=handle,
+                email=f"{handle}@rt3.example",
+                team_role=team_role,
+                role_flags=int(parse_roles(team_role)),
+                onboarding_date=onboarding,
+                operator_level=level,
+                compliance_8570=weighted(rng, [(ComplianceStatus.compliant, 80), (ComplianceStatus.non_compliant, 20)]),
+                legal_document_status=weighted(rng, [(ComplianceStatus.compliant, 85),
+                                                     (ComplianceStatus.non_compliant, 15)]),
+                active=i == 0 or rng.random() < 0.9,
+                hashed_password=hashed,
+                auth_source=AuthSource.local,
+                token_version=0,
+                created_at=created,
+                updated_at=created,
+            )
+            operators.append(operator)
+
+            # Promotions up to the current level, spread after onboarding
+            promoted = onboarding
+            for step in LEVEL_ORDER[1:LEVEL_ORDER.index(level) + 1]:
+                promoted = random_date(rng, promoted + timedelta(days=90), promoted + timedelta(days=540))
+                promoted = min(promoted, self.as_of)
+                self._add(SkillLevelHistory, operator_name=name, skill_level=step, date_assigned=promoted,
+                          signed_memo_url=f"uploads/{handle}/memos/{step.name}_{promoted:%Y%m%d}.pdf")
+        return operators
+
+    def _jqr_items(self) -> List[Dict[str, Any]]:
+        rng = self.rng
+        items = []
+        for level_number, level in enumerate(("apprentice", "journeyman", "master"), start=1):
+            for n in range(self.sizes["jqr_items_per_level"]):
+                section_number = n % len(JQR_SECTIONS)
+                flags = {"apprentice": False, "journeyman": False, "master": False, level: True}
+                # Core apprentice tasks are also required of the higher levels
+                if level == "apprentice" and rng.random() < 0.2:
+                    flags.update(journeyman=True, master=True)
+                items.append(self._add(
+                    JQRItem,
+                    task_number=f"{level_number}.{section_number + 1}.{n // len(JQR_SECTIONS) + 1}",
+                    question=f"{rng.choice(JQR_VERBS)} {rng.choice(JQR_SUBJECTS)}",
+                    task_section=JQR_SECTIONS[section_number],
+                    training_status="active" if rng.random() < 0.95 else "inactive",
+                    **flags,
+                ))
+        return items
+
+    def _tracker(self, operators: List[Dict[str, Any]], items: List[Dict[str, Any]]) -> None:
+        """The rows sync_with_roster creates for active members, with progress on them"""
+        rng = self.rng
+        trainers = [op["name"] for op in operators if op["operator_level"] == OperatorLevel.master] or [operators[0]["name"]]
+        for op in operators:
+            level = op["operator_level"]
+            if not op["active"] or level == OperatorLevel.team_member:
+                continue
+            for item in items:
+                if not item[level.name]:
+                    continue
+                skill = "apprentice" if item["apprentice"] else "journeyman" if item["journeyman"] else "master"
+                start = completion = operator_signature = trainer_signature = None
+                progress = rng.random()
+                if progress < 0.8:
+                    start = random_date(rng, op["onboarding_date"], self.as_of)
+                if progress < 0.6:
+                    completion = random_date(rng, start, min(start + timedelta(days=120), self.as_of))
+                    operator_signature = op["name"]
+                    trainer_signature = rng.choice(trainers)
+                self._add(JQRTracker, operator_name=op["name"], task_id=item["id"], start_date=start,
+                          completion_date=completion, operator_signature=operator_signature,
+                          trainer_signature=trainer_signature, operator_level=level, task_skill_level=skill)
+
+    def _red_team_training(self, operators: List[Dict[str, Any]]) -> None:
+        rng = self.rng
+        for op in operators:
+            handle = op["operator_handle"]
+            for year in range(self.as_of.year - self.years + 1, self.as_of.year + 1):
+                if date(year, 12, 31) < op["onboarding_date"]:
+                    continue
+                year_start = max(date(year, 1, 1), op["onboarding_date"])
+                year_end = min(date(year, 12, 31), self.as_of)
+                if year_end < year_start:
+                    continue
+                for training_type in AGREEMENTS_BEFORE_2024 if year < 2024 else AGREEMENTS_FROM_2024:
+                    if rng.random() < 0.92:
+                        submitted = random_date(rng, year_start, year_end)
+                        slug = training_type.lower().replace(" ", "_").replace("-", "_")
+                        self._add(RedTeamTraining, operator_name=op["name"], training_name=f"{year} Agreement",
+                                  training_type=training_type, due_date=date(year, 12, 31),
+                                  expiration_date=date(year, 12, 31), date_submitted=submitted,
+                                  file_url=f"uploads/{handle}/training/red_team/{slug}_{submitted:%Y%m%d}.pdf")
+                for quarter in range(1, 5):
+                    end = quarter_end(year, quarter)
+                    start = max(end.replace(day=1) - timedelta(days=60), year_start)
+                    if end > self.as_of or end < year_start or rng.random() >= 0.9:
+                        continue
+                    submitted = random_date(rng, start, end)
+                    self._add(RedTeamTraining, operator_name=op["name"], training_name=f"{year} Q{quarter}",
+                              training_type=LEGAL_BRIEF, due_date=end, expiration_date=end,
+                              date_submitted=submitted,
+                              file_url=f"uploads/{handle}/training/red_team/legal_brief_q{quarter}_{submitted:%Y%m%d}.pdf")
+
+    def _certifications_and_vendor_training(self, operators: List[Dict[str, Any]]) -> None:
+        rng = self.rng
+        for op in operators:
+            handle = op["operator_handle"]
+            for cert, dod_8140, hours in rng.sample(CERTIFICATIONS, rng.randint(0, 4)):
+                acquired = random_date(rng, op["onboarding_date"] - timedelta(days=730), self.as_of)
+                self._add(Certification, operator_name=op["name"], certification_name=cert, date_acquired=acquired,
+                          training_hours=hours, expiration_date=acquired + timedelta(days=3 * 365),
+                          file_url=f"uploads/{handle}/certifications/{cert.replace(' ', '_')}.pdf", dod_8140=dod_8140)
+            for year in range(max(self.as_of.year - self.years + 1, op["onboarding_date"].year), self.as_of.year + 1):
+                for class_name, hours in rng.sample(VENDOR_CLASSES, rng.randint(0, 3)):
+                    start = random_date(rng, max(date(year, 1, 1), op["onboarding_date"]),
+                                        min(date(year, 12, 31), self.as_of))
+                    self._add(VendorTraining, operator_name=op["name"], class_name=class_name, start_date=start,
+                              end_date=start + timedelta(days=max(1, hours // 8) - 1), hours=hours,
+                              location=rng.choice(VENDOR_LOCATIONS),
+                              file_url=f"uploads/{handle}/training/vendor/{start:%Y%m%d}.pdf")
+
+    def _missions(self, operators: List[Dict[str, Any]]) -> None:
+        rng = self.rng
+        names = [op["name"] for op in operators if op["active"]] or [operators[0]["name"]]
+        leads = [op["name"] for op in operators
+                 if op["active"] and op["operator_level"] in (OperatorLevel.journeyman, OperatorLevel.master)] or names
+        planners = [op["name"] for op in operators if op["active"] and "Planner" in op["team_role"]] or names
+        for n in range(self.sizes["missions"]):
+            remote = rng.sample(names, min(len(names), rng.randint(1, 4)))
+            local = rng.sample(names, min(len(names), rng.randint(1, 4)))
+            self._add(
+                Mission,
+                mission=f"{rng.choice(MISSION_CODENAMES)} {rng.choice(MISSION_CODENAMES)} {n + 1}",
+                team_lead=rng.choice(leads),
+                mission_lead=rng.choice(leads),
+                rep=rng.choice(names),
+                remote_operators=", ".join(remote),
+                local_operators=", ".join(local),
+                remote_operators_on_keyboard=", ".join(o for o in remote if rng.random() < 0.5),
+                local_operators_on_keyboard=", ".join(o for o in local if rng.random() < 0.5),
+                planner=rng.choice(planners),
+                location=rng.choice(MISSION_LOCATIONS),
+            )
+
+    def _assessments(self, operators: List[Dict[str, Any]]) -> None:
+        rng = self.rng
+        admin_id = operators[0]["id"]
+        graders = [op["id"] for op in operators if op["operator_level"] == OperatorLevel.master] or [admin_id]
+        categories = [self._add(QuestionCategory, name=name, created_at=datetime(self.as_of.year - self.years + 1, 1, 1))
+                      for name in QUESTION_CATEGORIES]
+        respondents = [op for op in operators if op["active"]]
+        history_start = date(self.as_of.year - self.years + 1, 1, 1)
+
+        for n in range(self.sizes["assessments"]):
+            created = datetime.combine(random_date(rng, history_start, self.as_of), datetime.min.time())
+            assessment = self._add(Assessment, title=f"{rng.choice(QUESTION_CATEGORIES)} Assessment {n + 1}",
+                                   description="Synthetic assessment for scale testing", created_by=admin_id,
+                                   created_at=created, updated_at=None, is_active=rng.random() < 0.8)
+            questions = []
+            for order in range(1, self.questions_per_assessment + 1):
+                category = rng.choice(categories)
+                if rng.random() < 0.8:
+                    options = [f"Option {letter} for question {order}" for letter in "ABCD"]
+                    questions.append(self._add(
+                        AssessmentQuestion, assessment_id=assessment["id"], category_id=category["id"],
+                        question_text=f"{category['name']}: multiple choice question {order}",
+                        question_type=QuestionType.multiple_choice, options=json.dumps(options),
+                        correct_answer=rng.choice(options), points=rng.choice((1, 1, 2)), order=order,
+                        created_at=created
+                    ))
+                else:
+                    questions.append(self._add(
+                        AssessmentQuestion, assessment_id=assessment["id"], category_id=category["id"],
+                        question_text=f"{category['name']}: describe your approach ({order})",
+                        question_type=QuestionType.free_form, options=None,
+                        correct_answer="A reasonable, complete answer", points=rng.choice((2, 3, 5)), order=order,
+                        created_at=created
+                    ))
+            self._responses(assessment, questions, respondents, graders, created)
+
+    def _responses(self, assessment, questions, respondents, graders, created: datetime) -> None:
+        rng = self.rng
+        now = datetime.combine(self.as_of, datetime.min.time())
+        for op in respondents:
+            if rng.random() >= self.response_rate:
+                continue
+            started = created + timedelta(minutes=rng.randrange(max(1, int((now - created).total_seconds() // 60))))
+            completed = started + timedelta(minutes=rng.randint(10, 90))
+            graded = rng.random() < 0.7
+            grader = rng.choice(graders) if graded else None
+            graded_at = completed + timedelta(hours=rng.randint(1, 72)) if graded else None
+            response = self._add(AssessmentResponse, assessment_id=assessment["id"], operator_id=op["id"],
+                                 started_at=started, completed_at=completed, status=None, graded_by=grader,
+                                 graded_at=graded_at, claimed_by=None, claim_expires_at=None)
+            score = possible = 0
+            all_auto = True
+            skill = rng.uniform(0.4, 0.95)
+            for question in questions:
+                possible += question["points"]
+                if question["question_type"] == QuestionType.multiple_choice:
+                    correct = rng.random() < skill
+                    answer = question["correct_answer"] if correct else rng.choice(
+                        [o for o in json.loads(question["options"]) if o != question["correct_answer"]]
+                    )
+                    points = question["points"] if correct else 0
+                    score += points
+                    self._add(QuestionResponse, assessment_response_id=response["id"], question_id=question["id"],
+                              answer=answer, is_correct=correct, points_awarded=points if graded else None,
+                              graded_by=grader, graded_at=graded_at, feedback=None)
+                else:
+                    all_auto = False
+                    points = rng.randint(0, question["points"]) if graded else None
+                    if graded:
+                        score += points
+                    self._add(QuestionResponse, assessment_response_id=response["id"], question_id=question["id"],
+                              answer="Synthetic free-form answer " * rng.randint(1, 8), is_correct=None,
+                              points_awarded=points, graded_by=grader, graded_at=graded_at,
+                              feedback="Good coverage" if graded and rng.random() < 0.3 else None)
+            if graded:
+                response.update(status=AssessmentStatus.graded, score=score,
+                                final_score=round(score / possible * 100) if possible else 0)
+            else:
+                response.update(status=AssessmentStatus.pending_review, score=score,
+                                final_score=score if all_auto else None)
+
+
+def existing_rows(conn: Connection) -> Dict[Any, int]:
+    return {model: conn.execute(select(func.count()).select_from(model.__table__)).scalar() for model in TABLES}
+
+
+def drop_tables(engine: Engine) -> None:
+    """
+    Drop every table in the database, alembic_version included, so the
+    migrations build the schema again. team_roster and images reference
+    each other through unnamed foreign keys, which PostgreSQL can only drop
+    along with the tables (CASCADE); SQLite does not enforce them here.
+    """
+    with engine.begin() as conn:
+        quote = conn.dialect.identifier_preparer.quote
+        cascade = " CASCADE" if conn.dialect.name == "postgresql" else ""
+        for table in inspect(conn).get_table_names():
+            conn.execute(text(f"DROP TABLE IF EXISTS {quote(table)}{cascade}"))
+
+
+def write(engine: Engine, generator: DatasetGenerator, reset: bool = False, batch_size: int = 5000) -> Dict[str, int]:
+    """
+    Generate and insert the dataset in one transaction, returning row counts
+    by table. The schema is built by the migrations, so the database is
+    stamped with the newest revision and app.bootstrap has nothing left to
+    do on it. Without ``reset``, refuses to add to tables that already hold
+    data, except for the default admin account.
+    """
+    if reset:
+        drop_tables(engine)
+    migrate(engine, configure_logging=False)
+
+    with engine.begin() as conn:
+        counts = existing_rows(conn)
+        populated = [model.__tablename__ for model, count in counts.items() if count and model is not TeamRoster]
+        if populated or counts[TeamRoster] > 1:
+            raise SystemExit(
+                f"Database already holds data ({', '.join(populated) or 'team_roster'}); use --reset to replace it"
+            )
+        first_ids = {}
+        if counts[TeamRoster]:
+            first_ids[TeamRoster] = conn.execute(select(func.max(TeamRoster.id))).scalar() + 1
+
+        rows = generator.build(first_ids)
+        if conn.dialect.name == "sqlite":
+            # Only this transaction's durability is traded away, not the file's integrity
+            conn.exec_driver_sql("PRAGMA synchronous = OFF")
+        for model in TABLES:
+            table_rows = rows[model]
+            for start in range(0, len(table_rows), batch_size):
+                conn.execute(model.__table__.insert(), table_rows[start:start + batch_size])
+        if conn.dialect.name == "postgresql":
+            # Explicit ids leave the serial sequences behind
+            for model in TABLES:
+                table = model.__tablename__
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))"
+                ))
+    return {model.__tablename__: len(rows[model]) for model in TABLES}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic RT3 dataset for scale testing")
+    parser.add_argument("--database-url", default="sqlite:///./data/rt3_synthetic.db",
+                        help="target database (default: %(default)s)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiple of today's team size (default: 1)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed; same seed, same data (default: 1)")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None,
+                        help="date the data ends at, YYYY-MM-DD (default: today); pin it for identical data")
+    parser.add_argument("--years", type=int, default=4, help="years of training history (default: 4)")
+    parser.add_argument("--password", default="rt3-synthetic", help="password of every generated member")
+    parser.add_argument("--operators", type=int, help="override the number of roster members")
+    parser.add_argument("--jqr-items-per-level", type=int, help="override the JQR questionnaire size per level")
+    parser.add_argument("--missions", type=int, help="override the number of missions")
+    parser.add_argument("--assessments", type=int, help="override the number of assessments")
+    parser.add_argument("--questions", type=int, default=25, help="questions per assessment (default: 25)")
+    parser.add_argument("--response-rate", type=float, default=0.8,
+                        help="share of active members answering each assessment (default: 0.8)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per insert batch (default: 5000)")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args(argv)
+
+    if args.database_url.startswith("sqlite:///"):
+        Path(args.database_url[len("sqlite:///"):]).parent.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(args.database_url)
+    generator = DatasetGenerator(
+        scale=args.scale, seed=args.seed, years=args.years, as_of=args.as_of, password=args.password,
+        response_rate=args.response_rate, questions_per_assessment=args.questions,
+        sizes={"operators": args.operators, "jqr_items_per_level": args.jqr_items_per_level,
+               "missions": args.missions, "assessments": args.assessments},
+    )
+
+    started = time.perf_counter()
+    counts = write(engine, generator, reset=args.reset, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - started
+
+    width = max(len(table) for table in counts)
+    for table, count in counts.items():
+        print(f"  {table:<{width}}  {count:>9,}")
+    print(f"{sum(counts.values()):,} rows in {elapsed:.1f}s (scale {args.scale}, seed {args.seed})")
+    admin = generator.rows[TeamRoster][0]
+    print(f"Admin login: {admin['operator_handle']} / {args.password}")
+
+
+if __name__ == "__main__":
+    main()
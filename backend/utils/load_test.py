@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+"""
+HTTP Load Test for RT3
+
+Drives a running RT3 instance with many concurrent simulated users and
+reports latency percentiles per route. There are two modes:
+
+run       Scripted scenarios that follow the React client's own call
+          sequences: operators opening the dashboard, JQR and assessment
+          pages, admins running the JQR sync, reports and roster imports.
+          Assessment submissions can be held back and released together
+          every --burst-interval seconds.
+replay    Replays an anonymized access log, keeping each user's requests
+          in order and the log's timing (scaled by --speed).
+
+anonymize turns an nginx access log (the "main" format in nginx.conf) into
+the JSON lines replay reads. Client addresses become u1, u2, ... in order
+of appearance, operator names in paths and query strings become
+{operator}, and credentials in query strings are dropped. At replay time
+each logged user is played by a different roster member and {operator} is
+that member's name.
+
+Simulated users log in as active roster members with --password, so point
+it at an instance loaded by utils/generate_dataset.py. The roster import
+scenario adds a handful of loadtest* members to the target database.
+
+Usage:
+    python utils/load_test.py run --base-url http://localhost:8000 --admin-user oadmin1 --users 50 --duration 120
+    python utils/load_test.py anonymize /var/log/nginx/access.log > traffic.jsonl
+    python utils/load_test.py replay traffic.jsonl --base-url http://localhost:8000 --admin-user oadmin1 --speed 4
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+
+import httpx
+
+API = "/api"
+# Numeric path segments are ids; report them as one route
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+# nginx.conf's "main" log_format
+NGINX_LINE = re.compile(
+    r'(?P<addr>\S+) - (?P<user>\S+) \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<target>\S+) [^"]*" '
+    r'(?P<status>\d{3}) (?P<bytes>\S+) "(?P<referer>[^"]*)" "(?P<agent>[^"]*)" "(?P<forwarded>[^"]*)"'
+)
+NAME_PARAMS = {"operator_name", "name", "operator", "trainer"}
+SECRET_PARAMS = {"token", "access_token", "refresh_token", "password", "email", "operator_handle", "handle"}
+NAME_SEGMENT = re.compile(r"(/team-roster/by-name/)[^/?]+")
+OPERATOR = "{operator}"
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def route_of(method: str, path: str) -> str:
+    path = urlsplit(path).path.rstrip("/") or "/"
+    return f"{method} {ID_SEGMENT.sub('/{id}', path)}"
+
+
+class Stats:
+    """Latencies and statuses per route"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, route: str, status: int, seconds: float) -> None:
+        self.latencies[route].append(seconds)
+        self.statuses[route][status] += 1
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            ordered = sorted(latencies)
+            statuses = self.statuses[route]
+            routes[route] = {
+                "count": len(ordered),
+                # 0 is a request that never got a response
+                "errors": sum(n for status, n in statuses.items() if status >= 400 or status == 0),
+                "statuses": {str(status): n for status, n in sorted(statuses.items())},
+                "rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1),
+            }
+        return routes
+
+    def render(self) -> str:
+        routes = self.summary()
+        if not routes:
+            return "No requests were made"
+        width = max(len(route) for route in routes)
+        lines = [f"{'route':<{width}}  {'count':>7}  {'errors':>6}  {'rps':>7}  "
+                 f"{'p50':>8}  {'p95':>8}  {'p99':>8}  {'max':>8}"]
+        for route, s in routes.items():
+            lines.append(f"{route:<{width}}  {s['count']:>7}  {s['errors']:>6}  {s['rps']:>7.1f}  "
+                         f"{s['p50_ms']:>6.1f}ms  {s['p95_ms']:>6.1f}ms  {s['p99_ms']:>6.1f}ms  {s['max_ms']:>6.1f}ms")
+        total = sum(s["count"] for s in routes.values())
+        errors = sum(s["errors"] for s in routes.values())
+        lines.append(f"{total:,} requests, {errors:,} errors")
+        return "\n".join(lines)
+
+
+class User:
+    """One simulated user: a roster member's login and the requests made with it"""
+
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, handle: str, password: str):
+        self.client = client
+        self.stats = stats
+        self.handle = handle
+        self.password = password
+        self.token: Optional[str] = None
+        self.me: Dict[str, Any] = {}
+
+    @property
+    def name(self) -> str:
+        return self.me.get("name", "")
+
+    @property
+    def is_admin(self) -> bool:
+        return "ADMIN" in str(self.me.get("team_role", ""))
+
+    async def login(self) -> None:
+        response = await self.request("POST", "/team-roster/login", authenticate=False,
+                                      data={"username": self.handle, "password": self.password})
+        if response is None or response.status_code != 200:
+            status = response.status_code if response is not None else "no response"
+            raise RuntimeError(f"login as {self.handle} failed: {status}")
+        self.token = response.json()["access_token"]
+
+    async def request(self, method: str, path: str, route: Optional[str] = None, authenticate: bool = True,
+                      **kwargs) -> Optional[httpx.Response]:
+        """
+        ``path`` is relative to /api. Returns None when there was no
+        response at all; that is recorded as status 0.
+        """
+        url = API + path
+        route = route or route_of(method, url)
+        for attempt in range(2):
+            headers = {"Authorization": f"Bearer {self.token}"} if authenticate else {}
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, headers=headers, **kwargs)
+            except httpx.HTTPError:
+                self.stats.record(route, 0, time.perf_counter() - started)
+                return None
+            self.stats.record(route, response.status_code, time.perf_counter() - started)
+            # Access tokens expire during long runs
+            if response.status_code == 401 and authenticate and attempt == 0:
+                await self.login()
+                continue
+            return response
+        return response
+
+    async def get_json(self, path: str, route: Optional[str] = None) -> Any:
+        response = await self.request("GET", path, route)
+        if response is None or response.status_code != 200:
+            return None
+        return response.json()
+
+
+async def sign_in(client: httpx.AsyncClient, stats: Stats, handle: str, password: str) -> User:
+    user = User(client, stats, handle, password)
+    await user.login()
+    user.me = await user.get_json("/team-roster/me") or {}
+    return user
+
+
+async def roster_handles(admin: User) -> List[str]:
+    roster = await admin.get_json("/team-roster") or []
+    return [member["operator_handle"] for member in roster
+            if member.get("active") and member.get("operator_handle") and member["operator_handle"] != admin.handle]
+
+
+# Scenarios: one page visit each, in the order the React components make
+# their calls. Calls a component makes from separate effects run concurrently.
+
+async def dashboard_page(user: User, context: "Context") -> None:
+    await asyncio.gather(
+        user.request("GET", "/team-roster/me"),
+        user.request("GET", "/images/dashboard"),
+        user.request("GET", "/team-roster/active-count"),
+        user.request("GET", "/missions/count"),
+    )
+
+
+async def jqr_tracker_page(user: User, context: "Context") -> None:
+    await user.request("GET", "/team-roster/me")
+    await user.request("GET", "/team-roster")
+    if user.is_admin:
+        await user.request("GET", "/jqr/tracker")
+    else:
+        await user.request("GET", f"/jqr/tracker?operator_name={quote(user.name)}")
+
+
+async def jqr_questionnaire_page(user: User, context: "Context") -> None:
+    await user.request("GET", "/team-roster/me")
+    await user.request("GET", "/jqr/questionnaire")
+
+
+async def assessments_page(user: User, context: "Context") -> None:
+    """The assessment list, then taking the first open one not yet answered"""
+    assessments, responses = await asyncio.gather(
+        user.get_json("/assessments"), user.get_json("/assessments/my-responses")
+    )
+    answered = {response["assessment_id"] for response in responses or []}
+    open_ones = [a for a in assessments or [] if a.get("is_active", True) and a["id"] not in answered]
+    if not open_ones:
+        return
+    assessment = await user.get_json(f"/assessments/{open_ones[0]['id']}")
+    if not assessment:
+        return
+    answers = [{"question_id": q["id"], "answer": (q.get("options") or ["Load test answer"])[0]}
+               for q in assessment.get("questions", [])]
+    await context.burst.wait()
+    await user.request("POST", f"/assessments/{assessment['id']}/responses",
+                       json={"assessment_id": assessment["id"], "question_responses": answers})
+
+
+async def jqr_sync(user: User, context: "Context") -> None:
+    await user.request("GET", "/team-roster")
+    await user.request("POST", "/jqr/sync-tracker")
+    await user.request("GET", "/jqr/tracker")
+
+
+async def reports_page(user: User, context: "Context") -> None:
+    await asyncio.gather(
+        user.request("GET", "/reports/annual-red-team-training"),
+        user.request("GET", "/reports/quarterly-legal-briefings"),
+    )
+
+
+async def roster_import(user: User, context: "Context") -> None:
+    """The same small CSV every time; after the first import its members are skipped"""
+    rows = ["name,operator_handle,email,team_role,onboarding_date,operator_level,compliance_8570,"
+            "legal_document_status,active"]
+    rows += [f"Loadtest Member{n},loadtest{n},loadtest{n}@rt3.example,Operator,01/15/2025,Apprentice,"
+             f"compliant,compliant,true" for n in range(1, 6)]
+    await user.request("POST", "/team-roster/import",
+                       files={"file": ("roster.csv", "\n".join(rows).encode(), "text/csv")})
+    await user.request("GET", "/team-roster")
+
+
+Scenario = Callable[[User, "Context"], Awaitable[None]]
+
+OPERATOR_SCENARIOS: List[Tuple[Scenario, int]] = [
+    (dashboard_page, 4),
+    (jqr_tracker_page, 3),
+    (jqr_questionnaire_page, 1),
+    (assessments_page, 2),
+]
+ADMIN_SCENARIOS: List[Tuple[Scenario, int]] = [
+    (dashboard_page, 1),
+    (jqr_tracker_page, 2),
+    (jqr_sync, 2),
+    (reports_page, 2),
+    (roster_import, 1),
+]
+
+
+class Burst:
+    """Holds submissions back and releases them together every ``interval`` seconds"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.event = asyncio.Event()
+        if not interval:
+            self.event.set()
+
+    async def wait(self) -> None:
+        await self.event.wait()
+
+    async def run(self) -> None:
+        while self.interval:
+            await asyncio.sleep(self.interval)
+            event, self.event = self.event, asyncio.Event()
+            event.set()
+
+    def release(self) -> None:
+        self.event.set()
+
+
+class Context:
+    def __init__(self, deadline: float, think: float, burst: Burst, rng: random.Random):
+        self.deadline = deadline
+        self.think = think
+        self.burst = burst
+        self.rng = rng
+
+
+async def virtual_user(user: User, scenarios: List[Tuple[Scenario, int]], context: Context, delay: float) -> None:
+    await asyncio.sleep(delay)
+    functions, weights = zip(*scenarios)
+    while time.monotonic() < context.deadline:
+        scenario = context.rng.choices(functions, weights)[0]
+        await scenario(user, context)
+        if context.think:
+            await asyncio.sleep(context.rng.expovariate(1 / context.think))
+
+
+async def run_scenarios(client: httpx.AsyncClient, admin_user: str, password: str, users: int = 20, admins: int = 1,
+                        duration: float = 60, ramp_up: float = 10, think: float = 2, burst_interval: float = 0,
+                        seed: int = 1) -> Stats:
+    stats = Stats()
+    admin = await sign_in(client, stats, admin_user, password)
+    handles = await roster_handles(admin)
+    if users and not handles:
+        raise RuntimeError("the roster has no other active members to log in as")
+    operators = [await sign_in(client, stats, handles[i % len(handles)], password) for i in range(users)]
+    admin_users = [admin] + [await sign_in(client, stats, admin_user, password) for _ in range(admins - 1)]
+
+    rng = random.Random(seed)
+    burst = Burst(burst_interval)
+    context = Context(time.monotonic() + ramp_up + duration, think, burst, rng)
+    population = [(user, OPERATOR_SCENARIOS) for user in operators] + [(user, ADMIN_SCENARIOS) for user in admin_users[:admins]]
+    # Measure the mix, not the logins
+    stats.reset()
+    releaser = asyncio.create_task(burst.run())
+    try:
+        await asyncio.gather(*(
+            virtual_user(user, scenarios, context, ramp_up * i / max(len(population), 1))
+            for i, (user, scenarios) in enumerate(population)
+        ))
+    finally:
+        releaser.cancel()
+        burst.release()
+    stats.stop()
+    return stats
+
+
+def anonymize(lines: Iterable[str], include_all: bool = False) -> Iterator[Dict[str, Any]]:
+    """nginx access log lines -> replayable records without names, addresses or credentials"""
+    users: Dict[Tuple[str, str], str] = {}
+    first: Optional[datetime] = None
+    for line in lines:
+        match = NGINX_LINE.match(line)
+        if not match:
+            continue
+        target = match["target"]
+        if not include_all and not target.startswith(API + "/"):
+            continue
+        when = datetime.strptime(match["time"], "%d/%b/%Y:%H:%M:%S %z")
+        first = first or when
+        client = match["forwarded"] if match["forwarded"] not in ("", "-") else match["addr"]
+        user = users.setdefault((client, match["agent"]), f"u{len(users) + 1}")
+
+        parts = urlsplit(target)
+        path = NAME_SEGMENT.sub(r"\1" + OPERATOR, parts.path)
+        query = [(key, OPERATOR if key in NAME_PARAMS else value)
+                 for key, value in parse_qsl(parts.query, keep_blank_values=True) if key not in SECRET_PARAMS]
+        if query:
+            path += "?" + urlencode(query, safe="{}")
+        yield {
+            "offset": (when - first).total_seconds(),
+            "user": user,
+            "method": match["method"],
+            "path": path,
+            "status": int(match["status"]),
+        }
+
+
+async def replay_user(user: User, records: List[Dict[str, Any]], started: float, speed: float,
+                      methods: Tuple[str, ...]) -> None:
+    for record in records:
+        if record["method"] not in methods:
+            continue
+        due = started + record["offset"] / speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        path = record["path"][len(API):] if record["path"].startswith(API) else record["path"]
+        path = path.replace(OPERATOR, quote(user.name))
+        await user.request(record["method"], path, route=route_of(record["method"], record["path"]))
+
+
+async def replay(client: httpx.AsyncClient, records: Iterable[Dict[str, Any]], admin_user: str, password: str,
+                 speed: float = 1, as_admin: bool = False, methods: Tuple[str, ...] = ("GET",)) -> Stats:
+    """
+    Only GETs are replayed by default: an access log has no request bodies
+    to send with the writes.
+    """
+    by_user: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for record in records:
+        by_user[record["user"]].append(record)
+
+    stats = Stats()
+    admin = await sign_in(client, stats, admin_user, password)
+    handles = [] if as_admin else await roster_handles(admin)
+    if not as_admin and not handles:
+        raise RuntimeError("the roster has no other active members to log in as")
+    players = {}
+    for i, name in enumerate(by_user):
+        players[name] = admin if as_admin else await sign_in(client, stats, handles[i % len(handles)], password)
+
+    stats.reset()
+    started = time.monotonic()
+    await asyncio.gather(*(replay_user(players[name], records, started, speed, methods)
+                           for name, records in by_user.items()))
+    stats.stop()
+    return stats
+
+
+def client_for(args: argparse.Namespace, connections: int) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=args.base_url, verify=not args.insecure, timeout=args.timeout,
+        limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+    )
+
+
+def report(stats: Stats, output: Optional[str]) -> None:
+    print(stats.render())
+    if output:
+        with open(output, "w") as f:
+            json.dump(stats.summary(), f, indent=2)
+
+
+async def run_command(args: argparse.Namespace) -> None:
+    async with client_for(args, args.users + args.admins) as client:
+        stats = await run_scenarios(
+            client, args.admin_user, args.password, users=args.users, admins=args.admins, duration=args.duration,
+            ramp_up=args.ramp_up, think=args.think, burst_interval=args.burst_interval, seed=args.seed,
+        )
+    report(stats, args.output)
+
+
+async def replay_command(args: argparse.Namespace) -> None:
+    with open(args.log) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    users = len({record["user"] for record in records})
+    methods = ("GET", "POST", "PUT", "PATCH", "DELETE") if args.all_methods else ("GET",)
+    async with client_for(args, max(users, 1)) as client:
+        stats = await replay(client, records, args.admin_user, args.password, speed=args.speed,
+                             as_admin=args.as_admin, methods=methods)
+    report(stats, args.output)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load test a running RT3 instance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def target(command: argparse.ArgumentParser) -> None:
+        command.add_argument("--base-url", default="http://localhost:8000", help="instance to test (default: %(default)s)")
+        command.add_argument("--admin-user", required=True, help="handle of an admin on the instance")
+        command.add_argument("--password", default="rt3-synthetic",
+                             help="password of the admin and every member logged in as (default: %(default)s)")
+        command.add_argument("--timeout", type=float, default=30, help="per request, in seconds (default: 30)")
+        command.add_argument("--insecure", action="store_true", help="skip TLS verification, for nginx's self-signed cert")
+        command.add_argument("--output", help="also write the per-route results to this JSON file")
+
+    run = commands.add_parser("run", help="run the scripted scenarios")
+    target(run)
+    run.add_argument("--users", type=int, default=20, help="simulated operators (default: 20)")
+    run.add_argument("--admins", type=int, default=1, help="simulated admins (default: 1)")
+    run.add_argument("--duration", type=float, default=60, help="seconds at full load (default: 60)")
+    run.add_argument("--ramp-up", type=float, default=10, help="seconds to start every user over (default: 10)")
+    run.add_argument("--think", type=float, default=2, help="mean pause between pages, in seconds (default: 2)")
+    run.add_argument("--burst-interval", type=float, default=0,
+                     help="hold assessment submissions and release them together this often, in seconds")
+    run.add_argument("--seed", type=int, default=1, help="random seed for the scenario mix (default: 1)")
+
+    play = commands.add_parser("replay", help="replay an anonymized access log")
+    target(play)
+    play.add_argument("log", help="JSON lines written by the anonymize command")
+    play.add_argument("--speed", type=float, default=1, help="replay this many times faster than logged (default: 1)")
+    play.add_argument("--as-admin", action="store_true", help="send every request as the admin")
+    play.add_argument("--all-methods", action="store_true",
+                      help="also replay writes, without their bodies (default: GET only)")
+
+    anon = commands.add_parser("anonymize", help="turn an nginx access log into replayable JSON lines")
+    anon.add_argument("log", nargs="?", default="-", help="nginx access log (default: stdin)")
+    anon.add_argument("--include-all", action="store_true", help="keep requests outside /api")
+
+    args = parser.parse_args(argv)
+    if args.command == "anonymize":
+        source = sys.stdin if args.log == "-" else open(args.log)
+        with source:
+            for record in anonymize(source, include_all=args.include_all):
+                print(json.dumps(record))
+    elif args.command == "run":
+        asyncio.run(run_command(args))
+    else:
+        asyncio.run(replay_command(args))
+
+
+if __name__ == "__main__":
+    main()
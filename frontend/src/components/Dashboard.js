@@ -211,7 +211,7 @@ const Dashboard = () => {
       }
 
       isConnecting = true;
-      const wsUrl = `${getWsUrl()}?token=${encodeURIComponent(token)}`;
+      const wsUrl = `${getWsUrl()}?token=${encodeURIComponent(token)}&topics=roster,dashboard_image`;
       
       ws = new WebSocket(wsUrl);
 
@@ -230,7 +230,19 @@ const Dashboard = () => {
             ws.close();
             return;
           }
-          // Handle other message types here
+          // Refresh only the widgets whose data changed instead of polling
+          let topics = [];
+          if (data.type === 'changes') {
+            topics = data.events.map((change) => change.topic);
+          } else if (data.type === 'resync') {
+            topics = data.topics;
+          }
+          if (topics.includes('roster')) {
+            fetchTeamMembersCount();
+          }
+          if (topics.includes('dashboard_image')) {
+            fetchDashboardImage();
+          }
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
         }
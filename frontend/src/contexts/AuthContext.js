@@ -9,9 +9,43 @@ export const AuthProvider = ({ children }) => {
   const [loading, setLoading] = useState(true);
   const navigate = useNavigate();
 
-  const fetchUser = async () => {
+  // Trade the stored refresh token for a new access token instead of sending the user to the login page
+  const refreshSession = async () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (!refreshToken) {
+      return false;
+    }
+
+    try {
+      const response = await fetch(getApiUrl('/team-roster/refresh'), {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      });
+
+      if (!response.ok) {
+        localStorage.removeItem('refresh_token');
+        return false;
+      }
+
+      const data = await response.json();
+      localStorage.setItem('token', data.access_token);
+      localStorage.setItem('refresh_token', data.refresh_token);
+      return true;
+    } catch (error) {
+      console.error('Error refreshing session:', error);
+      return false;
+    }
+  };
+
+  const fetchUser = async (allowRefresh = true) => {
     const token = localStorage.getItem('token');
     if (!token) {
+      if (allowRefresh && await refreshSession()) {
+        return fetchUser(false);
+      }
       setUser(null);
       return false;
     }
@@ -27,6 +61,9 @@ export const AuthProvider = ({ children }) => {
       if (!response.ok) {
         if (response.status === 401) {
           localStorage.removeItem('token');
+          if (allowRefresh && await refreshSession()) {
+            return fetchUser(false);
+          }
           setUser(null);
           return false;
         }
@@ -75,6 +112,7 @@ export const AuthProvider = ({ children }) => {
 
       const data = await response.json();
       localStorage.setItem('token', data.access_token);
+      localStorage.setItem('refresh_token', data.refresh_token);
       await fetchUser();
       return true;
     } catch (error) {
@@ -85,6 +123,7 @@ export const AuthProvider = ({ children }) => {
 
   const logout = () => {
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     setUser(null);
     navigate('/login');
   };
@@ -100,6 +139,7 @@ export const AuthProvider = ({ children }) => {
     logout,
     updateUser,
     fetchUser,
+    refreshSession,
   };
 
   return <AuthContext.Provider value={value}>{children}</AuthContext.Provider>;
@@ -6,9 +6,16 @@ chmod 0644 /etc/cron.d/rt3-backup
 crontab /etc/cron.d/rt3-backup
 service cron start
 
-# Initialize database
-python -c "from app.database import Base, engine; Base.metadata.create_all(bind=engine)"
-alembic upgrade head
+# cron jobs do not inherit the container environment; save what the backup needs
+mkdir -p /etc/rt3
+export -p | grep -E '^declare -x (DATABASE_URL|BACKUP_[A-Z_]+)=' > /etc/rt3/backup.env || true
+
+# Create the schema, run migrations and add the default admin, once, before any worker starts.
+# The workers do none of this, so stop here rather than serve an un-migrated database.
+if ! python -m app.bootstrap; then
+    echo "Bootstrap failed; not starting the application" >&2
+    exit 1
+fi
 
 # Start the application
 uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
\ No newline at end of file